@@ -0,0 +1,78 @@
+"""Microbenchmark: per-review text preparation before and after precompiled canonicalization.
+
+"legacy" reproduces the previous per-review work: canonicalize_text with raw pattern
+strings called twice (analysis and response) and escape_brackets applied twice in
+SAFE_MODE. "current" is prepare_review plus the single, idempotent escape in
+generate_response.
+
+Usage: python benchmarks/bench_canonicalize.py [--repeat N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from analysis_engine import prepare_review  # noqa: E402
+from utils import canonicalize_text, escape_brackets, redact_pii  # noqa: E402
+
+
+def legacy_canonicalize_text(text):
+    text = re.sub(r"[^a-zA-Z0-9\s.,!?'\"()&%$#@_-]", "", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def legacy_escape_brackets(text):
+    return text.replace("[", "\\[").replace("]", "\\]")
+
+
+def legacy_pipeline(raw):
+    text = legacy_canonicalize_text(raw)
+    redacted, _ = redact_pii(text)
+    redacted = legacy_escape_brackets(redacted)
+    legacy_canonicalize_text(raw)  # generate_response recomputed it
+    return legacy_escape_brackets(redacted)  # ... and escaped again
+
+
+def current_pipeline(raw):
+    prepared = prepare_review(raw)
+    return escape_brackets(prepared.redacted)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    reviews = [r["review_text"] for r in json.loads((ROOT / "reviews.json").read_text())["reviews"]]
+    ascii_noise = " ".join(reviews) + " <script>[[ignore]]</script>\t  "
+    unicode_noise = ascii_noise + " \u2014 \u00a0\U0001f525\U0001f525"
+    workloads = {
+        "short (reviews.json)": reviews,
+        "long, ASCII (x50)": [ascii_noise * 50],
+        "long, non-ASCII (x50)": [unicode_noise * 50],
+    }
+
+    for name, texts in workloads.items():
+        print(name)
+        pairs = (
+            ("canonicalize", legacy_canonicalize_text, canonicalize_text),
+            ("canonicalize+redact+escape", legacy_pipeline, current_pipeline),
+        )
+        for label, legacy, current in pairs:
+            row = [f"  {label}:"]
+            for tag, impl in (("legacy", legacy), ("current", current)):
+                seconds = min(timeit.repeat(lambda: [impl(t) for t in texts], number=1, repeat=args.repeat))
+                row.append(f"{tag}={seconds / len(texts) * 1e6:,.1f}us/review")
+            print(" ".join(row))
+
+
+if __name__ == "__main__":
+    main()
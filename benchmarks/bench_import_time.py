@@ -0,0 +1,86 @@
+"""Benchmark: import time of the pipeline modules and the cost of the lazy policy.
+
+Each import is timed in a fresh interpreter with ``python -X importtime`` (the
+cumulative time of the module itself, in microseconds); the median of ``--repeat``
+runs is reported. ``first get_policy()`` is the one-off cost moved out of import:
+reading config.json and compiling the PII patterns and critical-keyword matcher.
+``get_policy() (cached)`` is the per-call cost on the hot path.
+
+Usage: python benchmarks/bench_import_time.py [--repeat N] [--module NAME ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+
+MODULES = ("config", "utils", "analysis_engine", "main")
+
+
+def import_time_us(module: str) -> int:
+    """Cumulative import time of ``module`` in a fresh interpreter, from ``-X importtime``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC,
+        env={**os.environ, "PYTHONPATH": str(SRC)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in proc.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1])
+    raise RuntimeError(f"no importtime line for {module}")
+
+
+def first_policy_us() -> float:
+    """Time of the first get_policy() call in a fresh interpreter."""
+    code = (
+        "import time, policy; t = time.perf_counter(); policy.get_policy(); "
+        "print((time.perf_counter() - t) * 1e6)"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SRC,
+        env={**os.environ, "PYTHONPATH": str(SRC)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(proc.stdout.strip())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--module", action="append", help="Modules to time (repeatable)")
+    args = parser.parse_args()
+
+    for module in args.module or MODULES:
+        us = statistics.median(import_time_us(module) for _ in range(args.repeat))
+        print(f"import {module + ':':<18} {us / 1e3:8.2f} ms")
+
+    us = statistics.median(first_policy_us() for _ in range(args.repeat))
+    print(f"{'first get_policy():':<25} {us / 1e3:8.2f} ms")
+
+    sys.path.insert(0, str(SRC))
+    from policy import get_policy
+
+    get_policy()
+    number = 100_000
+    seconds = min(timeit.repeat(get_policy, number=number, repeat=5))
+    print(f"{'get_policy() (cached):':<25} {seconds / number * 1e9:8.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Per-review cost of redact_pii versus the previous search+sub implementation.
+
+Usage: python benchmarks/bench_redaction.py [--repeat N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from config import PII_PATTERNS  # noqa: E402
+from utils import redact_pii  # noqa: E402
+
+
+def legacy_redact_pii(text):
+    found = []
+    redacted = text
+    for tag, pattern in PII_PATTERNS.items():
+        if pattern.search(redacted):
+            found.append(tag)
+            redacted = pattern.sub(f"[{tag}]", redacted)
+    return redacted, found
+
+
+def workloads():
+    reviews = [r["review_text"] for r in json.loads((ROOT / "reviews.json").read_text())["reviews"]]
+    plain = "The blender works well, but shipping was slow and the lid feels cheap. "
+    return {
+        "short (reviews.json)": reviews,
+        "long, dense PII (30k chars)": [" ".join(reviews) * 20],
+        "long, no PII (26k chars)": [plain * 360],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for name, texts in workloads().items():
+        for text in texts:
+            assert redact_pii(text) == legacy_redact_pii(text)
+        row = [name]
+        for impl in (legacy_redact_pii, redact_pii):
+            seconds = min(timeit.repeat(lambda: [impl(t) for t in texts], number=1, repeat=args.repeat))
+            row.append(f"{impl.__name__}={seconds / len(texts) * 1e6:,.1f}us/review")
+        print(" | ".join(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Per-pattern PII regex cost on pathological inputs of growing size.
+
+Each PII pattern is run alone (one ``subn`` pass, no chunking) on adversarial inputs
+that maximise backtracking, at several sizes. The growth column is the time ratio
+between consecutive sizes: ~2 for a doubling means linear, ~4 quadratic. Finally
+``redact_pii`` itself is timed on the same inputs; these contain no sentence boundaries,
+so beyond PII_REDACTION.MAX_SENTENCE_CHARS it masks them instead of running the patterns.
+
+Usage: python benchmarks/profile_pii_patterns.py [--sizes 2000,4000,8000] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from config import PII_PATTERNS  # noqa: E402
+from utils import redact_pii  # noqa: E402
+
+
+def _repeat_to(unit: str, size: int, suffix: str = "") -> str:
+    return (unit * (size // len(unit) + 1))[:size] + suffix
+
+
+# Inputs with many candidate match starts whose matches fail late.
+PATHOLOGICAL_INPUTS: Dict[str, Callable[[int], str]] = {
+    "email_local_parts": lambda n: _repeat_to("a.b_c+d-", n, "@"),
+    "email_no_tld": lambda n: _repeat_to("a@b-", n),
+    "phone_separators": lambda n: _repeat_to("1 (2)-", n, "x"),
+    "name_capitalized": lambda n: _repeat_to("Ab Cd", n),
+    "address_number_starts": lambda n: " ".join(f"{i % 100} word" for i in range(n // 7))[:n],
+    "address_street_suffixes": lambda n: _repeat_to("1 st ", n, "!"),
+    "address_po_box": lambda n: _repeat_to("1 PO Box ", n, "!"),
+    "order_prefixes": lambda n: _repeat_to("Order order-", n),
+}
+
+
+def _time(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=str, default="2000,4000,8000", help="Input sizes in characters")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    sizes: List[int] = [int(s) for s in args.sizes.split(",")]
+
+    print(f"{'input':<26}{'pattern':<14}" + "".join(f"{f'{n} chars':>14}" for n in sizes) + f"{'growth':>10}")
+    for name, make in PATHOLOGICAL_INPUTS.items():
+        texts = [make(n) for n in sizes]
+        rows = [(tag, lambda t, p=pattern: p.subn("", t)) for tag, pattern in PII_PATTERNS.items()]
+        rows.append(("redact_pii", redact_pii))
+        for tag, fn in rows:
+            ms = [_time(lambda t=t: fn(t), args.repeat) * 1000 for t in texts]
+            growth = ms[-1] / ms[-2] if len(ms) > 1 and ms[-2] > 0 else float("nan")
+            print(f"{name:<26}{tag:<14}" + "".join(f"{m:>12.2f}ms" for m in ms) + f"{growth:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Offline benchmark suite for the review pipeline.
+
+Runs every stage against synthetic reviews (see synthetic.py) with a FakeTransport
+standing in for Gemini, so results do not depend on network or API quota:
+
+- ``redact_pii`` / ``canonicalize_text``: pure CPU, microseconds per review
+- ``analyze_review`` / ``generate_response``: pipeline overhead around a zero-latency LLM
+- ``end_to_end``: ``main.main`` over a JSONL file with a simulated LLM latency
+  distribution and error rate, reviews per second for each ``--workers`` value
+
+Results are written as JSON (``--output``); ``--compare BASELINE`` diffs them against
+a previous run and exits non-zero if any metric regressed by more than ``--tolerance``.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+os.environ.setdefault("CRIRA_SAFE_MODE", "true")
+
+import llm_client  # noqa: E402
+import main as crira_main  # noqa: E402
+from analysis_engine import analyze_review, prepare_review  # noqa: E402
+from fake_transport import FakeTransport  # noqa: E402
+from llm_scheduler import LLMScheduler  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from response_generator import generate_response  # noqa: E402
+from synthetic import ReviewMix, generate_reviews  # noqa: E402
+from utils import canonicalize_text, redact_pii  # noqa: E402
+
+SUITES = ("redact_pii", "canonicalize_text", "analyze_review", "generate_response", "end_to_end")
+
+Result = Dict[str, Any]
+
+
+def _result(value: float, unit: str, higher_is_better: bool = False, **extra: Any) -> Result:
+    return {"value": round(value, 3), "unit": unit, "higher_is_better": higher_is_better, **extra}
+
+
+def _us_per_item(func: Callable[[str], Any], texts: List[str], repeat: int) -> float:
+    seconds = min(timeit.repeat(lambda: [func(t) for t in texts], number=1, repeat=repeat))
+    return seconds / len(texts) * 1e6
+
+
+def _use_fake_llm(latency: Any, error_rate: float, seed: int) -> FakeTransport:
+    transport = FakeTransport(latency=latency, error_rate=error_rate, status=503, seed=seed)
+    llm_client.set_transport(transport)
+    # No rate limits and short backoff: the benchmark measures the pipeline, not the quota.
+    llm_client.set_scheduler(LLMScheduler(backoff_base_seconds=0.01, backoff_max_seconds=0.1))
+    llm_client.configure_response_cache(enabled=False)
+    return transport
+
+
+def run_micro(suite: str, texts: List[str], repeat: int, seed: int) -> Result:
+    if suite == "redact_pii":
+        return _result(_us_per_item(redact_pii, texts, repeat), "us/review")
+    if suite == "canonicalize_text":
+        return _result(_us_per_item(canonicalize_text, texts, repeat), "us/review")
+
+    _use_fake_llm(latency=None, error_rate=0.0, seed=seed)
+    if suite == "analyze_review":
+        return _result(_us_per_item(analyze_review, texts, repeat), "us/review")
+    prepared = [prepare_review(t) for t in texts]
+    analyzed = [analyze_review(t, prepared=p) for t, p in zip(texts, prepared)]
+    items = list(zip(analyzed, texts, prepared))
+    us = _us_per_item(lambda item: generate_response(item[0], item[1], canonical_review=item[2].canonical), items, repeat)
+    return _result(us, "us/review")
+
+
+def run_end_to_end(
+    entries: List[Dict[str, Any]], workers: int, latency: str, error_rate: float, seed: int
+) -> Result:
+    transport = _use_fake_llm(latency=latency, error_rate=error_rate, seed=seed)
+    METRICS.reset()
+    METRICS.enabled = True
+    with tempfile.TemporaryDirectory() as tmp:
+        reviews = Path(tmp) / "reviews.jsonl"
+        reviews.write_text("".join(json.dumps(e) + "\n" for e in entries), encoding="utf-8")
+        start = time.perf_counter()
+        crira_main.main(
+            ["--reviews", str(reviews), "--output", str(Path(tmp) / "out.jsonl"), "--workers", str(workers), "--no-cache"]
+        )
+        elapsed = time.perf_counter() - start
+    per_review = METRICS.summary().get("process_review", {})
+    METRICS.enabled = False
+    return _result(
+        len(entries) / elapsed,
+        "reviews/s",
+        higher_is_better=True,
+        p50_ms=round(per_review.get("p50", 0.0) * 1e3, 3),
+        p95_ms=round(per_review.get("p95", 0.0) * 1e3, 3),
+        llm_requests=transport.requests,
+        llm_failures=transport.failures,
+    )
+
+
+def compare(current: Dict[str, Result], baseline: Dict[str, Result], tolerance: float) -> List[str]:
+    """Prints a diff table and returns the names of metrics that regressed beyond ``tolerance``."""
+    regressions = []
+    print(f"{'benchmark':<32} {'baseline':>12} {'current':>12} {'change':>9}  unit")
+    for name, cur in current.items():
+        base = baseline.get(name)
+        if base is None or not base["value"]:
+            print(f"{name:<32} {'-':>12} {cur['value']:>12,.3f} {'new':>9}  {cur['unit']}")
+            continue
+        change = (cur["value"] - base["value"]) / base["value"]
+        worse = -change if cur["higher_is_better"] else change
+        flag = ""
+        if worse > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<32} {base['value']:>12,.3f} {cur['value']:>12,.3f} {change:>+9.1%}  {cur['unit']}{flag}")
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", action="append", choices=SUITES, help="Run only these suites (repeatable)")
+    parser.add_argument("--reviews", type=int, default=200, help="Number of synthetic reviews")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pii-rate", type=float, default=0.5)
+    parser.add_argument("--critical-rate", type=float, default=0.1)
+    parser.add_argument("--injection-rate", type=float, default=0.05)
+    parser.add_argument("--min-sentences", type=int, default=2)
+    parser.add_argument("--max-sentences", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=20, help="Repeats for micro benchmarks (best is kept)")
+    parser.add_argument(
+        "--latency", type=str, default="lognormal:0.02,0.5", help="Fake LLM latency spec for end_to_end"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.01, help="Fake LLM transient error rate for end_to_end")
+    parser.add_argument("--workers", type=str, default="1,8", help="Comma-separated worker counts for end_to_end")
+    parser.add_argument("--output", type=str, default=None, help="Write results JSON here")
+    parser.add_argument("--compare", type=str, default=None, help="Baseline results JSON to diff against")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed relative slowdown before failing")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("llm_scheduler").setLevel(logging.ERROR)  # simulated retries are expected
+    mix = ReviewMix(args.pii_rate, args.critical_rate, args.injection_rate, args.min_sentences, args.max_sentences)
+    entries = generate_reviews(args.reviews, mix, seed=args.seed)
+    texts = [e["review_text"] for e in entries]
+
+    results: Dict[str, Result] = {}
+    for suite in args.suite or SUITES:
+        if suite == "end_to_end":
+            for workers in (int(w) for w in args.workers.split(",")):
+                results[f"end_to_end.workers={workers}"] = run_end_to_end(
+                    entries, workers, args.latency, args.error_rate, args.seed
+                )
+        else:
+            results[suite] = run_micro(suite, texts, args.repeat, args.seed)
+    llm_client.set_transport(None)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "tolerance")},
+        },
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    else:
+        print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,85 +3,538 @@
 from __future__ import annotations
 import re
 
+import copy
 import json
 import logging
-import os
-from typing import Any, Dict, Tuple
-from prompts import ANALYSIS_FEW_SHOT, ANALYSIS_SYSTEM_PROMPT
-from llm_client import call_llm
+import threading
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+from prompts import (
+    ANALYSIS_FEW_SHOT,
+    ANALYSIS_REPAIR_SYSTEM_PROMPT,
+    ANALYSIS_SYSTEM_PROMPT,
+    BATCH_ANALYSIS_FEW_SHOT,
+    BATCH_ANALYSIS_SYSTEM_PROMPT,
+)
+from config import (
+    DUMMY_LLM_KEYWORDS,
+    FAST_PATH_CONFIDENCE_THRESHOLD,
+    FAST_PATH_ENABLED,
+    FAST_PATH_SHORT_REVIEW_WORDS,
+    STRUCTURED_OUTPUT_ENABLED,
+    STRUCTURED_OUTPUT_REPAIR_ENABLED,
+    STRUCTURED_OUTPUT_REPAIR_MAX_TOKENS,
+)
+from keyword_matcher import build_labeled_matcher
+from llm_client import acall_llm, call_llm
+from llm_scheduler import LLMUnavailableError
+from metrics import stage
+from policy import get_policy
+from token_accounting import usage_stage
+from structured_output import (
+    analysis_response_schema,
+    batch_response_schema,
+    extract_json_array,
+    extract_json_object,
+    validate_fields,
+)
 from utils import canonicalize_text, escape_brackets, redact_pii
 
 
 logger = logging.getLogger(__name__)
 
+_structured_lock = threading.Lock()
+_structured_stats = {
+    "outputs": 0,
+    "parse_failures": 0,
+    "recovered": 0,
+    "incomplete": 0,
+    "repairs": 0,
+    "repaired": 0,
+    "defaulted": 0,
+}
+
+
+def _count(name: str) -> None:
+    with _structured_lock:
+        _structured_stats[name] += 1
+
+
+def get_structured_output_stats() -> Dict[str, float]:
+    """
+    Counters for parsing analysis output: LLM outputs parsed, outputs that were not
+    valid JSON (``parse_failures``) and those with fields recovered anyway, analyses
+    missing fields, targeted repair calls and their successes, and analyses completed
+    with default values; plus parse-failure and repair rates per output.
+    """
+    with _structured_lock:
+        stats: Dict[str, float] = dict(_structured_stats)
+    outputs = stats["outputs"]
+    stats["parse_failure_rate"] = round(stats["parse_failures"] / outputs, 4) if outputs else 0.0
+    stats["repair_rate"] = round(stats["repairs"] / outputs, 4) if outputs else 0.0
+    return stats
+
+
+@lru_cache(maxsize=32)
+def _response_schema(fields: FrozenSet[str], batch: bool = False) -> Optional[Dict[str, Any]]:
+    """Response schema for schema-constrained analysis calls, or None when disabled."""
+    if not STRUCTURED_OUTPUT_ENABLED:
+        return None
+    return batch_response_schema(fields) if batch else analysis_response_schema(fields)
+
+
 def _parse_llm_json_output(raw_output: str) -> Dict[str, Any]:
     """
-    Safely parse JSON from LLM output, with fallback for malformed responses.
+    Parse the JSON object in LLM output. Output that is not valid JSON as a whole
+    (prose around the object, a truncated or unterminated object) is recovered member
+    by member, so a partial analysis is not thrown away; returns {} if nothing is found.
     """
+    _count("outputs")
     try:
-        # First, try to load the raw output directly
-        return json.loads(raw_output)
+        parsed = json.loads(raw_output)
+        if isinstance(parsed, dict):
+            return parsed
     except json.JSONDecodeError:
-        # If it fails, search for a JSON object within the string
-        logger.warning("LLM output was not valid JSON, attempting to extract from text.")
-        match = re.search(r"\{.*\}", raw_output, flags=re.DOTALL)
-        if match:
-            try:
-                return json.loads(match.group(0))
-            except json.JSONDecodeError:
-                logger.error("Failed to parse extracted JSON from LLM output.")
-        else:
-            logger.error("No JSON object found in LLM output.")
-    
-    return {"sentiment": "neutral", "key_issues_praise": [], "summary": "Unable to parse LLM output."}
+        pass
+    _count("parse_failures")
+    logger.warning("LLM output was not valid JSON, recovering the fields it contains.")
+    recovered, _ = extract_json_object(raw_output)
+    if recovered:
+        _count("recovered")
+    else:
+        logger.error("No JSON object found in LLM output.")
+    return recovered
+
+class PreparedReview(NamedTuple):
+    """Canonical and redacted forms of a review, computed once and shared by analysis and response."""
+
+    canonical: str
+    redacted: str
+    pii_found: List[str]
 
-def analyze_review(raw_text: str) -> Dict[str, Any]:
+
+def prepare_review(raw_text: str) -> PreparedReview:
     """
-    Analyze a single review:
-    - canonicalize and optionally escape bracket tokens
-    - redact PII (if SAFE_MODE)
-    - call LLM to extract sentiment, issues, summary (structured JSON)
-    - validate and return a dict with keys: redacted_review, pii_found, sentiment, key_issues_praise, summary
+    Canonicalize a review and, in SAFE_MODE, redact PII and escape bracket tokens.
     """
-    # Re-evaluate SAFE_MODE inside the function to allow test-time patching.
-    safe_mode = os.getenv("CRIRA_SAFE_MODE", "true").lower() in ("1", "true", "yes")
+    # The policy follows CRIRA_SAFE_MODE and config.json changes.
+    safe_mode = get_policy().safe_mode
 
-    text = canonicalize_text(raw_text)
+    with stage("canonicalize"):
+        text = canonicalize_text(raw_text)
     if safe_mode:
-        redacted_text, pii_found = redact_pii(text)
-        # escape brackets to prevent injection via bracket tokens
-        redacted_text = escape_brackets(redacted_text)
+        with stage("redact"):
+            redacted_text, pii_found = redact_pii(text)
+            # escape brackets to prevent injection via bracket tokens
+            redacted_text = escape_brackets(redacted_text)
     else:
         # unsafe mode: leave raw
         redacted_text = text
         pii_found = []
+    return PreparedReview(text, redacted_text, pii_found)
+
+
+_FAST_PATH_MATCHER = build_labeled_matcher(DUMMY_LLM_KEYWORDS)
+# Cues that make keyword polarity unreliable: negation ("not great"), contrast ("great but late"), questions.
+_HEDGE_RE = re.compile(r"\b(?:not|no|never|but|however|although|though|except|unless|without)\b|n't\b|\?", re.IGNORECASE)
+_WORD_RE = re.compile(r"[A-Za-z0-9']+")
+
+_fast_path_lock = threading.Lock()
+_fast_path_stats = {"reviews": 0, "fast_path": 0}
+
+
+def _rating_sentiment(rating: Optional[float]) -> Optional[str]:
+    if rating is None:
+        return None
+    if rating >= 4:
+        return "positive"
+    if rating <= 2:
+        return "negative"
+    return "neutral"
+
+
+def _fast_analysis(sentiment: str, issues: List[str]) -> Dict[str, Any]:
+    key_issues_praise = list(issues) or (["overall satisfaction"] if sentiment == "positive" else [])
+    summary = f"{sentiment.capitalize()} feedback" + (f" about {', '.join(issues)}." if issues else ".")
+    return {"sentiment": sentiment, "key_issues_praise": key_issues_praise, "summary": summary}
+
+
+def pre_classify(text: str, rating: Optional[float] = None) -> Tuple[Optional[Dict[str, Any]], float]:
+    """
+    Local keyword/rating classifier for reviews that do not need the LLM.
+
+    Uses the DUMMY_LLM_KEYWORDS sentiment and issue tables. Confidence starts at 0.6 for
+    single-polarity keyword hits (+0.1 per extra distinct keyword, up to +0.2) or 0.5 for
+    an extreme star rating alone. It gains 0.3 when the rating agrees and 0.1 for short
+    reviews. Long reviews lose 0.2, and negation, contrast or questions lose 0.4. Mixed
+    polarity, a disagreeing rating, or positive sentiment with reported issues are
+    ambiguous. Reviews with no words (or a couple of words and no signal) are neutral.
+
+    Args:
+        text: Canonicalized review text.
+        rating: Optional star rating (1-5) from the review metadata.
+
+    Returns:
+        ``(analysis, confidence)``, where analysis has the sentiment/key_issues_praise/summary
+        keys, or ``(None, 0.0)`` when the review is ambiguous.
+    """
+    words = _WORD_RE.findall(text)
+    rating_sentiment = _rating_sentiment(rating)
+    if not words:
+        return _fast_analysis(rating_sentiment or "neutral", []), 0.95
+
+    hits = _FAST_PATH_MATCHER.find_all(text)
+    labels = set().union(*(hit.labels for hit in hits)) if hits else set()
+    sentiments = {label.split(":", 1)[1] for label in labels if label.startswith("sentiment:")}
+    issues = [issue for issue in DUMMY_LLM_KEYWORDS.get("issues", {}) if f"issue:{issue}" in labels]
+
+    if not labels and len(words) <= 2 and rating_sentiment is None:
+        return _fast_analysis("neutral", []), 0.85
+    if len(sentiments) == 1:
+        sentiment = sentiments.pop()
+        distinct_keywords = len({hit.keyword for hit in hits if f"sentiment:{sentiment}" in hit.labels})
+        confidence = 0.6 + 0.1 * min(2, distinct_keywords - 1)
+        if rating_sentiment is not None:
+            if rating_sentiment != sentiment:
+                return None, 0.0
+            confidence += 0.3
+    elif not sentiments and rating in (1, 5):
+        sentiment, confidence = rating_sentiment, 0.5
+    else:
+        return None, 0.0
+    if sentiment == "positive" and issues:
+        return None, 0.0
+
+    confidence += 0.1 if len(words) <= FAST_PATH_SHORT_REVIEW_WORDS else -0.2
+    if _HEDGE_RE.search(text):
+        confidence -= 0.4
+    return _fast_analysis(sentiment, issues), round(max(0.0, min(1.0, confidence)), 2)
+
+
+def _try_fast_path(prepared: PreparedReview, rating: Optional[float]) -> Optional[Dict[str, Any]]:
+    """
+    Returns a local analysis if the pre-classifier is confident enough, counting the outcome.
+    Critical reviews always go to the LLM: the keyword tables know nothing about safety
+    complaints, so "Love it! It caught fire." would otherwise be read as praise.
+    """
+    analysis = None
+    if FAST_PATH_ENABLED and not get_policy().is_critical(prepared.canonical):
+        with stage("analysis.fast_path"):
+            candidate, confidence = pre_classify(prepared.canonical, rating)
+        if candidate is not None and confidence >= FAST_PATH_CONFIDENCE_THRESHOLD:
+            analysis = candidate
+    with _fast_path_lock:
+        _fast_path_stats["reviews"] += 1
+        if analysis is not None:
+            _fast_path_stats["fast_path"] += 1
+    return analysis
+
+
+def get_fast_path_stats() -> Dict[str, float]:
+    """Reviews analyzed, how many skipped the LLM via the pre-classifier, and the skip rate."""
+    with _fast_path_lock:
+        stats: Dict[str, float] = dict(_fast_path_stats)
+    stats["llm"] = stats["reviews"] - stats["fast_path"]
+    stats["skip_rate"] = round(stats["fast_path"] / stats["reviews"], 4) if stats["reviews"] else 0.0
+    return stats
+
+
+def _analysis_result(
+    prepared: PreparedReview, parsed: Dict[str, Any], defaulted: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    result = {
+        "redacted_review": prepared.redacted,
+        "pii_found": prepared.pii_found,
+        "sentiment": parsed["sentiment"],
+        "key_issues_praise": parsed["key_issues_praise"],
+        "summary": parsed["summary"],
+    }
+    if defaulted:
+        result["defaulted_fields"] = list(defaulted)
+    return result
+
+
+def analyze_review(
+    raw_text: str, prepared: Optional[PreparedReview] = None, rating: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Analyze a single review:
+    - canonicalize and optionally escape bracket tokens
+    - redact PII (if SAFE_MODE)
+    - answer confidently classifiable reviews locally (fast path, see ``pre_classify``)
+    - otherwise call LLM to extract sentiment, issues, summary (structured JSON)
+    - validate and return a dict with keys: redacted_review, pii_found, sentiment, key_issues_praise, summary,
+      plus defaulted_fields listing the fields the LLM did not produce and that were filled with defaults
+
+    Pass ``prepared`` (from ``prepare_review``) to reuse canonicalization/redaction done by the caller,
+    and ``rating`` (the review's star rating, if known) to inform the fast path.
+    """
+    if prepared is None:
+        prepared = prepare_review(raw_text)
+    fast = _try_fast_path(prepared, rating)
+    if fast is not None:
+        return _analysis_result(prepared, fast)
+    return _analyze_with_llm(prepared)
+
 
-    # Build prompt
-    prompt = f"{ANALYSIS_FEW_SHOT}\nReview: \"{redacted_text}\"\nOutput:"
+def _analysis_prompt(prepared: PreparedReview) -> str:
+    """The per-review part of the analysis prompt; it follows the ANALYSIS_FEW_SHOT prefix."""
+    with stage("analysis.build_prompt"):
+        return f"\nReview: \"{prepared.redacted}\"\nOutput:"
+
+
+def _analysis_fields(raw_output: str) -> Tuple[Dict[str, Any], List[str]]:
+    """Valid analysis fields recovered from ``raw_output``, and the names of missing or invalid ones."""
+    from config import ANALYSIS_OUTPUT_SCHEMA
+
+    with stage("analysis.parse"):
+        return validate_fields(_parse_llm_json_output(raw_output), ANALYSIS_OUTPUT_SCHEMA)
+
+
+def _repair_prompt(prepared: PreparedReview, fields: Dict[str, Any], missing: List[str]) -> str:
+    return (
+        f"Known keys: {json.dumps(fields, ensure_ascii=False)}\n"
+        f"Missing keys: {', '.join(missing)}\n"
+        f"Review: \"{prepared.redacted}\"\nOutput:"
+    )
+
+
+def _merge_repair(
+    fields: Dict[str, Any], missing: List[str], raw_output: str
+) -> Tuple[Dict[str, Any], List[str]]:
+    with stage("analysis.parse"):
+        repaired, still_missing = validate_fields(_parse_llm_json_output(raw_output), missing)
+    if not still_missing:
+        _count("repaired")
+    return {**fields, **repaired}, still_missing
+
+
+def _should_repair(missing: List[str]) -> bool:
+    if not missing:
+        return False
+    _count("incomplete")
+    return STRUCTURED_OUTPUT_REPAIR_ENABLED
+
+
+def _repair_analysis(
+    prepared: PreparedReview, fields: Dict[str, Any], missing: List[str]
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Asks the LLM for just the ``missing`` fields of an otherwise usable analysis (a much
+    smaller request than re-analyzing the review) and merges them into ``fields``.
+    """
+    _count("repairs")
     try:
-        raw_output = call_llm(prompt=prompt, system=ANALYSIS_SYSTEM_PROMPT, max_tokens=400)
-    except Exception as e:
-        logger.exception("LLM call failed during analyze_review")
-        # fallback safe structured response
-        raw_output = json.dumps({"sentiment": "neutral", "key_issues_praise": [], "summary": "Analysis temporarily unavailable."})
+        with stage("analysis.repair"), usage_stage("analysis.repair"):
+            raw_output = call_llm(
+                prompt=_repair_prompt(prepared, fields, missing),
+                system=ANALYSIS_REPAIR_SYSTEM_PROMPT,
+                max_tokens=STRUCTURED_OUTPUT_REPAIR_MAX_TOKENS,
+                response_schema=_response_schema(frozenset(missing)),
+            )
+    except LLMUnavailableError:
+        raise
+    except Exception:
+        logger.exception("LLM call failed while repairing an analysis")
+        return fields, missing
+    return _merge_repair(fields, missing, raw_output)
+
+
+async def _arepair_analysis(
+    prepared: PreparedReview, fields: Dict[str, Any], missing: List[str], timeout: Optional[float]
+) -> Tuple[Dict[str, Any], List[str]]:
+    _count("repairs")
+    try:
+        with stage("analysis.repair"), usage_stage("analysis.repair"):
+            raw_output = await acall_llm(
+                prompt=_repair_prompt(prepared, fields, missing),
+                system=ANALYSIS_REPAIR_SYSTEM_PROMPT,
+                max_tokens=STRUCTURED_OUTPUT_REPAIR_MAX_TOKENS,
+                timeout=timeout,
+                response_schema=_response_schema(frozenset(missing)),
+            )
+    except LLMUnavailableError:
+        raise
+    except Exception:
+        logger.exception("LLM call failed while repairing an analysis")
+        return fields, missing
+    return _merge_repair(fields, missing, raw_output)
+
+
+_FIELD_DEFAULTS = {"sentiment": "neutral", "key_issues_praise": [], "summary": ""}
+
+
+def _complete_analysis(prepared: PreparedReview, fields: Dict[str, Any], missing: List[str]) -> Dict[str, Any]:
+    """
+    Builds the analysis result, filling fields that are still missing with safe defaults.
+    The filled fields are listed under ``defaulted_fields`` so later stages can tell a
+    defaulted analysis from a real one.
+    """
+    if missing:
+        _count("defaulted")
+        fields = dict(fields)
+        for name in missing:
+            fields[name] = copy.copy(_FIELD_DEFAULTS.get(name, ""))
+        if "summary" in missing and len(fields) == len(missing):
+            fields["summary"] = "Unable to parse LLM output."
+    return _analysis_result(prepared, fields, missing)
+
+
+def _analyze_with_llm(prepared: PreparedReview) -> Dict[str, Any]:
+    from config import ANALYSIS_OUTPUT_SCHEMA
+
+    prompt = _analysis_prompt(prepared)
+    # LLMUnavailableError propagates: an analysis nobody produced must fail the review.
+    with stage("analysis.llm_call"), usage_stage("analysis"):
+        raw_output = call_llm(
+            prompt=prompt,
+            system=ANALYSIS_SYSTEM_PROMPT,
+            prefix=ANALYSIS_FEW_SHOT,
+            max_tokens=400,
+            response_schema=_response_schema(frozenset(ANALYSIS_OUTPUT_SCHEMA)),
+        )
+    fields, missing = _analysis_fields(raw_output)
+    if _should_repair(missing):
+        fields, missing = _repair_analysis(prepared, fields, missing)
+    return _complete_analysis(prepared, fields, missing)
 
+
+async def aanalyze_review(
+    raw_text: str,
+    prepared: Optional[PreparedReview] = None,
+    rating: Optional[float] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Async ``analyze_review``: same fast path, parsing and repair, but LLM calls are awaited
+    via ``acall_llm``. A call that exceeds ``timeout`` seconds or finds the LLM unavailable
+    raises LLMUnavailableError; cancellation propagates.
+    """
     from config import ANALYSIS_OUTPUT_SCHEMA
-    parsed = _parse_llm_json_output(raw_output)
-    
-    # Validate keys
-    if not ANALYSIS_OUTPUT_SCHEMA.issubset(parsed.keys()):
-        parsed_valid = {
-            "sentiment": parsed.get("sentiment", "neutral"),
-            "key_issues_praise": parsed.get("key_issues_praise", []),
-            "summary": parsed.get("summary", ""),
-        }
+
+    if prepared is None:
+        prepared = prepare_review(raw_text)
+    fast = _try_fast_path(prepared, rating)
+    if fast is not None:
+        return _analysis_result(prepared, fast)
+
+    prompt = _analysis_prompt(prepared)
+    with stage("analysis.llm_call"), usage_stage("analysis"):
+        raw_output = await acall_llm(
+            prompt=prompt,
+            system=ANALYSIS_SYSTEM_PROMPT,
+            prefix=ANALYSIS_FEW_SHOT,
+            max_tokens=400,
+            timeout=timeout,
+            response_schema=_response_schema(frozenset(ANALYSIS_OUTPUT_SCHEMA)),
+        )
+    fields, missing = _analysis_fields(raw_output)
+    if _should_repair(missing):
+        fields, missing = await _arepair_analysis(prepared, fields, missing, timeout)
+    return _complete_analysis(prepared, fields, missing)
+
+
+def _parse_llm_json_array(raw_output: str) -> List[Any]:
+    """
+    Parse a JSON array from batched LLM output. The complete items of an array that is
+    truncated or surrounded by prose are recovered; returns [] if there are none.
+    """
+    _count("outputs")
+    try:
+        parsed = json.loads(raw_output)
+        if isinstance(parsed, list):
+            return parsed
+    except json.JSONDecodeError:
+        pass
+    _count("parse_failures")
+    logger.warning("Batch LLM output was not a valid JSON array, recovering its complete items.")
+    items, _ = extract_json_array(raw_output)
+    if items:
+        _count("recovered")
     else:
-        parsed_valid = parsed
-
-    return {
-        "redacted_review": redacted_text,
-        "pii_found": pii_found,
-        "sentiment": parsed_valid["sentiment"],
-        "key_issues_praise": parsed_valid["key_issues_praise"],
-        "summary": parsed_valid["summary"],
-    }
+        logger.error("No JSON array found in batch LLM output.")
+    return items
+
+
+def _analyze_batch(prepared: List[PreparedReview]) -> List[Dict[str, Any]]:
+    from config import ANALYSIS_OUTPUT_SCHEMA
+
+    ids = [f"R{i + 1}" for i in range(len(prepared))]
+    lines = "\n".join(f'Review {review_id}: "{p.redacted}"' for review_id, p in zip(ids, prepared))
+    prompt = f"\nReviews:\n{lines}\nOutput:"
+    try:
+        # Output budget scales with the number of packed reviews.
+        with usage_stage("analysis.batch"):
+            raw_output = call_llm(
+                prompt=prompt,
+                system=BATCH_ANALYSIS_SYSTEM_PROMPT,
+                prefix=BATCH_ANALYSIS_FEW_SHOT,
+                max_tokens=200 * len(ids) + 200,
+                response_schema=_response_schema(frozenset(ANALYSIS_OUTPUT_SCHEMA), batch=True),
+            )
+        items = _parse_llm_json_array(raw_output)
+    except LLMUnavailableError:
+        raise
+    except Exception:
+        logger.exception("LLM call failed during batched analysis; falling back to single-review calls.")
+        items = []
+
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        if isinstance(item, dict) and "id" in item:
+            by_id.setdefault(str(item["id"]), item)
+
+    results = []
+    for review_id, p in zip(ids, prepared):
+        fields, missing = validate_fields(by_id.get(review_id), ANALYSIS_OUTPUT_SCHEMA)
+        if not fields:
+            logger.warning("Batched analysis missing or invalid for %s; retrying as a single review.", review_id)
+            results.append(_analyze_with_llm(p))
+            continue
+        # A partially valid item only needs its missing fields, not a full re-analysis.
+        if _should_repair(missing):
+            fields, missing = _repair_analysis(p, fields, missing)
+        results.append(_complete_analysis(p, fields, missing))
+    return results
+
+
+def analyze_reviews(
+    raw_texts: List[str],
+    batch_size: int = 10,
+    prepared: Optional[List[PreparedReview]] = None,
+    ratings: Optional[List[Optional[float]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Analyze several reviews, packing up to ``batch_size`` of them into each LLM call so the
+    system prompt and few-shot preamble are paid for once per batch instead of once per review.
+
+    Reviews the fast path classifies confidently are answered locally and not sent. Each
+    remaining review gets a stable id (R1..Rn) within its batch; the returned JSON array is
+    mapped back by id and validated against ANALYSIS_OUTPUT_SCHEMA. Any review whose entry
+    is missing or has no valid field is re-analyzed with a single-review LLM call; an entry
+    lacking only some fields gets just those through a targeted repair call.
+
+    Returns:
+        One analysis dict per input review, in input order, with the same keys as analyze_review.
+    """
+    if prepared is None:
+        prepared = [prepare_review(t) for t in raw_texts]
+    if ratings is None:
+        ratings = [None] * len(raw_texts)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(raw_texts)
+    pending: List[int] = []
+    for i, (p, rating) in enumerate(zip(prepared, ratings)):
+        fast = _try_fast_path(p, rating)
+        if fast is None:
+            pending.append(i)
+        else:
+            results[i] = _analysis_result(p, fast)
+
+    batch_size = max(1, batch_size)
+    for start in range(0, len(pending), batch_size):
+        indexes = pending[start : start + batch_size]
+        preps = [prepared[i] for i in indexes]
+        batch = [_analyze_with_llm(preps[0])] if len(preps) == 1 else _analyze_batch(preps)
+        for i, analyzed in zip(indexes, batch):
+            results[i] = analyzed
+    return results
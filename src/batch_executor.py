@@ -0,0 +1,289 @@
+"""Concurrent, order-preserving execution of per-review work for batch runs.
+
+``map_ordered`` dispatches items in input order. ``map_prioritized`` ingests the input
+on a background thread, classifying each item with a cheap ``priority_of`` check as it
+is read, and keeps the queued items in a heap. Workers always take the most urgent
+queued item, so a safety complaint near the end of a large batch is processed as soon
+as it is read instead of after everything before it. Both yield outcomes in input order.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from metrics import METRICS, StageMetrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# (input item, result or None, exception or None)
+Outcome = Tuple[T, Optional[R], Optional[BaseException]]
+
+
+@dataclass
+class ThroughputStats:
+    """Counters and timing for a batch run."""
+
+    succeeded: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Processed items per second."""
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def record(self, error: Optional[BaseException]) -> None:
+        if error is None:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def finish(self) -> None:
+        self.finished_at = time.perf_counter()
+
+    def as_dict(self) -> dict:
+        return {
+            "processed": self.processed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "reviews_per_second": round(self.throughput, 3),
+        }
+
+
+def _call(func: Callable[[T], R], item: T) -> Outcome:
+    try:
+        return item, func(item), None
+    except Exception as exc:  # per-item failure isolation
+        return item, None, exc
+
+
+def _resolve(item: T, future: "Future[R]") -> Outcome:
+    try:
+        return item, future.result(), None
+    except Exception as exc:
+        return item, None, exc
+
+
+def map_ordered(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int = 1,
+    max_in_flight: Optional[int] = None,
+) -> Iterator[Outcome]:
+    """
+    Apply ``func`` to every item, optionally on a thread pool, yielding outcomes in input order.
+
+    Exceptions raised by ``func`` never abort the batch; they are returned as the third
+    element of the outcome tuple so the caller can log them.
+
+    Args:
+        func: The per-item callable (e.g. ``process_review``).
+        items: Input items; consumed lazily.
+        workers: Number of worker threads. ``1`` runs inline without a pool.
+        max_in_flight: Upper bound on submitted-but-not-yet-yielded items. Defaults to
+            ``2 * workers``. This bounds memory and the number of concurrent LLM requests.
+
+    Yields:
+        Tuples of ``(item, result, error)`` in the same order as ``items``.
+    """
+    if workers <= 1:
+        for item in items:
+            yield _call(func, item)
+        return
+
+    limit = max(1, max_in_flight if max_in_flight is not None else workers * 2)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crira-worker") as pool:
+        pending: Deque[Tuple[T, Future]] = deque()
+        for item in items:
+            pending.append((item, pool.submit(func, item)))
+            # Head-of-line wait keeps output ordered and caps in-flight work.
+            if len(pending) >= limit:
+                yield _resolve(*pending.popleft())
+        while pending:
+            yield _resolve(*pending.popleft())
+
+
+PRIORITY_CRITICAL = 0
+PRIORITY_ROUTINE = 1
+PRIORITY_NAMES = {PRIORITY_CRITICAL: "critical", PRIORITY_ROUTINE: "routine"}
+
+_DONE = object()
+
+
+class _PriorityQueue:
+    """Heap of ``(priority, seq, enqueued_at, item)`` shared by the ingest thread and the workers."""
+
+    def __init__(self, limit: int, max_queued: int):
+        self.cond = threading.Condition()
+        self.heap: List[Tuple[int, int, float, object]] = []
+        self.limit = limit
+        self.max_queued = max_queued
+        self.outstanding = 0  # non-critical items dispatched but not yet yielded
+        self.ingested = 0
+        self.ingest_done = False
+        self.stopped = False
+
+    def put(self, priority: int, item: object) -> bool:
+        """Queues ``item``; blocks while the queue is full. Returns False once stopped."""
+        with self.cond:
+            while len(self.heap) >= self.max_queued and not self.stopped:
+                self.cond.wait()
+            if self.stopped:
+                return False
+            heapq.heappush(self.heap, (priority, self.ingested, time.perf_counter(), item))
+            self.ingested += 1
+            self.cond.notify_all()
+            return True
+
+    def take(self) -> Optional[Tuple[int, int, float, object]]:
+        """
+        Next item to run, or None when the input is exhausted. Critical items are always
+        dispatched; others only while fewer than ``limit`` are outstanding.
+        """
+        with self.cond:
+            while not self.stopped:
+                if self.heap and (self.heap[0][0] <= PRIORITY_CRITICAL or self.outstanding < self.limit):
+                    entry = heapq.heappop(self.heap)
+                    if entry[0] > PRIORITY_CRITICAL:
+                        self.outstanding += 1
+                    self.cond.notify_all()
+                    return entry
+                if not self.heap and self.ingest_done:
+                    return None
+                self.cond.wait()
+            return None
+
+    def yielded(self, priority: int) -> None:
+        if priority > PRIORITY_CRITICAL:
+            with self.cond:
+                self.outstanding -= 1
+                self.cond.notify_all()
+
+    def finish_ingest(self) -> None:
+        with self.cond:
+            self.ingest_done = True
+            self.cond.notify_all()
+
+    def stop(self) -> None:
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+
+def map_prioritized(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    priority_of: Callable[[T], int],
+    workers: int = 1,
+    max_in_flight: Optional[int] = None,
+    max_queued: int = 100_000,
+    on_complete: Optional[Callable[[Outcome], None]] = None,
+    wait_metrics: Optional[StageMetrics] = None,
+) -> Iterator[Outcome]:
+    """
+    Apply ``func`` to every item on ``workers`` threads, most urgent first, yielding
+    outcomes in input order.
+
+    Args:
+        func: The per-item callable (e.g. ``process_review``); its exceptions are returned
+            in the outcome, as in ``map_ordered``.
+        items: Input items; read ahead of processing on a background thread.
+        priority_of: Priority of an item at ingest time, e.g. PRIORITY_CRITICAL or
+            PRIORITY_ROUTINE; lower runs first, ties in input order.
+        max_in_flight: Upper bound on non-critical items dispatched but not yet yielded
+            (default ``2 * workers``). Critical items are not limited by it.
+        max_queued: Items read ahead of dispatch; bounds memory on very large inputs.
+        on_complete: Called on the consuming thread with each outcome as soon as it is
+            available, before the outcomes preceding it in input order.
+        wait_metrics: Receives each item's queue wait, in seconds, under its priority
+            name (see PRIORITY_NAMES). Waits are also recorded on METRICS as
+            ``queue_wait.<name>`` when metrics are enabled.
+    """
+    workers = max(1, workers)
+    shared = _PriorityQueue(max(1, max_in_flight if max_in_flight is not None else 2 * workers), max(1, max_queued))
+    completions: "queue.Queue[object]" = queue.Queue()
+    ingest_error: List[BaseException] = []
+
+    def ingest() -> None:
+        try:
+            for item in items:
+                if not shared.put(priority_of(item), item):
+                    break
+        except BaseException as exc:  # surfaced to the consumer after the items read so far
+            ingest_error.append(exc)
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None and shared.stopped:
+                close()
+            shared.finish_ingest()
+            completions.put(_DONE)
+
+    def work() -> None:
+        while True:
+            entry = shared.take()
+            if entry is None:
+                return
+            priority, seq, enqueued_at, item = entry
+            wait = time.perf_counter() - enqueued_at
+            name = PRIORITY_NAMES.get(priority, str(priority))
+            if wait_metrics is not None:
+                wait_metrics.observe(name, wait)
+            if METRICS.enabled:
+                METRICS.observe(f"queue_wait.{name}", wait)
+            completions.put((seq, priority, _call(func, item)))
+
+    threads = [threading.Thread(target=ingest, name="crira-ingest", daemon=True)]
+    threads += [threading.Thread(target=work, name=f"crira-worker-{i}", daemon=True) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    ready: Dict[int, Tuple[int, Outcome]] = {}
+    next_seq = 0
+    ingest_finished = False
+    try:
+        while True:
+            if next_seq in ready:
+                priority, outcome = ready.pop(next_seq)
+                next_seq += 1
+                shared.yielded(priority)
+                yield outcome
+                continue
+            if ingest_finished and next_seq >= shared.ingested:
+                break
+            completion = completions.get()
+            if completion is _DONE:
+                ingest_finished = True
+                continue
+            seq, priority, outcome = completion
+            if on_complete is not None:
+                on_complete(outcome)
+            ready[seq] = (priority, outcome)
+    finally:
+        shared.stop()
+        for thread in threads[1:]:
+            thread.join()
+    if ingest_error:
+        raise ingest_error[0]
@@ -7,20 +7,20 @@ system where defaults can be stored in the JSON file and secrets or
 environment-specific settings can be provided via environment variables.
 """
 from __future__ import annotations
-import os, re
-from typing import Any, Dict, List, Set
+import os
+from typing import Any, Dict, List, Optional, Set
 
 import json
-from pathlib import Path
 
-def _load_config():
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+
+def load_config(path: str = CONFIG_PATH) -> Dict[str, Any]:
     """Loads configuration from JSON file."""
-    config_path = Path(__file__).parent / 'config.json'
-    if not config_path.exists():
-        raise FileNotFoundError(f"Configuration file not found at {config_path}")
-    with open(config_path, 'r', encoding='utf-8') as f:
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Configuration file not found at {path}")
+    with open(path, 'r', encoding='utf-8') as f:
         return json.load(f)
-_config = _load_config()
+_config = load_config()
 
 def _get_env_var(var_name: str, default: Any) -> Any:
     """Gets an environment variable, casting boolean-like strings."""
@@ -29,6 +29,10 @@ def _get_env_var(var_name: str, default: Any) -> Any:
         return default
     if isinstance(default, bool):
         return value.lower() in ("1", "true", "yes")
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
     return value
 
 # --- Configuration Values ---
@@ -37,18 +41,88 @@ SAFE_MODE: bool = _get_env_var("CRIRA_SAFE_MODE", _config.get("SAFE_MODE", True)
 USE_REAL_LLM: bool = _get_env_var("CRIRA_USE_REAL_LLM", _config.get("USE_REAL_LLM", False))
 GOOGLE_API_KEY: str = _get_env_var("GOOGLE_API_KEY", _config.get("GOOGLE_API_KEY", ""))
 LLM_MODEL: str = _get_env_var("CRIRA_LLM_MODEL", _config.get("LLM_MODEL", "gemini-1.5-flash-latest"))
+LLM_CACHE_ENABLED: bool = _get_env_var("CRIRA_LLM_CACHE_ENABLED", _config.get("LLM_CACHE_ENABLED", True))
+LLM_CACHE_MAX_ENTRIES: int = _get_env_var("CRIRA_LLM_CACHE_MAX_ENTRIES", _config.get("LLM_CACHE_MAX_ENTRIES", 10000))
+LLM_CACHE_TTL_SECONDS: int = _get_env_var("CRIRA_LLM_CACHE_TTL_SECONDS", _config.get("LLM_CACHE_TTL_SECONDS", 604800))
+LLM_CACHE_BACKEND: str = _get_env_var("CRIRA_LLM_CACHE_BACKEND", _config.get("LLM_CACHE_BACKEND", "sqlite"))
+LLM_CACHE_PATH: Optional[str] = _get_env_var("CRIRA_LLM_CACHE_PATH", _config.get("LLM_CACHE_PATH"))
+LLM_SCHEDULER: Dict[str, Any] = _config.get("LLM_SCHEDULER", {})
+CONTEXT_CACHE: Dict[str, Any] = _config.get("CONTEXT_CACHE", {})
+# Cache the static system prompt and few-shot prefix on the provider and reference it per request.
+CONTEXT_CACHE_ENABLED: bool = _get_env_var("CRIRA_CONTEXT_CACHE_ENABLED", CONTEXT_CACHE.get("ENABLED", False))
+CONTEXT_CACHE_TTL_SECONDS: int = _get_env_var("CRIRA_CONTEXT_CACHE_TTL_SECONDS", int(CONTEXT_CACHE.get("TTL_SECONDS", 3600)))
+# Prefixes smaller than this are sent inline; providers reject caches below a minimum size.
+CONTEXT_CACHE_MIN_PREFIX_TOKENS: int = _get_env_var(
+    "CRIRA_CONTEXT_CACHE_MIN_PREFIX_TOKENS", int(CONTEXT_CACHE.get("MIN_PREFIX_TOKENS", 1024))
+)
+PRIORITY_SCHEDULING: Dict[str, Any] = _config.get("PRIORITY_SCHEDULING", {})
+# Batch runs dispatch reviews matching a critical keyword ahead of routine ones.
+PRIORITY_SCHEDULING_ENABLED: bool = _get_env_var(
+    "CRIRA_PRIORITY_SCHEDULING_ENABLED", PRIORITY_SCHEDULING.get("ENABLED", False)
+)
+# Reviews read ahead of dispatch; a critical review further ahead than this waits its turn.
+PRIORITY_MAX_QUEUED: int = PRIORITY_SCHEDULING.get("MAX_QUEUED", 100_000)
+TOKEN_BUDGET: Dict[str, Any] = _config.get("TOKEN_BUDGET", {})
+# Input + output tokens per batch run; 0 means unlimited. Non-critical reviews are degraded, then deferred, near the limit.
+TOKEN_BUDGET_RUN_TOKENS: int = _get_env_var("CRIRA_TOKEN_BUDGET", int(TOKEN_BUDGET.get("RUN_TOKENS", 0)))
+TOKEN_BUDGET_CHEAP_MODEL: str = _get_env_var(
+    "CRIRA_TOKEN_BUDGET_CHEAP_MODEL", TOKEN_BUDGET.get("CHEAP_MODEL", "gemini-1.5-flash-8b")
+)
+STRUCTURED_OUTPUT: Dict[str, Any] = _config.get("STRUCTURED_OUTPUT", {})
+# Ask the LLM for JSON constrained by a response schema (analysis calls).
+STRUCTURED_OUTPUT_ENABLED: bool = _get_env_var("CRIRA_STRUCTURED_OUTPUT_ENABLED", STRUCTURED_OUTPUT.get("ENABLED", False))
+# Re-request only the fields missing from an analysis instead of falling back to defaults.
+STRUCTURED_OUTPUT_REPAIR_ENABLED: bool = _get_env_var(
+    "CRIRA_STRUCTURED_OUTPUT_REPAIR_ENABLED", STRUCTURED_OUTPUT.get("REPAIR_ENABLED", False)
+)
+STRUCTURED_OUTPUT_REPAIR_MAX_TOKENS: int = STRUCTURED_OUTPUT.get("REPAIR_MAX_TOKENS", 200)
+FAST_PATH: Dict[str, Any] = _config.get("FAST_PATH", {})
+FAST_PATH_ENABLED: bool = _get_env_var("CRIRA_FAST_PATH_ENABLED", FAST_PATH.get("ENABLED", False))
+FAST_PATH_CONFIDENCE_THRESHOLD: float = _get_env_var(
+    "CRIRA_FAST_PATH_CONFIDENCE_THRESHOLD", float(FAST_PATH.get("CONFIDENCE_THRESHOLD", 0.8))
+)
+FAST_PATH_SHORT_REVIEW_WORDS: int = FAST_PATH.get("SHORT_REVIEW_WORDS", 12)
+RESPONSE_STREAMING: Dict[str, Any] = _config.get("RESPONSE_STREAMING", {})
+# Streamed responses are cut at this many characters, and at the first forbidden token when STOP_ON_VIOLATION.
+RESPONSE_STREAM_MAX_CHARS: int = _get_env_var("CRIRA_RESPONSE_STREAM_MAX_CHARS", int(RESPONSE_STREAMING.get("MAX_CHARS", 1500)))
+RESPONSE_STREAM_STOP_ON_VIOLATION: bool = _get_env_var(
+    "CRIRA_RESPONSE_STREAM_STOP_ON_VIOLATION", RESPONSE_STREAMING.get("STOP_ON_VIOLATION", True)
+)
+RESPONSE_TEMPLATES: Dict[str, Any] = _config.get("RESPONSE_TEMPLATES", {})
+RESPONSE_TEMPLATES_ENABLED: bool = _get_env_var(
+    "CRIRA_RESPONSE_TEMPLATES_ENABLED", RESPONSE_TEMPLATES.get("ENABLED", False)
+)
+# Startup values. Long-running code should read safe mode, critical keywords and PII
+# patterns from policy.get_policy(), which follows changes to config.json.
 CRITICAL_KEYWORDS: List[str] = _config.get("CRITICAL_KEYWORDS", [])
 ALLOWED_PII_PLACEHOLDERS: Set[str] = set(_config.get("ALLOWED_PII_PLACEHOLDERS", []))
 ANALYSIS_OUTPUT_SCHEMA: Set[str] = set(_config.get("ANALYSIS_OUTPUT_SCHEMA", []))
 
-def _compile_pii_patterns() -> Dict[str, re.Pattern]:
-    """Loads and compiles PII regex patterns from config."""
-    patterns = {}
-    for key, pattern_str in _config.get("PII_PATTERNS", {}).items():
-        # The 'PII_ADDRESS' pattern uses case-insensitivity
-        flags = re.IGNORECASE if key == "PII_ADDRESS" else 0
-        patterns[key] = re.compile(pattern_str, flags)
-    return patterns
-PII_PATTERNS: Dict[str, re.Pattern] = _compile_pii_patterns()
+PII_REDACTION: Dict[str, Any] = _config.get("PII_REDACTION", {})
+# Longer texts are redacted chunk by chunk, which bounds any super-linear pattern cost per chunk.
+PII_MAX_CHUNK_CHARS: int = _get_env_var("CRIRA_PII_MAX_CHUNK_CHARS", int(PII_REDACTION.get("MAX_CHUNK_CHARS", 1000)))
+# A single sentence longer than this is masked entirely instead of being run through the patterns.
+PII_MAX_SENTENCE_CHARS: int = _get_env_var(
+    "CRIRA_PII_MAX_SENTENCE_CHARS", int(PII_REDACTION.get("MAX_SENTENCE_CHARS", 4000))
+)
+# Per-review redaction time budget; 0 disables it. Text not redacted in time is masked entirely.
+PII_TIME_BUDGET_MS: float = _get_env_var("CRIRA_PII_TIME_BUDGET_MS", float(PII_REDACTION.get("TIME_BUDGET_MS", 250)))
 
 DUMMY_LLM_KEYWORDS: Dict[str, Any] = _config.get("DUMMY_LLM_KEYWORDS", {})
+POLICY: Dict[str, Any] = _config.get("POLICY", {})
+# How often get_policy() checks config.json for changes; 0 checks on every call.
+POLICY_RELOAD_INTERVAL_SECONDS: float = _get_env_var(
+    "CRIRA_POLICY_RELOAD_INTERVAL_SECONDS", float(POLICY.get("RELOAD_INTERVAL_SECONDS", 2.0))
+)
+POLICY_HOT_RELOAD: bool = _get_env_var("CRIRA_POLICY_HOT_RELOAD", POLICY.get("HOT_RELOAD", True))
+
+
+def __getattr__(name: str) -> Any:
+    # PII_PATTERNS and PII_PREFILTERS are compiled on first access, not at import.
+    if name in ("PII_PATTERNS", "PII_PREFILTERS"):
+        from policy import compile_pii_patterns, compile_pii_prefilters
+
+        value = compile_pii_patterns(_config) if name == "PII_PATTERNS" else compile_pii_prefilters(_config)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,165 @@
+"""Provider-side caching of static prompt prefixes.
+
+Every analysis request starts with the same system prompt and few-shot block, and
+every response request with the same system prompt. Providers with context caching
+(Gemini ``CachedContent``) can store such a prefix once and bill later requests that
+reference it at a reduced rate for those tokens. ``ContextCacheManager`` creates one
+cached content per (backend, model, prefix), refreshes it before its TTL runs out,
+and counts the input tokens served from the cache. A replaced cache is left to expire
+on its own TTL, so requests that still reference it (in flight, or waiting in retry
+backoff) keep working.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Protocol, Tuple
+
+from llm_scheduler import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class ContextCacheBackend(Protocol):
+    def create(self, model: str, system: str, prefix: str, ttl_seconds: float) -> Tuple[str, Optional[int]]:
+        """Stores ``system`` and ``prefix``; returns the cache name and its token count, if known."""
+        ...
+
+    def delete(self, name: str) -> None:
+        ...
+
+
+def prefix_digest(model: str, system: str, prefix: str) -> str:
+    """Identifies a cacheable prefix; any change to the prompts yields a new digest."""
+    payload = "\x00".join((model, system, prefix))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Entry(NamedTuple):
+    name: Optional[str]  # None: not cacheable (too small, or creation failed) until expires_at
+    tokens: int
+    expires_at: float
+
+
+class ContextCacheManager:
+    """
+    Thread-safe registry of cached prompt prefixes.
+
+    Args:
+        ttl_seconds: Lifetime requested for each cached content.
+        refresh_margin_seconds: A cache this close to expiry is replaced by a new one, so
+            that requests never reference a cache that expires in flight.
+        min_tokens: Prefixes estimated below this many tokens are not cached (providers
+            reject small caches; Gemini requires at least 1024 tokens on current models).
+        cached_token_price_ratio: Price of a cached input token relative to a regular one,
+            used to report billed input tokens saved.
+        clock: Time source, for tests.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 3600,
+        refresh_margin_seconds: float = 60,
+        min_tokens: int = 0,
+        cached_token_price_ratio: float = 0.25,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = min(refresh_margin_seconds, ttl_seconds / 2)
+        self.min_tokens = min_tokens
+        self.cached_token_price_ratio = cached_token_price_ratio
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[Any, str], _Entry] = {}
+        self._backends: Dict[int, Any] = {}
+        # Replaced caches, (backend id, name, expires_at): still referenced by older requests until they expire.
+        self._retired: List[Tuple[int, str, float]] = []
+        self._stats = {"created": 0, "refreshed": 0, "failed": 0, "skipped": 0, "requests": 0, "cached_input_tokens": 0}
+
+    def get(self, backend: ContextCacheBackend, model: str, system: str, prefix: str) -> Optional[str]:
+        """
+        Returns the name of a live cached content holding ``system`` and ``prefix``,
+        creating or refreshing it as needed, or None if the prefix is not cached. Each
+        call that returns a name is counted as one request served from the cache.
+        """
+        key = (id(backend), prefix_digest(model, system, prefix))
+        with self._lock:
+            now = self._clock()
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at - self.refresh_margin_seconds <= now:
+                # Creating under the lock: concurrent requests wait for one cache instead of each making one.
+                self._sweep(now)
+                entry = self._create(backend, key, model, system, prefix, now, stale=entry)
+            if entry.name is None:
+                return None
+            self._stats["requests"] += 1
+            self._stats["cached_input_tokens"] += entry.tokens
+            return entry.name
+
+    def _create(
+        self,
+        backend: ContextCacheBackend,
+        key: Tuple[Any, str],
+        model: str,
+        system: str,
+        prefix: str,
+        now: float,
+        stale: Optional[_Entry],
+    ) -> _Entry:
+        tokens = estimate_tokens(system) + estimate_tokens(prefix)
+        if tokens < self.min_tokens:
+            self._stats["skipped"] += 1
+            entry = _Entry(None, tokens, float("inf"))
+        else:
+            try:
+                name, reported = backend.create(model, system, prefix, self.ttl_seconds)
+            except Exception as e:
+                # Retried after the refresh margin; until then requests carry the full prompt.
+                logger.warning("Could not create a context cache for %s: %s", model, e)
+                self._stats["failed"] += 1
+                entry = _Entry(None, tokens, now + self.refresh_margin_seconds + 1)
+            else:
+                self._stats["refreshed" if stale is not None and stale.name else "created"] += 1
+                entry = _Entry(name, reported or tokens, now + self.ttl_seconds)
+        if stale is not None and stale.name:
+            # Within refresh_margin_seconds of expiry anyway; deleting it now would break requests holding its name.
+            self._retired.append((key[0], stale.name, stale.expires_at))
+        self._entries[key] = entry
+        self._backends[key[0]] = backend
+        return entry
+
+    def _sweep(self, now: float) -> None:
+        """Forgets expired entries, e.g. caches of prompts that have since changed."""
+        for key, entry in list(self._entries.items()):
+            if entry.expires_at <= now:
+                del self._entries[key]
+        self._retired = [retired for retired in self._retired if retired[2] > now]
+
+    def _delete(self, backend: ContextCacheBackend, name: str) -> None:
+        try:
+            backend.delete(name)
+        except Exception as e:
+            logger.debug("Could not delete context cache %s: %s", name, e)
+
+    def clear(self) -> None:
+        """Deletes every live cached content, e.g. at the end of a run, to stop storage billing."""
+        with self._lock:
+            entries, self._entries = self._entries, {}
+            retired, self._retired = self._retired, []
+            now = self._clock()
+            live = [(backend_id, e.name, e.expires_at) for (backend_id, _), e in entries.items() if e.name]
+            for backend_id, name, expires_at in live + retired:
+                if expires_at > now:
+                    self._delete(self._backends[backend_id], name)
+            self._backends.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Cache lifecycle counters and the billed input tokens saved by cache hits."""
+        with self._lock:
+            stats: Dict[str, float] = dict(self._stats)
+        saved = stats["cached_input_tokens"] * (1 - self.cached_token_price_ratio)
+        stats["billed_input_tokens_saved"] = round(saved)
+        return stats
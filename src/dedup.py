@@ -0,0 +1,200 @@
+"""Duplicate review coalescing: analyze each distinct review text once per run.
+
+Reviews are grouped by their canonical redacted text (``prepare_review``), so reviews
+that differ only in whitespace, disallowed characters or PII share one analysis.
+Optionally, near-duplicates are grouped too, using 64-bit SimHash fingerprints
+compared by Hamming distance.
+
+Grouping happens as reviews stream through the worker pool: the first review of a
+group runs ``analyze_review`` and the others wait on the same future (single-flight),
+so a group costs one analysis even when its members are processed concurrently.
+Only the most recently used ``window`` groups are remembered, so memory stays bounded
+on arbitrarily long inputs; a duplicate further apart than that is analyzed again.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import re
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from analysis_engine import PreparedReview, analyze_review
+
+SIMHASH_BITS = 64
+DEFAULT_WINDOW = 10_000
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def simhash(text: str, bits: int = SIMHASH_BITS) -> int:
+    """SimHash of the word unigrams and bigrams of ``text``; similar texts differ in few bits."""
+    words = _TOKEN_RE.findall(text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    weights = [0] * bits
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=bits // 8).digest(), "big")
+        for i in range(bits):
+            weights[i] += 1 if h >> i & 1 else -1
+    return sum(1 << i for i, w in enumerate(weights) if w > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class NearDuplicateIndex:
+    """
+    Maps SimHash fingerprints to the first group seen within ``max_distance`` bits.
+
+    Uses banding: fingerprints are split into ``max_distance + 1`` bands, and two
+    fingerprints within ``max_distance`` bits must agree exactly on at least one band
+    (pigeonhole), so only fingerprints sharing a band are compared. Only the last
+    ``max_entries`` registered fingerprints are kept; older ones are forgotten first.
+    """
+
+    def __init__(self, max_distance: int, bits: int = SIMHASH_BITS, max_entries: int = DEFAULT_WINDOW):
+        if not 0 <= max_distance < bits:
+            raise ValueError(f"max_distance must be in [0, {bits}), got {max_distance}")
+        self.max_distance = max_distance
+        n_bands = max_distance + 1
+        edges = [round(i * bits / n_bands) for i in range(n_bands + 1)]
+        self._bands = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(edges, edges[1:])]
+        self._buckets: List[Dict[int, List[tuple]]] = [{} for _ in self._bands]
+        self._order: Deque[Tuple[int, str, List[int]]] = deque()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def find_or_add(self, fingerprint: int, key: str) -> str:
+        """Returns the key of a near-duplicate group for ``fingerprint``, registering ``key`` if none."""
+        band_values = [fingerprint >> shift & mask for shift, mask in self._bands]
+        with self._lock:
+            for buckets, value in zip(self._buckets, band_values):
+                for other, other_key in buckets.get(value, ()):
+                    if hamming_distance(fingerprint, other) <= self.max_distance:
+                        return other_key
+            for buckets, value in zip(self._buckets, band_values):
+                buckets.setdefault(value, []).append((fingerprint, key))
+            self._order.append((fingerprint, key, band_values))
+            if len(self._order) > self.max_entries:
+                self._forget(*self._order.popleft())
+        return key
+
+    def _forget(self, fingerprint: int, key: str, band_values: List[int]) -> None:
+        for buckets, value in zip(self._buckets, band_values):
+            bucket = buckets[value]
+            bucket.remove((fingerprint, key))
+            if not bucket:
+                del buckets[value]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._order)
+
+
+def similarity_to_distance(similarity: float, bits: int = SIMHASH_BITS) -> int:
+    """Converts a similarity threshold in (0, 1] to a maximum SimHash Hamming distance."""
+    if not 0 < similarity <= 1:
+        raise ValueError(f"near-duplicate similarity must be in (0, 1], got {similarity}")
+    return min(bits - 1, int((1 - similarity) * bits))
+
+
+class AnalysisDeduplicator:
+    """
+    Shares one analysis between reviews with the same canonical redacted text (and,
+    with ``near_dup_similarity``, between near-duplicates).
+
+    Each member still gets its own ``redacted_review`` and ``pii_found``; only the
+    LLM-derived fields (sentiment, key_issues_praise, summary) are shared. Response
+    generation, and therefore CRITICAL_REF creation, stays per review.
+
+    Args:
+        near_dup_similarity: SimHash similarity in (0, 1] above which reviews are grouped,
+            e.g. ``0.95`` (at most 3 of 64 bits differ). None groups exact duplicates only.
+        analyze: The analysis function, ``analyze_review`` by default.
+        window: Completed groups remembered, least recently used first out. Groups still
+            being analyzed are always kept, so at most ``window`` plus the number of
+            workers groups are held.
+    """
+
+    def __init__(
+        self,
+        near_dup_similarity: Optional[float] = None,
+        analyze: Callable[..., Dict[str, Any]] = analyze_review,
+        window: int = DEFAULT_WINDOW,
+    ):
+        if window < 1:
+            raise ValueError(f"dedup window must be at least 1, got {window}")
+        self._analyze = analyze
+        self.window = window
+        self._index = (
+            NearDuplicateIndex(similarity_to_distance(near_dup_similarity), max_entries=window)
+            if near_dup_similarity is not None
+            else None
+        )
+        self._groups: "OrderedDict[Tuple[Optional[float], str], Future]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"reviews": 0, "analyses": 0}
+
+    def group_key(self, prepared: PreparedReview, rating: Optional[float] = None) -> Tuple[Optional[float], str]:
+        # The rating is part of the key because it can change the fast-path analysis.
+        text = prepared.redacted
+        if self._index is not None:
+            text = self._index.find_or_add(simhash(text), text)
+        return rating, text
+
+    def analyze(self, raw_text: str, prepared: PreparedReview, rating: Optional[float] = None) -> Dict[str, Any]:
+        key = self.group_key(prepared, rating)
+        with self._lock:
+            self._stats["reviews"] += 1
+            future = self._groups.get(key)
+            owner = future is None
+            if owner:
+                future = self._groups[key] = Future()
+                self._stats["analyses"] += 1
+                self._evict()
+            else:
+                self._groups.move_to_end(key)
+        if owner:
+            try:
+                future.set_result(self._analyze(raw_text, prepared=prepared, rating=rating))
+            except BaseException as exc:
+                # Do not pin a failure on the group: later members retry the analysis.
+                with self._lock:
+                    if self._groups.get(key) is future:
+                        del self._groups[key]
+                future.set_exception(exc)
+        shared = future.result()
+        if owner:
+            return shared
+        analyzed = copy.deepcopy(shared)
+        analyzed["redacted_review"] = prepared.redacted
+        analyzed["pii_found"] = list(prepared.pii_found)
+        return analyzed
+
+    def _evict(self) -> None:
+        """Drops the least recently used completed groups beyond ``window``; call with the lock held."""
+        excess = len(self._groups) - self.window
+        if excess <= 0:
+            return
+        # Oldest first; the front is nearly always completed, so this stops after a few entries.
+        done = []
+        for key, future in self._groups.items():
+            if future.done():
+                done.append(key)
+                if len(done) == excess:
+                    break
+        for key in done:
+            del self._groups[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._groups)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["analyses_saved"] = stats["reviews"] - stats["analyses"]
+        return stats
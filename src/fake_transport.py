@@ -0,0 +1,232 @@
+"""Local stand-in for the Gemini transport, for exercising latency, throttling and retries offline."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import math
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
+
+from llm_scheduler import TransientLLMError, estimate_tokens
+from token_accounting import report_usage
+
+
+LatencySpec = Union[None, float, str, Callable[[random.Random], float]]
+
+
+def make_latency_sampler(spec: LatencySpec) -> Callable[[random.Random], float]:
+    """
+    Builds a latency sampler (seconds) from a spec:
+
+    - ``None`` / ``0``: no latency
+    - a number: fixed latency
+    - ``"fixed:S"``, ``"uniform:LO,HI"``, ``"exponential:MEAN"``, ``"lognormal:MEDIAN,SIGMA"``
+      (lognormal is the usual shape of LLM API latency: a tight body and a long tail)
+    - a callable taking a ``random.Random`` and returning seconds
+    """
+    if spec is None:
+        return lambda rng: 0.0
+    if callable(spec):
+        return spec
+    if isinstance(spec, (int, float)):
+        return lambda rng: float(spec)
+    kind, _, raw_args = spec.partition(":")
+    args = [float(a) for a in raw_args.split(",") if a]
+    if kind == "fixed" and len(args) == 1:
+        return lambda rng: args[0]
+    if kind == "uniform" and len(args) == 2:
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "exponential" and len(args) == 1:
+        return lambda rng: rng.expovariate(1.0 / args[0])
+    if kind == "lognormal" and len(args) == 2:
+        mu = math.log(args[0])
+        return lambda rng: rng.lognormvariate(mu, args[1])
+    raise ValueError(f"Invalid latency spec: {spec!r}")
+
+
+class FakeContextCache:
+    """
+    In-memory stand-in for Gemini's ``CachedContent`` API: cached contents expire after
+    their TTL (on ``clock``), and requests referencing an unknown or expired cache fail.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._contents: Dict[str, Tuple[str, str, float]] = {}  # name -> (system, prefix, expires_at)
+        self.created = 0
+        self.deleted = 0
+
+    def create(self, model: str, system: str, prefix: str, ttl_seconds: float) -> Tuple[str, Optional[int]]:
+        with self._lock:
+            name = f"cachedContents/fake-{next(self._ids)}"
+            self._contents[name] = (system, prefix, self._clock() + ttl_seconds)
+            self.created += 1
+        return name, estimate_tokens(system) + estimate_tokens(prefix)
+
+    def delete(self, name: str) -> None:
+        with self._lock:
+            if self._contents.pop(name, None) is None:
+                raise KeyError(f"{name} not found")
+            self.deleted += 1
+
+    def resolve(self, name: str) -> Tuple[str, str]:
+        """Returns the ``(system, prefix)`` stored under ``name``."""
+        with self._lock:
+            entry = self._contents.get(name)
+            if entry is None or entry[2] <= self._clock():
+                raise ValueError(f"Cached content {name} not found or expired")
+            return entry[0], entry[1]
+
+    def live(self) -> int:
+        """Number of cached contents that have not expired or been deleted."""
+        with self._lock:
+            now = self._clock()
+            return sum(1 for _, _, expires_at in self._contents.values() if expires_at > now)
+
+
+class FakeTransport:
+    """
+    Answers requests with ``responder`` (the dummy LLM by default) after a simulated
+    network latency, and simulates throttling.
+
+    Args:
+        latency: Per-request latency spec, see ``make_latency_sampler``.
+        fail_first: Number of initial requests that fail with ``status`` before any succeed.
+        error_rate: Probability that any later request fails with ``status``.
+        status: HTTP-like status of simulated failures (429 throttling, 503 unavailable, ...).
+        retry_after: Optional server retry hint attached to simulated failures.
+        responder: ``(prompt, system) -> str`` producing successful responses.
+        seed: Seed for the error-rate RNG, for reproducible runs.
+
+        context_cache: Fake context-caching API for cached prompt prefixes (a new
+            ``FakeContextCache`` by default).
+
+    Response schemas are accepted like on Gemini; the last one is kept in
+    ``last_response_schema`` but does not change the response. Requests that reference
+    a cached content are answered as if its system prompt and prefix had been sent
+    inline; ``cached_requests`` counts them. A ``model=`` override is recorded in
+    ``last_model`` and ignored. Token usage is reported like Gemini's usage metadata,
+    from local estimates.
+    """
+
+    supports_response_schema = True
+    supports_model_override = True
+
+    def __init__(
+        self,
+        latency: LatencySpec = None,
+        fail_first: int = 0,
+        error_rate: float = 0.0,
+        status: int = 429,
+        retry_after: Optional[float] = None,
+        responder: Optional[Callable[[str, str], str]] = None,
+        seed: Optional[int] = None,
+        context_cache: Optional[FakeContextCache] = None,
+    ):
+        self.fail_first = fail_first
+        self.error_rate = error_rate
+        self.status = status
+        self.retry_after = retry_after
+        self._responder = responder
+        self._rng = random.Random(seed)
+        self._latency = make_latency_sampler(latency)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.last_response_schema: Optional[Dict[str, Any]] = None
+        self.chunks_streamed = 0
+        self.cached_requests = 0
+        self.last_model: Optional[str] = None
+        self.context_cache_backend = context_cache if context_cache is not None else FakeContextCache()
+
+    @property
+    def model_name(self) -> str:
+        # Keeps fake responses from sharing response-cache entries with the real model.
+        return "fake"
+
+    def _next_request(self) -> Tuple[bool, float]:
+        with self._lock:
+            self.requests += 1
+            fail = self.requests <= self.fail_first or self._rng.random() < self.error_rate
+            if fail:
+                self.failures += 1
+            return fail, max(0.0, self._latency(self._rng))
+
+    def _respond(
+        self, fail: bool, prompt: str, system: str, cached_content: Optional[str] = None, model: Optional[str] = None
+    ) -> str:
+        if fail:
+            raise TransientLLMError(f"Simulated HTTP {self.status}", status=self.status, retry_after=self.retry_after)
+        self.last_model = model
+        cached_tokens = 0
+        if cached_content is not None:
+            system, prefix = self.context_cache_backend.resolve(cached_content)
+            cached_tokens = estimate_tokens(system) + estimate_tokens(prefix)
+            prompt = prefix + prompt
+            with self._lock:
+                self.cached_requests += 1
+        if self._responder is None:
+            from llm_client import dummy_llm_response
+
+            text = dummy_llm_response(prompt, system)
+        else:
+            text = self._responder(prompt, system)
+        report_usage(estimate_tokens(system) + estimate_tokens(prompt), estimate_tokens(text), cached_tokens)
+        return text
+
+    def generate(
+        self,
+        prompt: str,
+        system: str,
+        max_tokens: int,
+        temperature: float,
+        response_schema: Optional[Dict[str, Any]] = None,
+        cached_content: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> str:
+        self.last_response_schema = response_schema
+        fail, delay = self._next_request()
+        if delay:
+            time.sleep(delay)
+        return self._respond(fail, prompt, system, cached_content, model)
+
+    async def agenerate(
+        self,
+        prompt: str,
+        system: str,
+        max_tokens: int,
+        temperature: float,
+        response_schema: Optional[Dict[str, Any]] = None,
+        cached_content: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> str:
+        self.last_response_schema = response_schema
+        fail, delay = self._next_request()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._respond(fail, prompt, system, cached_content, model)
+
+    def generate_stream(
+        self,
+        prompt: str,
+        system: str,
+        max_tokens: int,
+        temperature: float,
+        cached_content: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> Iterator[str]:
+        """Streams the response in word-sized chunks; ``chunks_streamed`` counts those read."""
+        from llm_client import stream_chunks
+
+        fail, delay = self._next_request()
+        if delay:
+            time.sleep(delay)
+        for chunk in stream_chunks(self._respond(fail, prompt, system, cached_content, model)):
+            with self._lock:
+                self.chunks_streamed += 1
+            yield chunk
@@ -0,0 +1,131 @@
+"""Compiled multi-keyword matcher shared by the critical policy and the dummy analyzer.
+
+All keywords are folded into a single trie-shaped regex, so a text is scanned once
+regardless of how many keywords are configured (instead of one substring scan per
+keyword), and each scan position costs at most the length of the longest keyword.
+Matching is case-insensitive substring matching, the same semantics as
+``keyword.lower() in text.lower()``.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple, Union
+
+
+class KeywordHit(NamedTuple):
+    keyword: str
+    start: int
+    end: int
+    labels: FrozenSet[str]
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Builds a regex matching any of ``words``; at a given position the longest word wins."""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A word ending here: try the longer continuations first, then stop.
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Finds every occurrence of a fixed set of keywords in one left-to-right pass.
+
+    Args:
+        terms: Either an iterable of keywords, or a mapping of keyword -> labels, where
+            labels tag the category a keyword belongs to (e.g. ``"sentiment:positive"``).
+            A keyword may carry several labels.
+    """
+
+    def __init__(self, terms: Union[Iterable[str], Mapping[str, Iterable[str]]]):
+        labels: Dict[str, Set[str]] = {}
+        if isinstance(terms, Mapping):
+            for keyword, keyword_labels in terms.items():
+                labels.setdefault(keyword.lower(), set()).update(keyword_labels)
+        else:
+            for keyword in terms:
+                labels.setdefault(keyword.lower(), set())
+        labels.pop("", None)
+
+        self._labels: Dict[str, FrozenSet[str]] = {k: frozenset(v) for k, v in labels.items()}
+        # Shorter keywords that start where a longer one starts are its prefixes; precompute
+        # them so overlapping hits ("not safe" and "not") are all reported.
+        self._prefixes: Dict[str, List[str]] = {
+            k: sorted((p for p in self._labels if k.startswith(p)), key=len, reverse=True) for k in self._labels
+        }
+        self._regex: Optional[re.Pattern] = None
+        self._regex_icase: Optional[re.Pattern] = None
+        if self._labels:
+            body = _trie_pattern(self._labels)
+            self._regex = re.compile(body)
+            self._regex_icase = re.compile(body, re.IGNORECASE)
+
+    @property
+    def keywords(self) -> List[str]:
+        return list(self._labels)
+
+    def _prepare(self, text: str) -> Tuple[Optional[re.Pattern], str]:
+        # Matching lowercased text case-sensitively keeps sre's first-character fast path.
+        # Lowercasing can change the length of a few non-ASCII strings; fall back to
+        # IGNORECASE on the original text there so reported positions stay correct.
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return self._regex, lowered
+        return self._regex_icase, text
+
+    def contains(self, text: str) -> bool:
+        """True if any keyword occurs in ``text``; stops at the first hit."""
+        if self._regex is None:
+            return False
+        regex, subject = self._prepare(text)
+        return regex.search(subject) is not None
+
+    def find_all(self, text: str) -> List[KeywordHit]:
+        """
+        Returns every keyword occurrence, including overlapping ones, ordered by position
+        (longest keyword first for hits sharing a start position).
+        """
+        if self._regex is None:
+            return []
+        regex, subject = self._prepare(text)
+        hits: List[KeywordHit] = []
+        m = regex.search(subject)
+        while m is not None:
+            start = m.start()
+            for keyword in self._prefixes.get(m.group(0).lower(), ()):
+                hits.append(KeywordHit(keyword, start, start + len(keyword), self._labels[keyword]))
+            m = regex.search(subject, start + 1)
+        return hits
+
+    def labels(self, text: str) -> Set[str]:
+        """Union of the labels of all keywords found in ``text``."""
+        found: Set[str] = set()
+        for hit in self.find_all(text):
+            found.update(hit.labels)
+        return found
+
+
+def build_labeled_matcher(tables: Mapping[str, Mapping[str, Iterable[str]]]) -> KeywordMatcher:
+    """
+    Folds keyword tables such as DUMMY_LLM_KEYWORDS (``{"sentiments": {name: [...]}, "issues": {...}}``)
+    into one matcher labeled ``"sentiment:<name>"`` / ``"issue:<name>"``.
+    """
+    terms: Dict[str, Set[str]] = {}
+    for group, label_prefix in (("sentiments", "sentiment"), ("issues", "issue")):
+        for name, keywords in tables.get(group, {}).items():
+            for keyword in keywords:
+                terms.setdefault(keyword, set()).add(f"{label_prefix}:{name}")
+    return KeywordMatcher(terms)
@@ -0,0 +1,224 @@
+"""Content-addressed cache for LLM responses.
+
+Responses are keyed by a SHA-256 of everything that determines the completion
+(model, system prompt, prompt, max_tokens, temperature and any response schema).
+Lookups go through an in-memory LRU tier first and then, optionally, a persistent
+tier (SQLite or a directory of files) so cached results survive across CLI runs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(
+    model: str,
+    system: str,
+    prompt: str,
+    max_tokens: int,
+    temperature: float,
+    response_schema: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Returns a stable hex digest identifying an LLM request."""
+    parts: List[Any] = [model, system, prompt, max_tokens, temperature]
+    if response_schema is not None:
+        parts.append(response_schema)
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU with optional per-entry TTL."""
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class PersistentBackend(Protocol):
+    """Interface for on-disk cache tiers."""
+
+    def get(self, key: str) -> Optional[str]: ...
+
+    def set(self, key: str, value: str) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class SqliteBackend:
+    """Persistent tier backed by a single SQLite file."""
+
+    def __init__(self, path: Union[str, Path], ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds is not None and time.time() - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class DirectoryBackend:
+    """Persistent tier storing one file per key, sharded by key prefix."""
+
+    def __init__(self, path: Union[str, Path], ttl_seconds: Optional[float] = None):
+        self.root = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            if self.ttl_seconds is not None and time.time() - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                return None
+            return path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial file.
+        tmp = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(value, encoding="utf-8")
+        os.replace(tmp, path)
+
+    def close(self) -> None:
+        pass
+
+
+class ResponseCache:
+    """Two-tier (memory, then optional disk) cache with hit/miss statistics."""
+
+    def __init__(self, memory: LRUCache, persistent: Optional[PersistentBackend] = None):
+        self.memory = memory
+        self.persistent = persistent
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        if self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                self._count("disk_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            try:
+                self.persistent.set(key, value)
+            except Exception:
+                logger.exception("Failed to write LLM response to the persistent cache.")
+        self._count("writes")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats: Dict[str, float] = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        return stats
+
+    def close(self) -> None:
+        if self.persistent is not None:
+            self.persistent.close()
+
+
+def build_response_cache(
+    max_entries: int = 10_000,
+    ttl_seconds: Optional[float] = None,
+    path: Optional[Union[str, Path]] = None,
+    backend: str = "sqlite",
+) -> ResponseCache:
+    """
+    Builds a ResponseCache from configuration values.
+
+    Args:
+        max_entries: Capacity of the in-memory LRU tier.
+        ttl_seconds: Entry lifetime for both tiers; ``None`` disables expiry.
+        path: Location of the persistent tier; ``None`` keeps the cache in memory only.
+        backend: ``"sqlite"`` (``path`` is a database file) or ``"directory"``.
+    """
+    persistent: Optional[PersistentBackend] = None
+    if path:
+        if backend == "sqlite":
+            persistent = SqliteBackend(path, ttl_seconds)
+        elif backend == "directory":
+            persistent = DirectoryBackend(path, ttl_seconds)
+        else:
+            raise ValueError(f"Unknown LLM cache backend: {backend!r}")
+    return ResponseCache(LRUCache(max_entries, ttl_seconds), persistent)
@@ -1,49 +1,720 @@
 """LLM client wrapper with a dummy fallback for tests."""
 from __future__ import annotations
 
+import asyncio
 import json
 import os
-from typing import Any, Dict, Optional
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
 import logging
 
-from config import GOOGLE_API_KEY, USE_REAL_LLM, LLM_MODEL, DUMMY_LLM_KEYWORDS
+from config import (
+    GOOGLE_API_KEY,
+    USE_REAL_LLM,
+    LLM_MODEL,
+    DUMMY_LLM_KEYWORDS,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_BACKEND,
+    LLM_CACHE_PATH,
+    LLM_SCHEDULER,
+    CONTEXT_CACHE,
+    CONTEXT_CACHE_ENABLED,
+    CONTEXT_CACHE_MIN_PREFIX_TOKENS,
+    CONTEXT_CACHE_TTL_SECONDS,
+)
+from context_cache import ContextCacheManager, prefix_digest
+from keyword_matcher import build_labeled_matcher
+from llm_cache import ResponseCache, build_response_cache, make_cache_key
+from llm_scheduler import LLMScheduler, LLMUnavailableError, estimate_tokens
+from metrics import stage
+from token_accounting import CallMeter, meter_call, report_usage
 from utils import escape_brackets
 
 logger = logging.getLogger(__name__)
 
 
-def call_llm(prompt: str, system: str = "", max_tokens: int = 400) -> str:
+# We handle safety via input sanitization; prevent Gemini from blocking valid reviews.
+_SAFETY_SETTINGS = {
+    "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
+    "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
+    "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
+    "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
+}
+
+
+class ModelCache:
     """
-    Calls the configured LLM. If USE_REAL_LLM is False, uses a deterministic dummy.
-    The function returns the raw text response from the LLM.
+    Thread-safe cache of configured ``GenerativeModel`` objects.
+
+    ``genai.configure`` runs once per API key and models are keyed by
+    (model, system prompt, generation config, cached content). Reusing a model also
+    reuses the underlying client and its HTTP/gRPC connection instead of rebuilding both
+    per call.
     """
-    if USE_REAL_LLM:
-        try:
-            # JIT (Just-In-Time) import and configuration
-            import google.generativeai as genai
 
-            if not GOOGLE_API_KEY:
-                raise ValueError("GOOGLE_API_KEY is not set, but USE_REAL_LLM is true.")
+    def __init__(self, maxsize: int = 64):
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._models: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+        self._configured_key: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
 
+    def sdk(self) -> Any:
+        """Returns the ``google.generativeai`` module, configured with the current API key."""
+        with self._lock:
+            return self._sdk()
+
+    def _sdk(self) -> Any:
+        # JIT (Just-In-Time) import and configuration
+        import google.generativeai as genai
+
+        if self._configured_key != GOOGLE_API_KEY:
             genai.configure(api_key=GOOGLE_API_KEY)
+            self._configured_key = GOOGLE_API_KEY
+        return genai
+
+    def get(
+        self,
+        model_name: str,
+        system: str,
+        generation_config: Dict[str, Any],
+        cached_content: Optional[str] = None,
+    ) -> Any:
+        # JSON, because a response schema in the generation config is a nested dict.
+        key = (model_name, system, json.dumps(generation_config, sort_keys=True), cached_content)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return model
+            self.misses += 1
+            genai = self._sdk()
+            if cached_content is not None:
+                # The system prompt is part of the cached content.
+                model = genai.GenerativeModel.from_cached_content(
+                    cached_content,
+                    safety_settings=_SAFETY_SETTINGS,
+                    generation_config=generation_config,
+                )
+            else:
+                model = genai.GenerativeModel(
+                    model_name,
+                    system_instruction=system,
+                    safety_settings=_SAFETY_SETTINGS,
+                    generation_config=generation_config,
+                )
+            self._models[key] = model
+            if len(self._models) > self._maxsize:
+                self._models.popitem(last=False)
+            return model
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._models)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self._configured_key = None
+            self.hits = self.misses = 0
+
+
+_model_cache = ModelCache()
+
+
+def get_model_cache_stats() -> Dict[str, int]:
+    """Returns hit/miss counters of the shared Gemini model cache."""
+    return _model_cache.stats()
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_ready = False
+_response_cache_lock = threading.RLock()
+
 
-            model = genai.GenerativeModel(
-                LLM_MODEL,
-                system_instruction=system,
-                # We handle safety via input sanitization; prevent Gemini from blocking valid reviews.
-                safety_settings={'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE', 'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE', 'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE', 'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE'}
+def configure_response_cache(path: Optional[str] = None, enabled: Optional[bool] = None) -> Optional[ResponseCache]:
+    """
+    (Re)builds the shared LLM response cache from config, optionally overriding the
+    persistent path or disabling the cache entirely. Returns the active cache.
+    """
+    global _response_cache, _response_cache_ready
+    with _response_cache_lock:
+        if _response_cache is not None:
+            _response_cache.close()
+        _response_cache = None
+        if LLM_CACHE_ENABLED if enabled is None else enabled:
+            _response_cache = build_response_cache(
+                max_entries=LLM_CACHE_MAX_ENTRIES,
+                ttl_seconds=LLM_CACHE_TTL_SECONDS or None,
+                path=path if path is not None else LLM_CACHE_PATH,
+                backend=LLM_CACHE_BACKEND,
             )
-            response = model.generate_content(prompt, generation_config={"max_output_tokens": max_tokens, "temperature": 0.7})
-            return response.text
-        except ImportError:
-            logger.error("google-generativeai is not installed. Please run 'pip install google-generativeai'")
-        except ValueError as e:
-            logger.error(e)
-        except Exception as e:
-            logger.exception("Error calling the Gemini API. Falling back to dummy response.")
+        _response_cache_ready = True
+        return _response_cache
+
+
+def _get_response_cache() -> Optional[ResponseCache]:
+    if not _response_cache_ready:
+        with _response_cache_lock:
+            if not _response_cache_ready:
+                configure_response_cache()
+    return _response_cache
+
+
+def get_response_cache_stats() -> Dict[str, float]:
+    """Returns statistics of the shared LLM response cache (empty if disabled)."""
+    cache = _response_cache
+    return cache.stats() if cache is not None else {}
+
+
+def _generation_config(max_tokens: int, temperature: float, response_schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    config: Dict[str, Any] = {"max_output_tokens": max_tokens, "temperature": temperature}
+    if response_schema is not None:
+        # Schema-constrained decoding: the model can only emit JSON matching the schema.
+        config["response_mime_type"] = "application/json"
+        config["response_schema"] = response_schema
+    return config
+
+
+class GeminiContextCache:
+    """Creates and deletes Gemini ``CachedContent`` objects holding a static prompt prefix."""
+
+    def create(self, model: str, system: str, prefix: str, ttl_seconds: float) -> Tuple[str, Optional[int]]:
+        import datetime
+
+        _model_cache.sdk()
+        from google.generativeai import caching
+
+        cached = caching.CachedContent.create(
+            model=model if model.startswith("models/") else f"models/{model}",
+            display_name=f"crira-{prefix_digest(model, system, prefix)[:16]}",
+            system_instruction=system or None,
+            contents=[prefix] if prefix else None,
+            ttl=datetime.timedelta(seconds=ttl_seconds),
+        )
+        usage = getattr(cached, "usage_metadata", None)
+        return cached.name, getattr(usage, "total_token_count", None)
+
+    def delete(self, name: str) -> None:
+        _model_cache.sdk()
+        from google.generativeai import caching
+
+        caching.CachedContent.get(name).delete()
+
+
+def _report_gemini_usage(response: Any) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        report_usage(
+            usage.prompt_token_count,
+            usage.candidates_token_count,
+            getattr(usage, "cached_content_token_count", 0) or 0,
+        )
+
+
+class GeminiTransport:
+    """Sends a request to Gemini using a cached, pre-configured model."""
+
+    supports_response_schema = True
+    supports_model_override = True
+    context_cache_backend = GeminiContextCache()
+
+    @property
+    def model_name(self) -> str:
+        return LLM_MODEL
+
+    def generate(
+        self,
+        prompt: str,
+        system: str,
+        max_tokens: int,
+        temperature: float,
+        response_schema: Optional[Dict[str, Any]] = None,
+        cached_content: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> str:
+        gemini = _model_cache.get(
+            model or LLM_MODEL, system, _generation_config(max_tokens, temperature, response_schema), cached_content
+        )
+        response = gemini.generate_content(prompt)
+        _report_gemini_usage(response)
+        return response.text
+
+    async def agenerate(
+        self,
+        prompt: str,
+        system: str,
+        max_tokens: int,
+        temperature: float,
+        response_schema: Optional[Dict[str, Any]] = None,
+        cached_content: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> str:
+        gemini = _model_cache.get(
+            model or LLM_MODEL, system, _generation_config(max_tokens, temperature, response_schema), cached_content
+        )
+        response = await gemini.generate_content_async(prompt)
+        _report_gemini_usage(response)
+        return response.text
+
+    def generate_stream(
+        self,
+        prompt: str,
+        system: str,
+        max_tokens: int,
+        temperature: float,
+        cached_content: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> Iterator[str]:
+        gemini = _model_cache.get(
+            model or LLM_MODEL, system, _generation_config(max_tokens, temperature, None), cached_content
+        )
+        for chunk in gemini.generate_content(prompt, stream=True):
+            yield chunk.text
+
+
+_GEMINI_TRANSPORT = GeminiTransport()
+# When set (e.g. to a FakeTransport), used instead of Gemini regardless of USE_REAL_LLM.
+_transport: Optional[Any] = None
+_scheduler = LLMScheduler.from_config(LLM_SCHEDULER)
+_context_cache: Optional[ContextCacheManager] = (
+    ContextCacheManager(
+        ttl_seconds=CONTEXT_CACHE_TTL_SECONDS,
+        refresh_margin_seconds=CONTEXT_CACHE.get("REFRESH_MARGIN_SECONDS", 60),
+        min_tokens=CONTEXT_CACHE_MIN_PREFIX_TOKENS,
+        cached_token_price_ratio=CONTEXT_CACHE.get("CACHED_TOKEN_PRICE_RATIO", 0.25),
+    )
+    if CONTEXT_CACHE_ENABLED
+    else None
+)
+
+
+def set_transport(transport: Optional[Any]) -> None:
+    """
+    Routes LLM calls through ``transport`` (an object with ``generate(prompt, system,
+    max_tokens, temperature) -> str`` and optionally an async ``agenerate`` with the same
+    signature), or back to the configured backend with ``None``. Transports with a true
+    ``supports_response_schema`` attribute also get a ``response_schema=`` keyword when
+    the caller asks for schema-constrained JSON. Transports with a ``context_cache_backend``
+    (see ``context_cache``) get ``cached_content=<name>`` and only the variable part of the
+    prompt when the static system prompt and prefix are served from a context cache.
+    Transports with a true ``supports_model_override`` get ``model=`` inside
+    ``llm_overrides(model=...)``. Transports may report the provider's token usage with
+    ``token_accounting.report_usage``; otherwise it is estimated.
+    """
+    global _transport
+    _transport = transport
+
+
+def set_scheduler(scheduler: LLMScheduler) -> None:
+    """Replaces the shared request scheduler (rate limits, retries, circuit breaker)."""
+    global _scheduler
+    _scheduler = scheduler
+
+
+def get_scheduler_stats() -> Dict[str, Any]:
+    """Returns retry/throttling counters and circuit state of the shared scheduler."""
+    return _scheduler.stats()
+
+
+class _Overrides(NamedTuple):
+    model: Optional[str] = None
+    max_tokens_ratio: float = 1.0
+
+
+_overrides: ContextVar[_Overrides] = ContextVar("llm_overrides", default=_Overrides())
+_MIN_MAX_TOKENS = 64
+
+
+@contextmanager
+def llm_overrides(model: Optional[str] = None, max_tokens_ratio: float = 1.0) -> Iterator[None]:
+    """
+    Within the block, LLM calls use ``model`` instead of the configured one (on transports
+    that support it) and ``max_tokens_ratio`` of their requested ``max_tokens``, to spend
+    fewer tokens, e.g. when a run's token budget runs low.
+    """
+    token = _overrides.set(_Overrides(model, max_tokens_ratio))
+    try:
+        yield
+    finally:
+        _overrides.reset(token)
+
+
+def _dispatch(transport: Any, max_tokens: int) -> Tuple[str, int, Dict[str, Any]]:
+    """Model name, ``max_tokens`` and transport keywords for a call, after ``llm_overrides``."""
+    overrides = _overrides.get()
+    model = getattr(transport, "model_name", LLM_MODEL)
+    kwargs: Dict[str, Any] = {}
+    if overrides.model and getattr(transport, "supports_model_override", False):
+        model = kwargs["model"] = overrides.model
+    if overrides.max_tokens_ratio < 1:
+        max_tokens = max(min(max_tokens, _MIN_MAX_TOKENS), int(max_tokens * overrides.max_tokens_ratio))
+    return model, max_tokens, kwargs
+
+
+def set_context_cache(manager: Optional[ContextCacheManager]) -> None:
+    """Replaces the shared prompt-prefix context cache manager; None disables context caching."""
+    global _context_cache
+    _context_cache = manager
+
+
+def get_context_cache_stats() -> Dict[str, float]:
+    """Returns context-cache counters, including billed input tokens saved (empty if disabled)."""
+    manager = _context_cache
+    return manager.stats() if manager is not None else {}
+
+
+def clear_context_caches() -> None:
+    """Deletes the provider-side caches created so far, e.g. at the end of a run."""
+    manager = _context_cache
+    if manager is not None:
+        manager.clear()
+
+
+def _cache_lookup(
+    model: str,
+    prompt: str,
+    system: str,
+    max_tokens: int,
+    temperature: float,
+    response_schema: Optional[Dict[str, Any]],
+):
+    """Returns ``(cache, key, cached_text)``; cache is None when caching is disabled."""
+    cache = _get_response_cache()
+    key = make_cache_key(model, system, prompt, max_tokens, temperature, response_schema)
+    cached = None
+    if cache is not None:
+        with stage("llm.cache_lookup"):
+            cached = cache.get(key)
+    return cache, key, cached
+
+
+def _schema_kwargs(transport: Any, response_schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if response_schema is not None and getattr(transport, "supports_response_schema", False):
+        return {"response_schema": response_schema}
+    return {}
+
+
+def _request_parts(transport: Any, model: str, prompt: str, system: str, prefix: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Returns the prompt to send and the extra transport keywords. When ``system`` and
+    ``prefix`` are in a context cache, only ``prompt`` is sent, with a reference to the
+    cache; otherwise the prefix is sent inline.
+    """
+    manager = _context_cache
+    backend = getattr(transport, "context_cache_backend", None)
+    if manager is not None and backend is not None and (system or prefix):
+        with stage("llm.context_cache"):
+            name = manager.get(backend, model, system, prefix)
+        if name is not None:
+            return prompt, {"cached_content": name}
+    return prefix + prompt, {}
+
+
+def _generate(
+    transport: Any,
+    prompt: str,
+    system: str,
+    max_tokens: int,
+    temperature: float,
+    response_schema: Optional[Dict[str, Any]] = None,
+    prefix: str = "",
+) -> str:
+    model, max_tokens, kwargs = _dispatch(transport, max_tokens)
+    cache, key, cached = _cache_lookup(model, prefix + prompt, system, max_tokens, temperature, response_schema)
+    if cached is not None:
+        return cached
+
+    request_prompt, cache_kwargs = _request_parts(transport, model, prompt, system, prefix)
+    kwargs.update(cache_kwargs, **_schema_kwargs(transport, response_schema))
+    prompt_tokens = estimate_tokens(system) + estimate_tokens(prefix + prompt)
+    with stage("llm.transport"), meter_call(model, prompt_tokens) as meter:
+        text = _scheduler.call(
+            lambda: transport.generate(request_prompt, system, max_tokens, temperature, **kwargs),
+            estimated_tokens=prompt_tokens + max_tokens,
+        )
+    meter.finish(text)
+    if cache is not None:
+        cache.set(key, text)
+    return text
+
+
+async def _agenerate(
+    transport: Any,
+    prompt: str,
+    system: str,
+    max_tokens: int,
+    temperature: float,
+    response_schema: Optional[Dict[str, Any]] = None,
+    prefix: str = "",
+) -> str:
+    model, max_tokens, kwargs = _dispatch(transport, max_tokens)
+    cache, key, cached = _cache_lookup(model, prefix + prompt, system, max_tokens, temperature, response_schema)
+    if cached is not None:
+        return cached
+
+    agenerate = getattr(transport, "agenerate", None)
+    if agenerate is None:
+        # Transport without an async path: keep the event loop free by using a worker thread.
+        def agenerate(*args: Any, **kwargs: Any) -> Any:
+            return asyncio.to_thread(transport.generate, *args, **kwargs)
+
+    # In a worker thread: creating or refreshing a context cache is a blocking API call.
+    request_prompt, cache_kwargs = await asyncio.to_thread(_request_parts, transport, model, prompt, system, prefix)
+    kwargs.update(cache_kwargs, **_schema_kwargs(transport, response_schema))
+    prompt_tokens = estimate_tokens(system) + estimate_tokens(prefix + prompt)
+    with stage("llm.transport"), meter_call(model, prompt_tokens) as meter:
+        text = await _scheduler.acall(
+            lambda: agenerate(request_prompt, system, max_tokens, temperature, **kwargs),
+            estimated_tokens=prompt_tokens + max_tokens,
+        )
+    meter.finish(text)
+    if cache is not None:
+        cache.set(key, text)
+    return text
+
+
+_STREAM_CHUNK_RE = re.compile(r"\S+\s*|\s+")
+
+
+def stream_chunks(text: str) -> List[str]:
+    """Splits ``text`` into word-sized chunks, to replay a complete text as a stream."""
+    return _STREAM_CHUNK_RE.findall(text)
+
+
+def _generate_stream(
+    transport: Any, prompt: str, system: str, max_tokens: int, temperature: float, prefix: str = ""
+) -> Iterator[str]:
+    """
+    Starts a streamed completion and returns an iterator over its remaining chunks.
+
+    The request is started eagerly, up to its first chunk, under the scheduler, so rate
+    limits, retries and the circuit breaker apply to it as to ``_generate``. A failure after
+    the first chunk cannot be retried without repeating output and raises LLMUnavailableError.
+    """
+    generate_stream = getattr(transport, "generate_stream", None)
+    if generate_stream is None:
+        return iter(stream_chunks(_generate(transport, prompt, system, max_tokens, temperature, prefix=prefix)))
+    model, max_tokens, kwargs = _dispatch(transport, max_tokens)
+    cache, key, cached = _cache_lookup(model, prefix + prompt, system, max_tokens, temperature, None)
+    if cached is not None:
+        return iter(stream_chunks(cached))
+
+    request_prompt, cache_kwargs = _request_parts(transport, model, prompt, system, prefix)
+    kwargs.update(cache_kwargs)
+
+    def start() -> Tuple[Iterator[str], Optional[str]]:
+        chunks = iter(generate_stream(request_prompt, system, max_tokens, temperature, **kwargs))
+        return chunks, next(chunks, None)
+
+    # Streams are metered by estimate, when they end.
+    meter = CallMeter(model, estimate_tokens(system) + estimate_tokens(prefix + prompt))
+    with stage("llm.first_chunk"):
+        chunks, first = _scheduler.call(start, estimated_tokens=meter.prompt_tokens + max_tokens)
+    return _relay_stream(chunks, first, cache, key, meter)
+
+
+def _relay_stream(
+    chunks: Iterator[str], first: Optional[str], cache: Optional[ResponseCache], key: str, meter: CallMeter
+) -> Iterator[str]:
+    parts: List[str] = []
+    try:
+        if first is not None:
+            parts.append(first)
+            yield first
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+    except Exception as e:
+        raise LLMUnavailableError(f"LLM stream failed after {len(parts)} chunks: {e}") from e
+    finally:
+        # Also runs when the consumer stops early: releases the underlying stream.
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+        meter.finish("".join(parts))
+    # Only a completion read to the end is cached.
+    if cache is not None:
+        cache.set(key, "".join(parts))
+
+
+def _resolve_transport() -> Optional[Any]:
+    transport = _transport
+    if transport is None and USE_REAL_LLM:
+        transport = _GEMINI_TRANSPORT
+    if transport is _GEMINI_TRANSPORT and not GOOGLE_API_KEY:
+        raise ValueError("GOOGLE_API_KEY is not set, but USE_REAL_LLM is true.")
+    return transport
+
+
+def call_llm(
+    prompt: str,
+    system: str = "",
+    max_tokens: int = 400,
+    temperature: float = 0.7,
+    response_schema: Optional[Dict[str, Any]] = None,
+    prefix: str = "",
+) -> str:
+    """
+    Calls the configured LLM. If USE_REAL_LLM is False, uses a deterministic dummy.
+    The function returns the raw text response from the LLM.
+
+    With ``response_schema`` (see ``structured_output``), the request asks for JSON
+    constrained to that schema, on transports that support it.
+
+    ``prefix`` is the static start of the prompt (e.g. a few-shot block); the model sees
+    ``prefix + prompt``. With context caching enabled, ``system`` and ``prefix`` are
+    stored on the provider once and referenced by each request instead of resent.
+
+    Requests go through the shared scheduler: rate limits are respected, and throttling
+    or server errors are retried with backoff. If the LLM stays unavailable,
+    LLMUnavailableError is raised rather than answering with a canned dummy reply.
+    Other errors (missing SDK or key, bad request) still fall back to the dummy.
+
+    Successful real-LLM responses are stored in the response cache; dummy output,
+    including the fallback after an API error, is never cached.
+    """
+    try:
+        transport = _resolve_transport()
+        if transport is not None:
+            return _generate(transport, prompt, system, max_tokens, temperature, response_schema, prefix)
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        _log_llm_error(e)
 
     # Dummy deterministic behaviour for testing and offline runs
-    return dummy_llm_response(prompt, system)
+    return _metered_dummy(prefix + prompt, system)
+
+
+async def acall_llm(
+    prompt: str,
+    system: str = "",
+    max_tokens: int = 400,
+    temperature: float = 0.7,
+    timeout: Optional[float] = None,
+    response_schema: Optional[Dict[str, Any]] = None,
+    prefix: str = "",
+) -> str:
+    """
+    Async ``call_llm`` with the same caching, scheduling and dummy-fallback semantics.
+
+    Uses the SDK's async generation path (``generate_content_async``), so thousands of
+    calls can be awaited concurrently on one event loop. Cancelling the awaiting task
+    cancels the request. If the call does not finish within ``timeout`` seconds
+    (including rate-limit waits and retries), LLMUnavailableError is raised, as for
+    any other unavailability.
+    """
+    try:
+        transport = _resolve_transport()
+        if transport is not None:
+            coro = _agenerate(transport, prompt, system, max_tokens, temperature, response_schema, prefix)
+            return await (asyncio.wait_for(coro, timeout) if timeout is not None else coro)
+    except LLMUnavailableError:
+        raise
+    except TimeoutError as e:
+        raise LLMUnavailableError(f"LLM request timed out after {timeout}s") from e
+    except Exception as e:
+        _log_llm_error(e)
+
+    return _metered_dummy(prefix + prompt, system)
+
+
+def call_llm_stream(
+    prompt: str, system: str = "", max_tokens: int = 400, temperature: float = 0.7, prefix: str = ""
+) -> Iterator[str]:
+    """
+    Streaming ``call_llm``: returns an iterator over the response text in chunks, as the
+    model produces them, so callers can start forwarding output before it is complete.
+
+    The request is sent, and the first chunk awaited, before this function returns, so
+    LLMUnavailableError and the dummy fallback behave as in ``call_llm``. Closing the
+    iterator early (e.g. after a policy violation) stops reading the completion. A
+    fully read real-LLM completion is cached; cached responses and transports without
+    ``generate_stream`` are replayed in word-sized chunks.
+    """
+    try:
+        transport = _resolve_transport()
+        if transport is not None:
+            return _generate_stream(transport, prompt, system, max_tokens, temperature, prefix)
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        _log_llm_error(e)
+
+    return iter(stream_chunks(_metered_dummy(prefix + prompt, system)))
+
+
+def _metered_dummy(prompt: str, system: str) -> str:
+    with stage("llm.dummy"):
+        text = dummy_llm_response(prompt, system)
+    # Estimated as if a real model had answered, so budgets behave the same offline.
+    CallMeter("dummy", estimate_tokens(system) + estimate_tokens(prompt)).finish(text)
+    return text
+
+
+def _log_llm_error(e: Exception) -> None:
+    if isinstance(e, ImportError):
+        logger.error("google-generativeai is not installed. Please run 'pip install google-generativeai'")
+    elif isinstance(e, ValueError):
+        logger.error(e)
+    else:
+        logger.exception("Error calling the Gemini API. Falling back to dummy response.")
+
+
+_DUMMY_KEYWORD_MATCHER = build_labeled_matcher(DUMMY_LLM_KEYWORDS)
+
+
+def _dummy_analysis(review_text: str) -> Dict[str, Any]:
+    """Keyword-based stand-in for the analysis JSON the real LLM would return."""
+    labels = _DUMMY_KEYWORD_MATCHER.labels(review_text)
+
+    # simulate analysis JSON
+    sentiment = "neutral"
+    if "sentiment:positive" in labels:
+        sentiment = "positive"
+    if "sentiment:negative" in labels:
+        sentiment = "negative"
+
+    issues = [issue for issue in DUMMY_LLM_KEYWORDS.get("issues", {}) if f"issue:{issue}" in labels]
+    if sentiment == "positive":
+        issues.append("good product quality")
+    summary = "Customer feedback: " + (" ".join(issues) if issues else "general feedback.")
+    return {
+        "sentiment": sentiment,
+        "key_issues_praise": issues,
+        "summary": summary[:250],
+    }
+
+
+def _dummy_batch_analysis(prompt: str) -> str:
+    """Answers a batched analysis prompt with one JSON object per 'Review <id>: "<text>"' line."""
+    body = prompt.split("\nReviews:\n")[-1]
+    out = []
+    for m in re.finditer(r'^Review (\S+): "(.*)"$', body, flags=re.MULTILINE):
+        review_id, text = m.groups()
+        if "__DUMMY_ERROR_" in text:
+            # Simulate the model dropping an item so callers exercise their per-item fallback.
+            logger.info("Dummy LLM: Omitting batch item %s.", review_id)
+            continue
+        out.append({"id": review_id, **_dummy_analysis(text)})
+    return json.dumps(out)
+
+
+def _dummy_repair(prompt: str) -> str:
+    """Answers a targeted repair prompt with only the keys listed on its 'Missing keys:' line."""
+    match = re.search(r"^Missing keys: (.*)$", prompt, flags=re.MULTILINE)
+    keys = [k.strip() for k in match.group(1).split(",")] if match else []
+    analysis = _dummy_analysis(prompt.split("Review:")[-1])
+    return json.dumps({k: analysis[k] for k in keys if k in analysis})
 
 
 def dummy_llm_response(prompt: str, system: str) -> str:
@@ -51,6 +722,11 @@ def dummy_llm_response(prompt: str, system: str) -> str:
     A deterministic placeholder that simulates LLM behavior, including common failure modes for testing.
     It can be triggered to produce specific errors by including special strings in the prompt.
     """
+    if "output only a json array" in system.lower():
+        return _dummy_batch_analysis(prompt)
+    if "completing a partial analysis" in system.lower():
+        return _dummy_repair(prompt)
+
     # --- Error Simulation Triggers for Testing ---
     # These allow tests to verify the application's error handling.
     if "__DUMMY_ERROR_MALFORMED_JSON__" in prompt:
@@ -76,31 +752,7 @@ def dummy_llm_response(prompt: str, system: str) -> str:
             # Split on "Review:" and take the last part, which is the actual review.
             review_text_to_analyze = prompt.split("Review:")[-1]
 
-        text_lower = review_text_to_analyze.lower()
-
-        sentiment_keywords = DUMMY_LLM_KEYWORDS.get("sentiments", {})
-        issue_keywords = DUMMY_LLM_KEYWORDS.get("issues", {})
-
-        # simulate analysis JSON
-        sentiment = "neutral"
-        if any(w in text_lower for w in sentiment_keywords.get("positive", [])):
-            sentiment = "positive"
-        if any(w in text_lower for w in sentiment_keywords.get("negative", [])):
-            sentiment = "negative"
-
-        issues = []
-        for issue, keywords in issue_keywords.items():
-            if any(w in text_lower for w in keywords):
-                issues.append(issue)
-        if sentiment == "positive":
-            issues.append("good product quality")
-        summary = "Customer feedback: " + (" ".join(issues) if issues else "general feedback.")
-        out = {
-            "sentiment": sentiment,
-            "key_issues_praise": issues,
-            "summary": summary[:250],
-        }
-        return json.dumps(out)
+        return json.dumps(_dummy_analysis(review_text_to_analyze))
 
     text_lower = prompt.lower()
     # Response generation dummy
@@ -0,0 +1,328 @@
+"""Request scheduling for LLM calls: rate limiting, retries with backoff, and a circuit breaker.
+
+A single LLMScheduler is shared by every caller of ``call_llm`` (including concurrent
+workers). It spaces requests to stay under requests-per-minute and tokens-per-minute
+limits, retries throttling (429) and server (5xx) errors with jittered exponential
+backoff within a retry budget, and stops calling a failing backend altogether while
+its circuit is open.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+# google.api_core exception class names, for errors that do not carry a usable status code
+_RETRYABLE_ERROR_NAMES = frozenset(
+    {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError", "DeadlineExceeded"}
+)
+
+
+class TransientLLMError(Exception):
+    """A retryable LLM failure (throttling or server error)."""
+
+    def __init__(self, message: str, status: int = 503, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.code = status
+        self.retry_after = retry_after
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when the LLM cannot be reached: retries exhausted, retry budget spent, or circuit open."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True for throttling/server errors from Gemini (google.api_core) or a fake transport."""
+    code = getattr(exc, "code", None)
+    try:
+        if code is not None and int(code) in RETRYABLE_STATUS_CODES:
+            return True
+    except (TypeError, ValueError):
+        pass
+    return type(exc).__name__ in _RETRYABLE_ERROR_NAMES
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used when the provider does not report usage."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at ``rate_per_minute``.
+
+    ``reserve`` always grants the request but may drive the balance negative; the
+    returned wait is how long the caller must sleep before proceeding, which queues
+    concurrent callers fairly instead of letting them spin.
+    """
+
+    def __init__(
+        self, rate_per_minute: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic
+    ):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of successful traffic, so a degraded backend is not hit
+    with a retry storm. Each success earns ``ratio`` retries, up to ``max_retries`` banked.
+    """
+
+    def __init__(self, ratio: float = 0.2, max_retries: float = 20.0):
+        self.ratio = ratio
+        self.max_retries = max_retries
+        self._balance = max_retries
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._balance = min(self.max_retries, self._balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive transient failures and rejects calls for
+    ``reset_seconds``; then lets a single trial call through (half-open) and closes on success.
+    """
+
+    def __init__(
+        self, failure_threshold: int = 5, reset_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        return self.admit() is not None
+
+    def admit(self) -> Optional[str]:
+        """Admits a call: ``"closed"``, ``"trial"`` if it is the half-open trial, or None if rejected."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return "closed"
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return "trial"
+            return None
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def abandon(self) -> None:
+        """Releases a half-open trial whose call was cancelled before it produced a health signal."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            failed_trial = self._trial_in_flight
+            self._trial_in_flight = False
+            if failed_trial or (self._opened_at is None and self._failures >= self.failure_threshold):
+                logger.warning("LLM circuit breaker opened after %d consecutive failures.", self._failures)
+                self._opened_at = self._clock()
+
+
+class LLMScheduler:
+    """
+    Runs LLM requests under shared rate limits, retry policy and circuit breaker.
+
+    Args:
+        requests_per_minute: Request rate limit; ``0`` disables it.
+        tokens_per_minute: Token rate limit (prompt + max output tokens); ``0`` disables it.
+        max_attempts: Attempts per request, including the first one.
+        backoff_base_seconds / backoff_max_seconds: Full-jitter exponential backoff bounds.
+        retry_budget_ratio / retry_budget_max: See RetryBudget.
+        circuit_failure_threshold / circuit_reset_seconds: See CircuitBreaker.
+        sleep, clock, rng: Injectable for tests.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_attempts: int = 5,
+        backoff_base_seconds: float = 0.5,
+        backoff_max_seconds: float = 30.0,
+        retry_budget_ratio: float = 0.2,
+        retry_budget_max: float = 20.0,
+        circuit_failure_threshold: int = 5,
+        circuit_reset_seconds: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute, clock=clock) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute, clock=clock) if tokens_per_minute else None
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base_seconds
+        self.backoff_max = backoff_max_seconds
+        self.budget = RetryBudget(retry_budget_ratio, retry_budget_max)
+        self.breaker = CircuitBreaker(circuit_failure_threshold, circuit_reset_seconds, clock=clock)
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "retries": 0, "transient_errors": 0, "rate_limited_waits": 0, "rejected": 0}
+
+    @classmethod
+    def from_config(cls, settings: Dict[str, Any], **overrides: Any) -> "LLMScheduler":
+        """Builds a scheduler from the LLM_SCHEDULER config section (lower-cased keys)."""
+        kwargs = {key.lower(): value for key, value in settings.items()}
+        kwargs.update(overrides)
+        return cls(**kwargs)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        stats["circuit"] = self.breaker.state
+        return stats
+
+    def admission_delay(self, estimated_tokens: int) -> float:
+        """Reserves rate-limit capacity for one request and returns how long to wait first."""
+        wait = 0.0
+        if self.request_bucket is not None:
+            wait = self.request_bucket.reserve(1)
+        if self.token_bucket is not None:
+            wait = max(wait, self.token_bucket.reserve(estimated_tokens))
+        return wait
+
+    def backoff_delay(self, attempt: int, exc: BaseException) -> float:
+        """Full-jitter exponential backoff, honouring a server-provided retry-after if larger."""
+        delay = self._rng.uniform(0, min(self.backoff_max, self.backoff_base * (2**attempt)))
+        retry_after = getattr(exc, "retry_after", None)
+        return max(delay, retry_after) if retry_after else delay
+
+    def _check_circuit(self) -> bool:
+        """Raises LLMUnavailableError if the breaker rejects the call; returns whether it is the half-open trial."""
+        admission = self.breaker.admit()
+        if admission is None:
+            self._count("rejected")
+            raise LLMUnavailableError("LLM circuit breaker is open; not sending request.")
+        return admission == "trial"
+
+    def _rate_limit_wait(self, estimated_tokens: int) -> float:
+        wait = self.admission_delay(estimated_tokens)
+        if wait > 0:
+            self._count("rate_limited_waits")
+        return wait
+
+    def _on_error(self, attempt: int, exc: Exception) -> float:
+        """
+        Classifies a failed attempt: re-raises non-retryable errors, raises LLMUnavailableError
+        when no retry is allowed, and otherwise returns the backoff before the next attempt.
+        """
+        if not is_retryable(exc):
+            self.breaker.record_success()  # the backend answered; not a health signal
+            raise exc
+        self._count("transient_errors")
+        self.breaker.record_failure()
+        if attempt + 1 >= self.max_attempts:
+            raise LLMUnavailableError(f"LLM request failed after {attempt + 1} attempts: {exc}") from exc
+        if not self.budget.withdraw():
+            raise LLMUnavailableError(f"LLM retry budget exhausted: {exc}") from exc
+        delay = self.backoff_delay(attempt, exc)
+        logger.warning("Transient LLM error (%s); retrying in %.2fs (attempt %d).", exc, delay, attempt + 2)
+        self._count("retries")
+        return delay
+
+    def _on_success(self) -> None:
+        self.breaker.record_success()
+        self.budget.deposit()
+
+    def call(self, fn: Callable[[], T], estimated_tokens: int = 1) -> T:
+        """
+        Runs ``fn`` under the scheduler's limits. Non-retryable exceptions propagate
+        unchanged; transient ones are retried and finally surface as LLMUnavailableError.
+        """
+        self._count("calls")
+        for attempt in range(self.max_attempts):
+            self._check_circuit()
+            wait = self._rate_limit_wait(estimated_tokens)
+            if wait > 0:
+                self._sleep(wait)
+            try:
+                result = fn()
+            except Exception as exc:
+                self._sleep(self._on_error(attempt, exc))
+                continue
+            self._on_success()
+            return result
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], estimated_tokens: int = 1) -> T:
+        """
+        Async ``call``: waits with ``asyncio.sleep`` so rate limiting and backoff never block
+        the event loop. Cancellation propagates immediately and, if this call holds the
+        half-open trial slot, frees it.
+        """
+        self._count("calls")
+        for attempt in range(self.max_attempts):
+            is_trial = self._check_circuit()
+            try:
+                wait = self._rate_limit_wait(estimated_tokens)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                result = await fn()
+            except asyncio.CancelledError:
+                if is_trial:
+                    self.breaker.abandon()
+                raise
+            except Exception as exc:
+                await asyncio.sleep(self._on_error(attempt, exc))
+                continue
+            self._on_success()
+            return result
+        raise AssertionError("unreachable")  # pragma: no cover
@@ -1,65 +1,448 @@
-"""Simple CLI to run CRIRA analysis & response generation on a reviews JSON file."""
+"""Simple CLI to run CRIRA analysis & response generation on a reviews JSON or JSONL file."""
 
 from __future__ import annotations
 
 import argparse
+import asyncio
 import json
 import logging
 import os
+from contextlib import ExitStack, nullcontext
+from functools import partial
 from pathlib import Path
-from typing import Any
+from typing import Any, ContextManager, Iterable, Iterator, NamedTuple, Optional
 
-from analysis_engine import analyze_review
-from response_generator import generate_response
+from analysis_engine import (
+    aanalyze_review,
+    analyze_review,
+    get_fast_path_stats,
+    get_structured_output_stats,
+    prepare_review,
+)
+from batch_executor import (
+    PRIORITY_CRITICAL,
+    PRIORITY_ROUTINE,
+    Outcome,
+    ThroughputStats,
+    map_ordered,
+    map_prioritized,
+)
+from config import (
+    PRIORITY_MAX_QUEUED,
+    PRIORITY_SCHEDULING_ENABLED,
+    TOKEN_BUDGET,
+    TOKEN_BUDGET_CHEAP_MODEL,
+    TOKEN_BUDGET_RUN_TOKENS,
+)
+from dedup import DEFAULT_WINDOW as DEDUP_WINDOW, AnalysisDeduplicator
+from llm_client import (
+    clear_context_caches,
+    configure_response_cache,
+    get_context_cache_stats,
+    get_model_cache_stats,
+    get_response_cache_stats,
+    get_scheduler_stats,
+    llm_overrides,
+)
+from metrics import METRICS, StageMetrics, stage
+from policy import get_policy
+from response_generator import agenerate_response, generate_response, get_response_stats
+from review_io import iter_review_entries, open_result_writer
+from run_journal import RunJournal, journal_key
+from sharded_prep import PreprocessedReview, iter_preprocessed, preprocess_review
+from token_accounting import (
+    DISPATCH_CHEAP,
+    DISPATCH_DEFER,
+    DISPATCH_REDUCED,
+    LEDGER,
+    TokenBudget,
+    track_review,
+)
+from utils import canonicalize_text
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
-def process_review(review_text: str) -> dict[str, Any]:
-    analyzed = analyze_review(review_text)
-    response = generate_response(analyzed, review_text)
-    return {
-        "original_review": review_text,
-        "analyzed": analyzed,
-        "response": response,
-    }
+def process_review(
+    review_text: str,
+    review_id: Optional[str] = None,
+    deduper: Optional[AnalysisDeduplicator] = None,
+    rating: Optional[float] = None,
+    preprocessed: Optional[PreprocessedReview] = None,
+) -> dict[str, Any]:
+    with stage("process_review"), track_review() as usage:
+        if preprocessed is None:
+            prepared, is_critical = prepare_review(review_text), None
+        else:
+            prepared, is_critical = preprocessed
+        if deduper is None:
+            analyzed = analyze_review(review_text, prepared=prepared, rating=rating)
+        else:
+            analyzed = deduper.analyze(review_text, prepared, rating=rating)
+        response = generate_response(
+            analyzed, review_text, canonical_review=prepared.canonical, is_critical=is_critical
+        )
+    return build_review_result(review_text, review_id, analyzed, response, usage.as_dict())
 
 
-def main() -> None:
+async def aprocess_review(
+    review_text: str,
+    review_id: Optional[str] = None,
+    rating: Optional[float] = None,
+    timeout: Optional[float] = None,
+    llm_timeout: Optional[float] = None,
+) -> dict[str, Any]:
+    """
+    Async ``process_review`` for embedding in asyncio services.
+
+    Args:
+        timeout: Deadline in seconds for the whole review; raises TimeoutError when exceeded.
+        llm_timeout: Per-LLM-call deadline; a call that exceeds it raises LLMUnavailableError.
+
+    Cancelling the task cancels its in-flight LLM request.
+    """
+    with stage("process_review"), track_review() as usage:
+        prepared = prepare_review(review_text)
+        async with asyncio.timeout(timeout):
+            analyzed = await aanalyze_review(review_text, prepared=prepared, rating=rating, timeout=llm_timeout)
+            response = await agenerate_response(
+                analyzed, review_text, canonical_review=prepared.canonical, timeout=llm_timeout
+            )
+    return build_review_result(review_text, review_id, analyzed, response, usage.as_dict())
+
+
+def build_review_result(
+    review_text: str,
+    review_id: Optional[str],
+    analyzed: dict[str, Any],
+    response: dict[str, Any],
+    token_usage: Optional[dict[str, int]] = None,
+) -> dict[str, Any]:
+    result: dict[str, Any] = {} if review_id is None else {"review_id": review_id}
+    result.update(
+        {
+            "original_review": review_text,
+            "analyzed": analyzed,
+            "response": response,
+        }
+    )
+    if token_usage is not None:
+        result["token_usage"] = token_usage
+    return result
+
+
+class ReviewDeferred(Exception):
+    """A non-critical review was not processed because the run's token budget ran out."""
+
+
+def build_deferred_result(review_text: str, review_id: Optional[str]) -> dict[str, Any]:
+    """Placeholder output for a deferred review, so the output keeps one entry per input review."""
+    result: dict[str, Any] = {} if review_id is None else {"review_id": review_id}
+    result.update({"original_review": review_text, "status": "deferred"})
+    return result
+
+
+def _budget_overrides(decision: str) -> ContextManager[None]:
+    ratio = TOKEN_BUDGET.get("REDUCED_MAX_TOKENS_RATIO", 0.5)
+    if decision == DISPATCH_REDUCED:
+        return llm_overrides(max_tokens_ratio=ratio)
+    if decision == DISPATCH_CHEAP:
+        return llm_overrides(model=TOKEN_BUDGET_CHEAP_MODEL, max_tokens_ratio=ratio)
+    return nullcontext()
+
+
+def make_token_budget(limit: int) -> Optional[TokenBudget]:
+    """The run's TokenBudget with the TOKEN_BUDGET thresholds from config, or None if ``limit`` is 0."""
+    if limit <= 0:
+        return None
+    return TokenBudget(
+        limit,
+        reduce_at=TOKEN_BUDGET.get("REDUCE_AT", 0.7),
+        cheap_at=TOKEN_BUDGET.get("CHEAP_MODEL_AT", 0.85),
+        defer_at=TOKEN_BUDGET.get("DEFER_AT", 0.95),
+    )
+
+
+class _ReviewItem(NamedTuple):
+    review_id: Optional[str]
+    review_text: str
+    journal_key: str
+    rating: Optional[float] = None
+    replay: Optional[dict[str, Any]] = None  # stored result from the run journal
+    preprocessed: Optional[PreprocessedReview] = None  # from the --processes pool
+
+
+def _iter_review_items(entries: Iterable[dict[str, Any]]) -> Iterator[_ReviewItem]:
+    for entry in entries:
+        review_text = entry.get("review_text", "")  # Match key in reviews.json
+        if not review_text:
+            logger.warning("Skipping empty review entry.")
+            continue
+        review_id = entry.get("review_id")
+        yield _ReviewItem(review_id, review_text, journal_key(review_id, review_text), _parse_rating(entry.get("rating")))
+
+
+def _parse_rating(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        logger.warning("Ignoring invalid rating %r.", value)
+        return None
+
+
+def _with_replays(items: Iterable[_ReviewItem], journal: RunJournal, check_hash: bool) -> Iterator[_ReviewItem]:
+    """Attaches stored results to reviews the journal already completed, so they are not reprocessed."""
+    for item in items:
+        replay = journal.completed_result(item.journal_key, item.review_text, check_hash=check_hash)
+        yield item if replay is None else item._replace(replay=replay)
+
+
+def _with_preprocessing(items: Iterable[_ReviewItem], processes: int) -> Iterator[_ReviewItem]:
+    """Runs the CPU-bound preprocessing of ``items`` on a process pool, preserving order."""
+    for item, preprocessed in iter_preprocessed(
+        items, lambda item: item.review_text if item.replay is None else None, processes
+    ):
+        yield item._replace(preprocessed=preprocessed)
+
+
+def _ingest_priority(item: _ReviewItem) -> int:
+    """The cheap critical-keyword check, run as each review is read."""
+    if item.replay is not None:
+        return PRIORITY_ROUTINE
+    if item.preprocessed is not None:
+        is_critical = item.preprocessed.is_critical
+    else:
+        is_critical = get_policy().is_critical(canonicalize_text(item.review_text))
+    return PRIORITY_CRITICAL if is_critical else PRIORITY_ROUTINE
+
+
+def _is_critical_result(outcome: Outcome) -> bool:
+    _, result, error = outcome
+    return error is None and bool(result["response"].get("is_critical"))
+
+
+def _process_logged(
+    item: _ReviewItem, deduper: Optional[AnalysisDeduplicator] = None, budget: Optional[TokenBudget] = None
+) -> dict[str, Any]:
+    if item.replay is not None:
+        return item.replay
+    review_text = item.review_text
+    preprocessed = item.preprocessed
+    overrides: ContextManager[None] = nullcontext()
+    if budget is not None:
+        if preprocessed is None:
+            preprocessed = preprocess_review(review_text)
+        decision = budget.decide(preprocessed.is_critical)
+        if decision == DISPATCH_DEFER:
+            raise ReviewDeferred("token budget exhausted")
+        overrides = _budget_overrides(decision)
+    summary = (review_text[:80] + "...") if len(review_text) > 80 else review_text
+    logger.info("Processing review: %s", summary)
+    with overrides:
+        return process_review(
+            review_text, review_id=item.review_id, deduper=deduper, rating=item.rating, preprocessed=preprocessed
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
     parser = argparse.ArgumentParser(description="CRIRA - Review analysis and response")
-    parser.add_argument("--reviews", type=str, default="reviews.json", help="Path to reviews.json")
-    parser.add_argument("--output", type=str, default="results.json", help="Output file")
-    args = parser.parse_args()
+    parser.add_argument("--reviews", type=str, default="reviews.json", help="Path to reviews.json or a .jsonl file")
+    parser.add_argument(
+        "--output", type=str, default="results.json", help="Output file (.jsonl/.ndjson for one result per line)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Number of reviews processed concurrently (default: 1, sequential)"
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help="Maximum reviews submitted but not yet written (default: 2 x workers)",
+    )
+    parser.add_argument(
+        "--cache-path",
+        type=str,
+        default=None,
+        help="Persistent LLM response cache location (overrides LLM_CACHE_PATH in config)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Disable the LLM response cache for this run")
+    parser.add_argument("--metrics-json", type=str, default=None, help="Write per-stage latency summary as JSON")
+    parser.add_argument(
+        "--metrics-prom", type=str, default=None, help="Write per-stage latency summary in Prometheus text format"
+    )
+    parser.add_argument(
+        "--journal", type=str, default=None, help="SQLite run journal recording each review's status and result"
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="Skip reviews the journal marks as done; reprocess new or failed ones"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Like --resume, but also reprocess done reviews whose text changed since they were journaled",
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Analyze each distinct canonical redacted review text once and share the analysis",
+    )
+    parser.add_argument(
+        "--near-dup-threshold",
+        type=float,
+        default=None,
+        help="With --dedup, also group near-duplicates whose SimHash similarity is at least this (0-1, e.g. 0.95)",
+    )
+    parser.add_argument(
+        "--dedup-window",
+        type=int,
+        default=DEDUP_WINDOW,
+        help="With --dedup, remember this many most recently seen review groups (bounds memory)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Preprocess (canonicalize, redact, critical check) on this many processes before LLM dispatch",
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=TOKEN_BUDGET_RUN_TOKENS,
+        help="Input + output LLM tokens for this run (0: unlimited); non-critical reviews are degraded, "
+        "then deferred, as it runs out",
+    )
+    parser.add_argument(
+        "--critical-output",
+        type=str,
+        default=None,
+        help="Also write critical results here (.jsonl recommended) as soon as each is ready",
+    )
+    parser.add_argument(
+        "--no-priority",
+        action="store_true",
+        help="Process reviews strictly in input order instead of critical reviews first",
+    )
+    args = parser.parse_args(argv)
+    if (args.resume or args.incremental) and not args.journal:
+        parser.error("--resume and --incremental require --journal")
+    if args.near_dup_threshold is not None and not args.dedup:
+        parser.error("--near-dup-threshold requires --dedup")
+    if args.dedup_window < 1:
+        parser.error("--dedup-window must be at least 1")
 
     reviews_path = Path(args.reviews)
     if not reviews_path.exists():
         logger.error(f"Reviews file {reviews_path} not found.")
         return
 
-    data = json.loads(reviews_path.read_text(encoding="utf-8"))
-    results = []
-    
-    # The JSON is a dict with a 'reviews' key containing the list
-    review_list = data.get("reviews", [])
-    if not review_list:
+    configure_response_cache(path=args.cache_path, enabled=False if args.no_cache else None)
+    if args.metrics_json or args.metrics_prom:
+        METRICS.enabled = True
+
+    deduper = (
+        AnalysisDeduplicator(near_dup_similarity=args.near_dup_threshold, window=args.dedup_window)
+        if args.dedup
+        else None
+    )
+    journal = RunJournal(args.journal) if args.journal else None
+    items = _iter_review_items(iter_review_entries(reviews_path))
+    if journal is not None and (args.resume or args.incremental):
+        items = _with_replays(items, journal, check_hash=args.incremental)
+    if args.processes > 1:
+        items = _with_preprocessing(items, args.processes)
+
+    budget = make_token_budget(args.token_budget)
+    prioritize = PRIORITY_SCHEDULING_ENABLED and not args.no_priority
+    queue_waits = StageMetrics(enabled=True)
+    stats = ThroughputStats()
+    replayed = deferred = 0
+    try:
+        with ExitStack() as outputs:
+            writer = outputs.enter_context(open_result_writer(args.output))
+            critical_writer = (
+                outputs.enter_context(open_result_writer(args.critical_output)) if args.critical_output else None
+            )
+
+            def write_critical(outcome: Outcome) -> None:
+                if critical_writer is not None and _is_critical_result(outcome):
+                    critical_writer.write(outcome[1])
+
+            process = partial(_process_logged, deduper=deduper, budget=budget)
+            if prioritize:
+                outcomes = map_prioritized(
+                    process,
+                    items,
+                    _ingest_priority,
+                    workers=args.workers,
+                    max_in_flight=args.max_in_flight,
+                    max_queued=PRIORITY_MAX_QUEUED,
+                    on_complete=write_critical,
+                    wait_metrics=queue_waits,
+                )
+            else:
+                outcomes = map_ordered(process, items, workers=args.workers, max_in_flight=args.max_in_flight)
+            for outcome in outcomes:
+                item, r, error = outcome
+                if not prioritize:
+                    write_critical(outcome)
+                if isinstance(error, ReviewDeferred):
+                    deferred += 1
+                    if journal is not None:
+                        # Recorded as failed, so that --resume processes it.
+                        journal.record_failure(item.journal_key, item.review_text, error)
+                    writer.write(build_deferred_result(item.review_text, item.review_id))
+                    continue
+                stats.record(error)
+                if error is not None:
+                    logger.error("Failed to process review: %s", item.review_text, exc_info=error)
+                    if journal is not None:
+                        journal.record_failure(item.journal_key, item.review_text, error)
+                    continue
+                if item.replay is not None:
+                    replayed += 1
+                elif journal is not None:
+                    journal.record_success(item.journal_key, item.review_text, r)
+                writer.write(r)
+    finally:
+        if journal is not None:
+            journal.close()
+        # Cached prompt prefixes are billed for storage until they expire.
+        clear_context_caches()
+    stats.finish()
+    if not stats.processed:
         logger.warning("No 'reviews' key found in JSON file, or the list is empty.")
-    for entry in review_list:
-        review_text = entry.get("review_text", "") # Match key in reviews.json
-        if not review_text:
-            logger.warning("Skipping empty review entry.")
-            continue
-        try:
-            summary = (review_text[:80] + "...") if len(review_text) > 80 else review_text
-            logger.info("Processing review: %s", summary)
-            r = process_review(review_text)
-            results.append(r)
-        except Exception:
-            logger.exception("Failed to process review: %s", review_text)
-
-    out_file = Path(args.output)
-    out_file.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
-    logger.info("Wrote results to %s", out_file)
+    logger.info("Throughput: %s", json.dumps(stats.as_dict()))
+    if prioritize:
+        logger.info("Queue wait by priority (s): %s", queue_waits.to_json(indent=None))
+    if deduper is not None:
+        logger.info("Deduplication: %s", json.dumps(deduper.stats()))
+    if journal is not None:
+        logger.info("Run journal: %d results replayed from %s", replayed, journal.path)
+    logger.info("Analysis fast path: %s", json.dumps(get_fast_path_stats()))
+    logger.info("Analysis output parsing: %s", json.dumps(get_structured_output_stats()))
+    logger.info("Response templates: %s", json.dumps(get_response_stats()))
+    logger.info("LLM model cache: %s", json.dumps(get_model_cache_stats()))
+    logger.info("LLM response cache: %s", json.dumps(get_response_cache_stats()))
+    logger.info("LLM context cache: %s", json.dumps(get_context_cache_stats()))
+    logger.info("LLM scheduler: %s", json.dumps(get_scheduler_stats()))
+    logger.info("Token usage: %s", json.dumps(LEDGER.stats()))
+    if budget is not None:
+        logger.info("Token budget: %s", json.dumps(budget.stats()))
+    if deferred:
+        logger.warning(
+            "%d non-critical reviews were deferred by the token budget and written with status \"deferred\"%s.",
+            deferred,
+            "; rerun with --resume to process them" if journal is not None else "",
+        )
+    logger.info("Wrote %d results to %s", writer.count, writer.path)
+
+    if METRICS.enabled:
+        logger.info("Stage latency (s): %s", METRICS.to_json(indent=None))
+        if args.metrics_json:
+            Path(args.metrics_json).write_text(METRICS.to_json(), encoding="utf-8")
+        if args.metrics_prom:
+            Path(args.metrics_prom).write_text(METRICS.to_prometheus(), encoding="utf-8")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,130 @@
+"""Lightweight per-stage latency instrumentation for the review pipeline.
+
+Code under measurement wraps each stage in ``with stage("name"):``. While metrics
+are disabled (the default) that returns a shared no-op context manager, so the cost
+is one function call. When enabled, durations are recorded per stage (reservoir
+sampled beyond ``max_samples``) and summarised as count/sum/mean/p50/p95/p99/max,
+exportable as JSON or in the Prometheus text exposition format.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional
+
+_NULL_CONTEXT = nullcontext()
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _StageSamples:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: List[float] = []
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_name", "_start")
+
+    def __init__(self, metrics: "StageMetrics", name: str):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._metrics.observe(self._name, time.perf_counter() - self._start)
+
+
+def _quantile(sorted_samples: List[float], q: float) -> float:
+    """Nearest-rank quantile of already sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+
+class StageMetrics:
+    """Thread-safe registry of stage latencies."""
+
+    def __init__(self, enabled: bool = False, max_samples: int = 50_000, seed: Optional[int] = None):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self._stages: Dict[str, _StageSamples] = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def stage(self, name: str):
+        """Context manager timing one execution of stage ``name``."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return _Timer(self, name)
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = _StageSamples()
+            stats.count += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            if len(stats.samples) < self.max_samples:
+                stats.samples.append(seconds)
+            else:
+                # Reservoir sampling keeps percentiles representative with bounded memory.
+                slot = self._rng.randrange(stats.count)
+                if slot < self.max_samples:
+                    stats.samples[slot] = seconds
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage count, sum/mean/max and p50/p95/p99, in seconds."""
+        with self._lock:
+            snapshot = {name: (s.count, s.total, s.max, sorted(s.samples)) for name, s in self._stages.items()}
+        out: Dict[str, Dict[str, float]] = {}
+        for name, (count, total, max_, samples) in sorted(snapshot.items()):
+            entry = {"count": count, "sum": total, "mean": total / count if count else 0.0, "max": max_}
+            for q in QUANTILES:
+                entry[f"p{round(q * 100)}"] = _quantile(samples, q)
+            out[name] = entry
+        return out
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.summary(), indent=indent)
+
+    def to_prometheus(self, prefix: str = "crira") -> str:
+        """Renders the summary as Prometheus ``summary`` metrics."""
+        metric = f"{prefix}_stage_duration_seconds"
+        lines = [
+            f"# HELP {metric} Latency of CRIRA pipeline stages.",
+            f"# TYPE {metric} summary",
+        ]
+        for name, entry in self.summary().items():
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            for q in QUANTILES:
+                lines.append(f'{metric}{{stage="{label}",quantile="{q}"}} {entry[f"p{round(q * 100)}"]:.9f}')
+            lines.append(f'{metric}_sum{{stage="{label}"}} {entry["sum"]:.9f}')
+            lines.append(f'{metric}_count{{stage="{label}"}} {entry["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+METRICS = StageMetrics(enabled=os.getenv("CRIRA_METRICS", "").lower() in ("1", "true", "yes"))
+
+
+def stage(name: str):
+    """Times a stage on the process-wide registry; a no-op unless metrics are enabled."""
+    return METRICS.stage(name)
@@ -0,0 +1,135 @@
+"""Incremental filtering of streamed LLM output.
+
+``StreamingOutputFilter`` applies the same rules as the response scrubber to text that
+arrives in chunks: CRITICAL_REF-like tokens are removed and PII placeholders replaced
+with a generic mention, even when a token is split across chunk boundaries. Only text
+that can no longer turn into a forbidden token is released. The filter can also end
+the stream early, on the first policy violation or when a length cap is reached, so
+that the caller can stop reading (and paying for) the rest of the completion.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CRITICAL_REF_PREFIX = "[CRITICAL_REF:"
+STOP_VIOLATION = "violation"
+STOP_LENGTH = "length"
+
+
+class StreamingOutputFilter:
+    """
+    Args:
+        placeholders: Tokens the output must not contain, e.g. ``"[PII_EMAIL]"``.
+        replacement: What each placeholder is replaced with.
+        max_chars: Cap on the released text; the stream stops at the last word that fits.
+        stop_on_violation: Stop at the first forbidden token instead of filtering it and
+            continuing. Text before the token is still released.
+
+    Feed chunks with ``feed`` and call ``close`` at the end of the stream; both return
+    the text that is safe to release. Leading and trailing whitespace is dropped, so
+    the released text equals the scrubbed, stripped full output. ``stopped`` is
+    ``"violation"`` or ``"length"`` once the filter has ended the stream.
+    """
+
+    def __init__(
+        self,
+        placeholders: Iterable[str],
+        replacement: str = "[REDACTED_PII]",
+        max_chars: Optional[int] = None,
+        stop_on_violation: bool = False,
+    ):
+        self._placeholders = tuple(placeholders)
+        self._tokens = (CRITICAL_REF_PREFIX,) + self._placeholders
+        self._replacement = replacement
+        self.max_chars = max_chars
+        self.stop_on_violation = stop_on_violation
+        self._pending = ""
+        self.released_chars = 0
+        self.violations: List[str] = []
+        self.stopped: Optional[str] = None
+
+    def feed(self, chunk: str) -> str:
+        if self.stopped:
+            return ""
+        self._pending += chunk
+        return self._drain(final=False)
+
+    def close(self) -> str:
+        if self.stopped:
+            return ""
+        return self._drain(final=True)
+
+    def _violation(self, kind: str) -> bool:
+        """Records a violation; returns True if the stream must stop."""
+        self.violations.append(kind)
+        logger.warning("LLM output contained a forbidden %s token.", kind)
+        if self.stop_on_violation:
+            self.stopped = STOP_VIOLATION
+        return self.stop_on_violation
+
+    def _drain(self, final: bool) -> str:
+        text = self._pending
+        out: List[str] = []
+        i = 0
+        while i < len(text):
+            j = text.find("[", i)
+            if j < 0:
+                out.append(text[i:])
+                i = len(text)
+                break
+            out.append(text[i:j])
+            i = j
+            if text.startswith(CRITICAL_REF_PREFIX, j):
+                end = text.find("]", j)
+                if end < 0 and not final and not self.stop_on_violation:
+                    break  # hold until the token closes
+                if end < 0 and final:
+                    # Never closed: not a token (the scrubber's regex needs the ']').
+                    out.append(text[j:])
+                    i = len(text)
+                    break
+                if self._violation("CRITICAL_REF"):
+                    break
+                i = end + 1
+                continue
+            placeholder = next((p for p in self._placeholders if text.startswith(p, j)), None)
+            if placeholder is not None:
+                if self._violation("PII placeholder"):
+                    break
+                out.append(self._replacement)
+                i = j + len(placeholder)
+                continue
+            rest = text[j:]
+            if not final and any(len(rest) < len(token) and token.startswith(rest) for token in self._tokens):
+                break  # could still become a forbidden token
+            out.append("[")
+            i = j + 1
+
+        released = "".join(out)
+        self._pending = "" if self.stopped else text[i:]
+        if self.released_chars == 0:
+            released = released.lstrip()
+        if final or self.stopped:
+            released = released.rstrip()
+        else:
+            # Hold trailing whitespace back: it is dropped if nothing follows it.
+            kept = released.rstrip()
+            self._pending = released[len(kept) :] + self._pending
+            released = kept
+        return self._cap(released)
+
+    def _cap(self, released: str) -> str:
+        if self.max_chars is None or self.released_chars + len(released) <= self.max_chars:
+            self.released_chars += len(released)
+            return released
+        room = self.max_chars - self.released_chars
+        cut = released.rfind(" ", 0, room + 1)
+        released = released[: cut if cut > 0 else room].rstrip()
+        self.released_chars += len(released)
+        self.stopped = STOP_LENGTH
+        self._pending = ""
+        return released
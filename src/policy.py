@@ -0,0 +1,227 @@
+"""Compiled review-handling policy: safe mode, critical keywords and PII patterns.
+
+The policy is built from config.json on first use rather than at import, and kept in
+one immutable ``Policy`` object. ``get_policy()`` returns the current object and
+rebuilds it when config.json or ``CRIRA_SAFE_MODE`` changes, so a long-running worker
+picks up new critical keywords or PII patterns without a restart. A rebuild replaces
+the object in one assignment: callers holding a policy keep a consistent snapshot, and
+a config.json that fails to load or compile leaves the current policy in place.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Tuple
+
+from config import CONFIG_PATH, POLICY_HOT_RELOAD, POLICY_RELOAD_INTERVAL_SECONDS, load_config
+from keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+
+def compile_pii_patterns(config: Mapping[str, Any]) -> Dict[str, re.Pattern]:
+    """Loads and compiles PII regex patterns from config."""
+    patterns = {}
+    for key, pattern_str in config.get("PII_PATTERNS", {}).items():
+        # The 'PII_ADDRESS' pattern uses case-insensitivity
+        flags = re.IGNORECASE if key == "PII_ADDRESS" else 0
+        patterns[key] = re.compile(pattern_str, flags)
+    return patterns
+
+
+def compile_pii_prefilters(config: Mapping[str, Any]) -> Dict[str, re.Pattern]:
+    """Cheap necessary-condition probes: a PII pattern can only match if its prefilter does."""
+    return {key: re.compile(pattern_str) for key, pattern_str in config.get("PII_PREFILTERS", {}).items()}
+
+
+class PiiRule(NamedTuple):
+    """One PII pattern with everything redaction needs to apply it."""
+
+    tag: str
+    pattern: re.Pattern
+    prefilter: Optional[re.Pattern]
+    placeholder: str  # "[<tag>]"
+    stage: str  # metrics stage, "redact.<tag>"
+
+
+class Policy(NamedTuple):
+    """
+    One consistent snapshot of the policy settings, compiled and ready to use.
+
+    Attributes:
+        safe_mode: Whether reviews are redacted and bracket-escaped before reaching the LLM.
+        critical_keywords: Keywords that make a review critical.
+        critical_matcher: Compiled matcher for ``critical_keywords``.
+        pii_rules: PII patterns in config order.
+        source: (mtime_ns, size) of the config.json the policy was built from.
+    """
+
+    safe_mode: bool
+    critical_keywords: Tuple[str, ...]
+    critical_matcher: KeywordMatcher
+    pii_rules: Tuple[PiiRule, ...]
+    source: Optional[Tuple[int, int]] = None
+
+    def is_critical(self, text: str) -> bool:
+        """True if ``text`` contains any critical keyword (case-insensitive)."""
+        return self.critical_matcher.contains(text)
+
+
+def _parse_bool(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes")
+
+
+def build_policy(
+    config: Mapping[str, Any], safe_mode: Optional[bool] = None, source: Optional[Tuple[int, int]] = None
+) -> Policy:
+    """
+    Compiles a policy from a parsed config.json.
+
+    Args:
+        config: The parsed configuration.
+        safe_mode: Overrides the config's ``SAFE_MODE``.
+        source: Identifies the config file version, see ``Policy.source``.
+
+    Returns:
+        The new Policy.
+    """
+    keywords = tuple(config.get("CRITICAL_KEYWORDS", []))
+    prefilters = compile_pii_prefilters(config)
+    rules = tuple(
+        PiiRule(tag, pattern, prefilters.get(tag), f"[{tag}]", f"redact.{tag}")
+        for tag, pattern in compile_pii_patterns(config).items()
+    )
+    return Policy(
+        safe_mode=bool(config.get("SAFE_MODE", True)) if safe_mode is None else safe_mode,
+        critical_keywords=keywords,
+        critical_matcher=KeywordMatcher(keywords),
+        pii_rules=rules,
+        source=source,
+    )
+
+
+class PolicyStore:
+    """
+    Builds the policy from a config file on first use and rebuilds it when the file changes.
+
+    ``get`` is cheap on the hot path: it compares the ``CRIRA_SAFE_MODE`` environment
+    value with the one the policy was built for, and stats the file at most once per
+    ``check_interval`` seconds. Rebuilds happen under a lock, one at a time.
+
+    Args:
+        path: The config.json to build from.
+        check_interval: Seconds between checks of the file for changes; 0 checks on every call.
+        hot_reload: If False, the file is read once and later changes are ignored.
+        clock: Time source, for tests.
+    """
+
+    def __init__(
+        self,
+        path: str = CONFIG_PATH,
+        check_interval: float = 2.0,
+        hot_reload: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.path = path
+        self.check_interval = check_interval
+        self.hot_reload = hot_reload
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (policy, CRIRA_SAFE_MODE value it was built for), replaced as a whole.
+        self._current: Optional[Tuple[Policy, Optional[str]]] = None
+        self._config: Mapping[str, Any] = {}
+        self._next_check = 0.0
+        self._failed_source: Optional[Tuple[int, int]] = None
+        self._stats = {"builds": 0, "reloads": 0, "reload_errors": 0}
+
+    def get(self) -> Policy:
+        """Returns the current policy, building or rebuilding it first if needed."""
+        current = self._current
+        env = os.environ.get("CRIRA_SAFE_MODE")
+        if current is not None and current[1] == env and (not self.hot_reload or self._clock() < self._next_check):
+            return current[0]
+        return self._refresh(env)
+
+    def _refresh(self, env: Optional[str]) -> Policy:
+        with self._lock:
+            current = self._current
+            now = self._clock()
+            file_due = current is None or (self.hot_reload and now >= self._next_check)
+            if current is not None and current[1] == env and not file_due:
+                return current[0]  # refreshed by another thread meanwhile
+            config, source = self._config, current[0].source if current is not None else None
+            if file_due:
+                self._next_check = now + self.check_interval
+                loaded = self._load(current)
+                if loaded is not None:
+                    config, source = loaded
+            if current is not None and current[1] == env and source == current[0].source:
+                return current[0]
+            try:
+                policy = build_policy(config, None if env is None else _parse_bool(env), source)
+            except re.error as e:
+                if current is None:
+                    raise
+                logger.error("Keeping the current policy; %s has an invalid pattern: %s", self.path, e)
+                self._failed_source = source
+                self._stats["reload_errors"] += 1
+                return current[0]
+            if current is not None and source != current[0].source:
+                logger.info("Reloaded policy from %s.", self.path)
+                self._stats["reloads"] += 1
+            self._stats["builds"] += 1
+            self._config = config
+            self._current = (policy, env)
+            return policy
+
+    def _load(
+        self, current: Optional[Tuple[Policy, Optional[str]]]
+    ) -> Optional[Tuple[Mapping[str, Any], Tuple[int, int]]]:
+        """Reads the file if it changed; returns None to keep the current config."""
+        try:
+            st = os.stat(self.path)
+        except OSError as e:
+            if current is None:
+                raise FileNotFoundError(f"Configuration file not found at {self.path}") from e
+            logger.warning("Keeping the current policy; cannot stat %s: %s", self.path, e)
+            return None
+        source = (st.st_mtime_ns, st.st_size)
+        if current is not None and source in (current[0].source, self._failed_source):
+            return None
+        try:
+            return load_config(self.path), source
+        except ValueError as e:
+            # Typically a partial write; the next check retries once the file changes again.
+            if current is None:
+                raise
+            logger.error("Keeping the current policy; cannot parse %s: %s", self.path, e)
+            self._failed_source = source
+            self._stats["reload_errors"] += 1
+            return None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
+_store = PolicyStore(check_interval=POLICY_RELOAD_INTERVAL_SECONDS, hot_reload=POLICY_HOT_RELOAD)
+
+
+def get_policy() -> Policy:
+    """Returns the current policy, see ``PolicyStore.get``."""
+    return _store.get()
+
+
+def set_policy_store(store: PolicyStore) -> None:
+    """Replaces the process-wide policy store, e.g. to build from another config file."""
+    global _store
+    _store = store
+
+
+def get_policy_stats() -> Dict[str, int]:
+    """Policy builds, reloads after config.json changes, and rejected reloads."""
+    return _store.stats()
@@ -4,21 +4,77 @@ from __future__ import annotations
 import re
 
 import logging
-from typing import Any, Dict
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from prompts import RESPONSE_SYSTEM_PROMPT
-from llm_client import call_llm
-from utils import contains_critical_keyword, generate_critical_ref, canonicalize_text, escape_brackets
-from config import SAFE_MODE, CRITICAL_KEYWORDS
+from llm_client import acall_llm, call_llm, call_llm_stream
+from metrics import METRICS, stage
+from output_filter import StreamingOutputFilter
+from policy import get_policy
+from response_templates import ResponseTemplateEngine
+from token_accounting import usage_stage
+from utils import generate_critical_ref, canonicalize_text, escape_brackets
+from config import (
+    DUMMY_LLM_KEYWORDS,
+    RESPONSE_STREAM_MAX_CHARS,
+    RESPONSE_STREAM_STOP_ON_VIOLATION,
+    RESPONSE_TEMPLATES,
+    RESPONSE_TEMPLATES_ENABLED,
+)
 
 logger = logging.getLogger(__name__)
 
+_TEMPLATES = ResponseTemplateEngine.from_config(RESPONSE_TEMPLATES, known_issues=DUMMY_LLM_KEYWORDS.get("issues", {}))
 
-def generate_response(analyzed: Dict[str, Any], raw_review_text: str) -> Dict[str, Any]:
+_response_stats_lock = threading.Lock()
+_response_stats = {"responses": 0, "templated": 0, "streams_stopped": 0}
+_FORBIDDEN_PLACEHOLDERS = ("[PII_EMAIL]", "[PII_PHONE]", "[PII_NAME]", "[PII_ADDRESS]", "[PII_ORDER]", "[PII_MASKED]")
+
+
+def get_response_stats() -> Dict[str, float]:
+    """
+    Responses generated, how many came from templates instead of the LLM (and that
+    share), and how many streamed responses were cut short by the output filter.
+    """
+    with _response_stats_lock:
+        stats: Dict[str, float] = dict(_response_stats)
+    stats["llm"] = stats["responses"] - stats["templated"]
+    stats["template_rate"] = round(stats["templated"] / stats["responses"], 4) if stats["responses"] else 0.0
+    return stats
+
+
+def _scrub_llm_output(llm_output: str) -> str:
+    """
+    Removes anything the LLM must never emit: CRITICAL_REF-like tokens and PII placeholders.
+    """
+    # Defensive check: ensure LLM did NOT produce CRITICAL_REF-like token
+    if "[CRITICAL_REF:" in llm_output:
+        logger.warning("LLM returned CRITICAL_REF-like token. Stripping it.")
+        # Remove any bracketed CRITICAL_REFs in LLM output
+        llm_output = re.sub(r"\[CRITICAL_REF:[^\]]*\]", "", llm_output)
+
+    # In SAFE mode we also ensure no PII placeholders leaked
+    for p in _FORBIDDEN_PLACEHOLDERS:
+        if p in llm_output:
+            logger.warning("LLM output contained PII placeholder; replacing with generic mention.")
+            llm_output = llm_output.replace(p, "[REDACTED_PII]")
+    return llm_output
+
+
+def generate_response(
+    analyzed: Dict[str, Any],
+    raw_review_text: str,
+    canonical_review: Optional[str] = None,
+    is_critical: Optional[bool] = None,
+) -> Dict[str, Any]:
     """
     Generates an on-brand response.
     - analyzed: result from analyze_review
     - raw_review_text: original review text
+    - canonical_review: canonicalize_text(raw_review_text), if the caller already has it
+    - is_critical: the critical-keyword check on canonical_review, if the caller already ran it
     Returns:
       {
         "response_text": "...",
@@ -26,49 +82,190 @@ def generate_response(analyzed: Dict[str, Any], raw_review_text: str) -> Dict[st
         "critical_ref": Optional[str]
       }
     Business rules:
+      - Non-critical reviews whose (sentiment, issues) a RESPONSE_TEMPLATES entry covers get the
+        rendered template instead of an LLM response; everything else goes to the LLM.
       - If critical keyword present, backend appends CRITICAL_REF (UUID) AFTER LLM output.
       - In SAFE_MODE, we forcibly escape bracket tokens before sending to LLM and forbid LLM to create CRITICAL_REF strings.
       - Validate final output to ensure no CRITICAL_REF appears in LLM output.
     """
-    # canonicalize
-    canonical_review = canonicalize_text(raw_review_text)
+    is_critical, llm_output = _critical_check_and_template(analyzed, raw_review_text, canonical_review, is_critical)
+    if llm_output is None:
+        prompt = _response_prompt(analyzed)
+        with stage("response.llm_call"), usage_stage("response"):
+            llm_output = call_llm(prompt=prompt, system=RESPONSE_SYSTEM_PROMPT, max_tokens=400)
+    return _finalize_response(llm_output, is_critical)
 
-    is_critical = contains_critical_keyword(canonical_review, CRITICAL_KEYWORDS)
 
-    # Prepare prompt input for LLM
-    # Provide the LLM with the sanitized/redacted review (not raw)
-    review_for_llm = analyzed["redacted_review"]
-    if SAFE_MODE:
-        review_for_llm = escape_brackets(review_for_llm)
+async def agenerate_response(
+    analyzed: Dict[str, Any],
+    raw_review_text: str,
+    canonical_review: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Async ``generate_response`` with the same templates, scrubbing and CRITICAL_REF rules.
+    The LLM call is awaited via ``acall_llm``; like the sync version, an unavailable LLM
+    (including exceeding ``timeout`` seconds) raises LLMUnavailableError.
+    """
+    is_critical, llm_output = _critical_check_and_template(analyzed, raw_review_text, canonical_review)
+    if llm_output is None:
+        prompt = _response_prompt(analyzed)
+        with stage("response.llm_call"), usage_stage("response"):
+            llm_output = await acall_llm(prompt=prompt, system=RESPONSE_SYSTEM_PROMPT, max_tokens=400, timeout=timeout)
+    return _finalize_response(llm_output, is_critical)
 
-    prompt = (
-        f"Customer review: \"{review_for_llm}\"\n\n"
-        f"Sentiment: {analyzed.get('sentiment')}\n"
-        f"Issues/Praise: {analyzed.get('key_issues_praise')}\n"
-        f"Summary: {analyzed.get('summary')}\n\n"
-        "Please write an empathetic, professional response to the customer following the system instructions."
-    )
 
-    llm_output = call_llm(prompt=prompt, system=RESPONSE_SYSTEM_PROMPT, max_tokens=400)
+class ResponseStream:
+    """
+    Iterator over a response's text as it is generated, for low time-to-first-byte.
 
-    # Defensive check: ensure LLM did NOT produce CRITICAL_REF-like token
-    if "[CRITICAL_REF:" in llm_output:
-        logger.warning("LLM returned CRITICAL_REF-like token. Stripping it.")
-        # Remove any bracketed CRITICAL_REFs in LLM output
-        llm_output = re.sub(r"\[CRITICAL_REF:[^\]]*\]", "", llm_output)
+    Chunks pass through a StreamingOutputFilter, so forbidden tokens are removed even
+    when split across chunks. The stream ends early, and stops reading the LLM, at the
+    first CRITICAL_REF-like token or PII placeholder (RESPONSE_STREAMING.STOP_ON_VIOLATION)
+    or at MAX_CHARS. The backend's CRITICAL_REF is the last chunk of critical reviews.
+    Once the stream is exhausted, ``result`` is the dict ``generate_response`` returns,
+    plus ``stopped``: ``"violation"``, ``"length"`` or None.
+    """
 
-    # In SAFE mode we also ensure no PII placeholders leaked
-    for p in ("[PII_EMAIL]", "[PII_PHONE]", "[PII_NAME]", "[PII_ADDRESS]", "[PII_ORDER]"):
-        if p in llm_output:
-            logger.warning("LLM output contained PII placeholder; replacing with generic mention.")
-            llm_output = llm_output.replace(p, "[REDACTED_PII]")
+    def __init__(self, chunks: Iterator[str], is_critical: bool):
+        self.is_critical = is_critical
+        self.result: Optional[Dict[str, Any]] = None
+        self._chunks = chunks
+        self._filter = StreamingOutputFilter(
+            _FORBIDDEN_PLACEHOLDERS,
+            max_chars=RESPONSE_STREAM_MAX_CHARS or None,
+            stop_on_violation=RESPONSE_STREAM_STOP_ON_VIOLATION,
+        )
+        self._started = time.perf_counter()
+        self._gen = self._run()
+
+    def __iter__(self) -> "ResponseStream":
+        return self
+
+    def __next__(self) -> str:
+        return next(self._gen)
+
+    def close(self) -> None:
+        """Abandons the stream (e.g. the client went away) and stops reading the LLM."""
+        self._gen.close()
+
+    def _run(self) -> Iterator[str]:
+        parts: List[str] = []
+        try:
+            for chunk in self._chunks:
+                text = self._filter.feed(chunk)
+                if text:
+                    if not parts and METRICS.enabled:
+                        METRICS.observe("response.first_chunk", time.perf_counter() - self._started)
+                    parts.append(text)
+                    yield text
+                if self._filter.stopped:
+                    break
+            text = self._filter.close()
+            if text:
+                parts.append(text)
+                yield text
+        finally:
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                close()
+
+        stopped = self._filter.stopped
+        if stopped:
+            logger.warning("Streamed response stopped early (%s).", stopped)
+            with _response_stats_lock:
+                _response_stats["streams_stopped"] += 1
+        critical_ref = None
+        if self.is_critical:
+            critical_ref = generate_critical_ref()
+            yield f"\n\n{critical_ref}"
+        self.result = {
+            "response_text": _with_critical_ref("".join(parts), critical_ref),
+            "is_critical": self.is_critical,
+            "critical_ref": critical_ref,
+            "stopped": stopped,
+        }
+
+
+def generate_response_stream(
+    analyzed: Dict[str, Any],
+    raw_review_text: str,
+    canonical_review: Optional[str] = None,
+    is_critical: Optional[bool] = None,
+) -> ResponseStream:
+    """
+    Streaming ``generate_response``: same templates, scrubbing and CRITICAL_REF rules, but
+    the text is yielded chunk by chunk as the LLM produces it (see ResponseStream).
+
+    The LLM request is started before this returns, so an unavailable LLM raises
+    LLMUnavailableError here, as in ``generate_response``.
+    """
+    is_critical, templated = _critical_check_and_template(analyzed, raw_review_text, canonical_review, is_critical)
+    if templated is not None:
+        return ResponseStream(iter([templated]), is_critical)
+    prompt = _response_prompt(analyzed)
+    with stage("response.llm_call"), usage_stage("response"):
+        chunks = call_llm_stream(prompt=prompt, system=RESPONSE_SYSTEM_PROMPT, max_tokens=400)
+    return ResponseStream(chunks, is_critical)
+
+
+def _critical_check_and_template(
+    analyzed: Dict[str, Any],
+    raw_review_text: str,
+    canonical_review: Optional[str],
+    is_critical: Optional[bool] = None,
+) -> Tuple[bool, Optional[str]]:
+    """Returns whether the review is critical, and the templated response if one covers it."""
+    if is_critical is None:
+        # canonicalize
+        if canonical_review is None:
+            with stage("canonicalize"):
+                canonical_review = canonicalize_text(raw_review_text)
+
+        with stage("response.critical_check"):
+            is_critical = get_policy().is_critical(canonical_review)
+
+    templated = None
+    if not is_critical and RESPONSE_TEMPLATES_ENABLED:
+        with stage("response.template"):
+            templated = _TEMPLATES.render(analyzed)
+    with _response_stats_lock:
+        _response_stats["responses"] += 1
+        if templated is not None:
+            _response_stats["templated"] += 1
+    return is_critical, templated
+
+
+def _finalize_response(llm_output: str, is_critical: bool) -> Dict[str, Any]:
+    # Templates are scrubbed too: they come from config and must obey the same rules.
+    with stage("response.scrub"):
+        llm_output = _scrub_llm_output(llm_output)
 
     # The backend is always responsible for appending the critical reference.
     # This prevents the LLM from creating or manipulating it.
-    critical_ref = None
-    final_response = llm_output.strip()
-    if is_critical:
-        critical_ref = generate_critical_ref()
-        final_response = f"{final_response}\n\n{critical_ref}"
+    critical_ref = generate_critical_ref() if is_critical else None
+    final_response = _with_critical_ref(llm_output.strip(), critical_ref)
 
     return {"response_text": final_response, "is_critical": is_critical, "critical_ref": critical_ref}
+
+
+def _with_critical_ref(response_text: str, critical_ref: Optional[str]) -> str:
+    return f"{response_text}\n\n{critical_ref}" if critical_ref else response_text
+
+
+def _response_prompt(analyzed: Dict[str, Any]) -> str:
+    # Prepare prompt input for LLM
+    # Provide the LLM with the sanitized/redacted review (not raw)
+    with stage("response.build_prompt"):
+        review_for_llm = analyzed["redacted_review"]
+        if get_policy().safe_mode:
+            # No-op when analyze_review already escaped it (escape_brackets is idempotent).
+            review_for_llm = escape_brackets(review_for_llm)
+
+        return (
+            f"Customer review: \"{review_for_llm}\"\n\n"
+            f"Sentiment: {analyzed.get('sentiment')}\n"
+            f"Issues/Praise: {analyzed.get('key_issues_praise')}\n"
+            f"Summary: {analyzed.get('summary')}\n\n"
+            "Please write an empathetic, professional response to the customer following the system instructions."
+        )
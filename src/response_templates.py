@@ -0,0 +1,96 @@
+"""Config-driven response templates for routine, non-critical reviews.
+
+Each RESPONSE_TEMPLATES entry covers one (sentiment, issue set) combination with an
+on-brand ``string.Template`` text. When an analysis matches an entry exactly,
+``generate_response`` renders it instead of calling the LLM. Uncovered combinations,
+free-form issues the templates do not know, analyses with defaulted fields (whose
+"neutral, no issues" is a placeholder, not what the review says) and critical reviews
+still go to the LLM.
+
+Template placeholders:
+    ``$issue_list``: the matched issues in natural language ("damaged product and late delivery").
+"""
+
+from __future__ import annotations
+
+import string
+from typing import Any, Dict, FrozenSet, Iterable, Mapping, NamedTuple, Optional, Tuple
+
+TEMPLATE_PLACEHOLDERS = ("issue_list",)
+
+
+class ResponseTemplate(NamedTuple):
+    sentiment: str
+    issues: Tuple[str, ...]
+    praise: FrozenSet[str]
+    template: string.Template
+
+
+def _normalize(item: Any) -> str:
+    return " ".join(str(item).lower().split())
+
+
+def _issue_list(issues: Iterable[str]) -> str:
+    issues = list(issues)
+    if len(issues) <= 1:
+        return "".join(issues)
+    return ", ".join(issues[:-1]) + " and " + issues[-1]
+
+
+class ResponseTemplateEngine:
+    """
+    Looks up a template by the analysis' sentiment and the set of known issues it reports.
+
+    Args:
+        entries: RESPONSE_TEMPLATES["TEMPLATES"] entries with ``SENTIMENT``, ``ISSUES``,
+            ``TEMPLATE`` and optionally ``PRAISE`` (known praise items that may appear in
+            key_issues_praise besides the issues, e.g. "overall satisfaction"). Any other
+            item is free text the template cannot answer, so the LLM handles it.
+        known_issues: Additional issue names to recognise besides those used by templates,
+            so an analysis mentioning one of them is not mistaken for a covered case.
+
+    Raises:
+        ValueError: If a template is malformed or uses an unknown placeholder.
+    """
+
+    def __init__(self, entries: Iterable[Mapping[str, Any]], known_issues: Iterable[str] = ()):
+        self._templates: Dict[Tuple[str, FrozenSet[str]], ResponseTemplate] = {}
+        self._known_issues = {_normalize(issue) for issue in known_issues}
+        for i, entry in enumerate(entries):
+            issues = tuple(_normalize(issue) for issue in entry.get("ISSUES", []))
+            template = string.Template(entry["TEMPLATE"])
+            try:
+                template.substitute({name: "x" for name in TEMPLATE_PLACEHOLDERS})
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"Invalid response template #{i}: {e!r}") from e
+            sentiment = _normalize(entry["SENTIMENT"])
+            self._templates[(sentiment, frozenset(issues))] = ResponseTemplate(
+                sentiment, issues, frozenset(_normalize(item) for item in entry.get("PRAISE", [])), template
+            )
+            self._known_issues.update(issues)
+
+    @classmethod
+    def from_config(cls, settings: Mapping[str, Any], known_issues: Iterable[str] = ()) -> "ResponseTemplateEngine":
+        return cls(settings.get("TEMPLATES", []), known_issues)
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def match(self, analyzed: Mapping[str, Any]) -> Optional[ResponseTemplate]:
+        """Returns the template covering ``analyzed`` exactly, or None; defaulted analyses never match."""
+        if analyzed.get("defaulted_fields"):
+            return None
+        items = {_normalize(item) for item in analyzed.get("key_issues_praise") or []}
+        issues = items & self._known_issues
+        template = self._templates.get((_normalize(analyzed.get("sentiment", "")), frozenset(issues)))
+        if template is None or not (items - issues) <= template.praise:
+            return None
+        return template
+
+    def render(self, analyzed: Mapping[str, Any]) -> Optional[str]:
+        """Renders the matching template for ``analyzed``, or returns None if no template covers it."""
+        template = self.match(analyzed)
+        if template is None:
+            return None
+        return template.template.substitute(issue_list=_issue_list(template.issues))
+
@@ -0,0 +1,208 @@
+"""Streaming readers and writers for review batches.
+
+Reviews are read lazily, either from JSONL/NDJSON (one review object per line) or by
+incrementally parsing a JSON document (a top-level array, or an object with a
+``reviews`` array as in ``reviews.json``). Results are written one at a time as they
+complete, so memory stays flat regardless of batch size.
+"""
+
+from __future__ import annotations
+
+import json
+import textwrap
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, Optional, Union
+
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+_WHITESPACE = " \t\r\n"
+
+
+def is_jsonl_path(path: Union[str, Path]) -> bool:
+    return Path(path).suffix.lower() in JSONL_SUFFIXES
+
+
+class _IncrementalJsonReader:
+    """Minimal pull parser over a text stream, built on ``JSONDecoder.raw_decode``."""
+
+    def __init__(self, fp: IO[str], chunk_size: int = 1 << 16):
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._fp.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        # Drop consumed text so the buffer never holds more than ~one item plus a chunk.
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ('' at EOF)."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed JSON: expected {char!r}, found {found or 'EOF'!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value, reading more input as needed."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number ending exactly at the buffer boundary may be truncated.
+            if end == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return obj
+
+    def array_items(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            nxt = self.peek()
+            self._pos += 1
+            if nxt == "]":
+                return
+            if nxt != ",":
+                raise ValueError(f"Malformed JSON array: unexpected {nxt or 'EOF'!r}")
+
+
+def _iter_json_reviews(fp: IO[str], key: str, chunk_size: int) -> Iterator[Dict[str, Any]]:
+    reader = _IncrementalJsonReader(fp, chunk_size)
+    first = reader.peek()
+    if first == "[":
+        yield from reader.array_items()
+        return
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            yield from reader.array_items()
+        else:
+            reader.value()  # skip unrelated top-level values
+        nxt = reader.peek()
+        if nxt == ",":
+            reader.expect(",")
+            continue
+        reader.expect("}")
+        return
+
+
+def _iter_jsonl_reviews(fp: IO[str]) -> Iterator[Dict[str, Any]]:
+    for lineno, line in enumerate(fp, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {lineno}: {e}") from e
+
+
+def iter_review_entries(
+    path: Union[str, Path], key: str = "reviews", chunk_size: int = 1 << 16
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield review entries from a JSONL file or a (possibly very large) JSON file.
+
+    Args:
+        path: Input path. ``.jsonl``/``.ndjson`` files are read line by line; anything
+            else is parsed incrementally as JSON.
+        key: Name of the array holding the reviews when the JSON top level is an object.
+        chunk_size: Number of characters read per I/O call for JSON input.
+
+    Yields:
+        One review dict at a time.
+    """
+    with open(path, "r", encoding="utf-8") as fp:
+        if is_jsonl_path(path):
+            yield from _iter_jsonl_reviews(fp)
+        else:
+            yield from _iter_json_reviews(fp, key, chunk_size)
+
+
+class ResultWriter(ABC):
+    """Writes results incrementally; each result is flushed to disk as soon as it is written."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.count = 0
+        self._fp: Optional[IO[str]] = None
+
+    def __enter__(self) -> "ResultWriter":
+        self._fp = open(self.path, "w", encoding="utf-8")
+        self._start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        assert self._fp is not None
+        self._end()
+        self._fp.close()
+        self._fp = None
+
+    def write(self, result: Dict[str, Any]) -> None:
+        assert self._fp is not None, "ResultWriter must be used as a context manager"
+        self._write_item(result)
+        self._fp.flush()
+        self.count += 1
+
+    def _start(self) -> None:
+        pass
+
+    def _end(self) -> None:
+        pass
+
+    @abstractmethod
+    def _write_item(self, result: Dict[str, Any]) -> None:
+        """Writes one result in the writer's format."""
+
+
+class NdjsonResultWriter(ResultWriter):
+    """One compact JSON object per line; a crash leaves every completed line readable."""
+
+    def _write_item(self, result: Dict[str, Any]) -> None:
+        self._fp.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+class JsonArrayResultWriter(ResultWriter):
+    """Streams a JSON array with the same layout as ``json.dumps(results, indent=2)``."""
+
+    def _write_item(self, result: Dict[str, Any]) -> None:
+        self._fp.write("[\n" if self.count == 0 else ",\n")
+        self._fp.write(textwrap.indent(json.dumps(result, indent=2, ensure_ascii=False), "  "))
+
+    def _end(self) -> None:
+        self._fp.write("\n]" if self.count else "[]")
+
+
+def open_result_writer(path: Union[str, Path]) -> ResultWriter:
+    """Pick an NDJSON writer for ``.jsonl``/``.ndjson`` outputs, otherwise a JSON array writer."""
+    return NdjsonResultWriter(path) if is_jsonl_path(path) else JsonArrayResultWriter(path)
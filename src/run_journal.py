@@ -0,0 +1,105 @@
+"""Run journal: a SQLite record of which reviews a batch run has completed.
+
+Each processed review is stored under its ``review_id`` with a hash of its text,
+its status (``done`` or ``failed``) and, when done, its serialized result. A later
+run can then skip reviews already finished (resume after a crash) or only those
+whose text is unchanged (incremental runs), replaying their stored results instead
+of paying for the LLM calls again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Union
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def journal_key(review_id: Optional[str], review_text: str) -> str:
+    """Journal key for a review; reviews without an id are keyed by their text hash."""
+    return str(review_id) if review_id not in (None, "") else f"sha256:{text_hash(review_text)}"
+
+
+class JournalEntry(NamedTuple):
+    text_hash: str
+    status: str
+    result: Optional[Dict[str, Any]]
+
+
+class RunJournal:
+    """
+    Thread-safe journal of review outcomes, committed after every record so a run
+    that dies partway through loses at most the review in progress.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reviews ("
+            "review_id TEXT PRIMARY KEY, text_hash TEXT NOT NULL, status TEXT NOT NULL, "
+            "result TEXT, error TEXT, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, review_id: str) -> Optional[JournalEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text_hash, status, result FROM reviews WHERE review_id = ?", (review_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return JournalEntry(row[0], row[1], json.loads(row[2]) if row[2] is not None else None)
+
+    def completed_result(self, review_id: str, review_text: str, check_hash: bool) -> Optional[Dict[str, Any]]:
+        """
+        Returns the stored result if ``review_id`` finished successfully before (and,
+        with ``check_hash``, its text is unchanged since), else None.
+        """
+        entry = self.get(review_id)
+        if entry is None or entry.status != STATUS_DONE:
+            return None
+        if check_hash and entry.text_hash != text_hash(review_text):
+            return None
+        return entry.result
+
+    def _record(self, review_id: str, review_text: str, status: str, result: Optional[str], error: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reviews (review_id, text_hash, status, result, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (review_id, text_hash(review_text), status, result, error, time.time()),
+            )
+            self._conn.commit()
+
+    def record_success(self, review_id: str, review_text: str, result: Dict[str, Any]) -> None:
+        self._record(review_id, review_text, STATUS_DONE, json.dumps(result, ensure_ascii=False), None)
+
+    def record_failure(self, review_id: str, review_text: str, error: BaseException) -> None:
+        self._record(review_id, review_text, STATUS_FAILED, None, f"{type(error).__name__}: {error}")
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM reviews GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "RunJournal":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,288 @@
+"""HTTP service exposing ``process_review`` for the real-time path.
+
+Config, compiled PII patterns and keyword matchers are loaded once at startup and
+shared by every request. Analysis requests that arrive within a short window are
+coalesced by a MicroBatcher into one batched LLM call (``analyze_reviews``); response
+generation stays per review.
+
+Endpoints:
+    POST /reviews   body ``{"review_text": ..., "review_id": ..., "rating": ...}`` -> result JSON
+    GET  /healthz   liveness/readiness probe
+    GET  /metrics   Prometheus text: stage latencies and pipeline counters
+
+Usage: python src/service.py --host 0.0.0.0 --port 8080
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from analysis_engine import (
+    PreparedReview,
+    analyze_reviews,
+    get_fast_path_stats,
+    get_structured_output_stats,
+    prepare_review,
+)
+from llm_client import get_context_cache_stats, get_response_cache_stats, get_scheduler_stats
+from llm_scheduler import LLMUnavailableError
+from main import build_review_result
+from metrics import METRICS, stage
+from policy import get_policy_stats
+from response_generator import generate_response, get_response_stats
+from token_accounting import LEDGER
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1 << 20
+
+
+class _PendingAnalysis(NamedTuple):
+    raw_text: str
+    prepared: PreparedReview
+    rating: Optional[float]
+    future: Future
+
+
+class MicroBatcher:
+    """
+    Coalesces analysis requests arriving within ``window_seconds`` (up to ``max_batch``)
+    into one ``analyze_reviews`` call, run on a small pool so a slow batch does not hold
+    up the next one.
+
+    Args:
+        analyze_batch: ``analyze_reviews``-compatible callable.
+        window_seconds: How long the first request of a batch waits for company.
+        max_batch: Maximum reviews per batched LLM call.
+        workers: Number of batches analyzed concurrently.
+    """
+
+    def __init__(
+        self,
+        analyze_batch: Callable[..., List[Dict[str, Any]]] = analyze_reviews,
+        window_seconds: float = 0.01,
+        max_batch: int = 16,
+        workers: int = 4,
+    ):
+        self._analyze_batch = analyze_batch
+        self.window_seconds = window_seconds
+        self.max_batch = max(1, max_batch)
+        self._queue: "queue.Queue[Optional[_PendingAnalysis]]" = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crira-batch")
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "batches": 0}
+        self._thread = threading.Thread(target=self._collect, name="crira-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, raw_text: str, prepared: PreparedReview, rating: Optional[float] = None) -> "Future[Dict[str, Any]]":
+        future: Future = Future()
+        self._queue.put(_PendingAnalysis(raw_text, prepared, rating, future))
+        return future
+
+    def _collect(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.window_seconds
+            stopping = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            with self._lock:
+                self._stats["requests"] += len(batch)
+                self._stats["batches"] += 1
+            self._pool.submit(self._dispatch, batch)
+            if stopping:
+                break
+
+    def _dispatch(self, batch: List[_PendingAnalysis]) -> None:
+        try:
+            with stage("service.analysis_batch"):
+                results = self._analyze_batch(
+                    [p.raw_text for p in batch],
+                    batch_size=len(batch),
+                    prepared=[p.prepared for p in batch],
+                    ratings=[p.rating for p in batch],
+                )
+        except Exception as exc:
+            for pending in batch:
+                pending.future.set_exception(exc)
+            return
+        for pending, result in zip(batch, results):
+            pending.future.set_result(result)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats: Dict[str, float] = dict(self._stats)
+        stats["mean_batch_size"] = round(stats["requests"] / stats["batches"], 3) if stats["batches"] else 0.0
+        return stats
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        self._pool.shutdown(wait=True)
+
+
+class ReviewService:
+    """The request-independent state of the service: the batcher and per-request logic."""
+
+    def __init__(self, batcher: MicroBatcher, request_timeout: Optional[float] = 120.0):
+        self.batcher = batcher
+        self.request_timeout = request_timeout
+
+    def process(self, review_text: str, review_id: Optional[str] = None, rating: Optional[float] = None) -> Dict[str, Any]:
+        with stage("process_review"):
+            prepared = prepare_review(review_text)
+            analyzed = self.batcher.submit(review_text, prepared, rating).result(timeout=self.request_timeout)
+            response = generate_response(analyzed, review_text, canonical_review=prepared.canonical)
+        return build_review_result(review_text, review_id, analyzed, response)
+
+    def metrics_text(self) -> str:
+        """Stage latency summaries plus pipeline counters, in Prometheus text format."""
+        lines = [METRICS.to_prometheus().rstrip("\n")]
+        counters = {
+            "batcher": self.batcher.stats(),
+            "fast_path": get_fast_path_stats(),
+            "structured_output": get_structured_output_stats(),
+            "response": get_response_stats(),
+            "response_cache": get_response_cache_stats(),
+            "context_cache": get_context_cache_stats(),
+            "scheduler": get_scheduler_stats(),
+            "tokens": LEDGER.stats(),
+            "policy": get_policy_stats(),
+        }
+        for group, values in counters.items():
+            for name, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"crira_{group}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service: ReviewService  # set on the subclass built by make_server
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, body: str, content_type: str = "application/json") -> None:
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_json(self, status: int, obj: Any) -> None:
+        self._send(status, json.dumps(obj, ensure_ascii=False))
+
+    def do_GET(self) -> None:
+        if self.path == "/healthz":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._send(200, self.service.metrics_text(), "text/plain; version=0.0.4")
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        if self.path != "/reviews":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # A negative length would make rfile.read() block until the client disconnects.
+            self._send_json(400, {"error": "invalid Content-Length"})
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": "request body too large"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"null")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            self._send_json(400, {"error": "request body must be JSON"})
+            return
+        if not isinstance(body, dict) or not isinstance(body.get("review_text"), str) or not body["review_text"]:
+            self._send_json(400, {"error": "'review_text' must be a non-empty string"})
+            return
+        rating = body.get("rating")
+        if rating is not None and not isinstance(rating, (int, float)):
+            self._send_json(400, {"error": "'rating' must be a number"})
+            return
+        try:
+            result = self.service.process(body["review_text"], review_id=body.get("review_id"), rating=rating)
+        except LLMUnavailableError as e:
+            logger.warning("LLM unavailable: %s", e)
+            self._send_json(503, {"error": "LLM temporarily unavailable"})
+            return
+        except FutureTimeoutError:
+            logger.warning("Analysis did not finish within %s s", self.service.request_timeout)
+            self._send_json(504, {"error": "analysis timed out"})
+            return
+        except Exception:
+            logger.exception("Failed to process review")
+            self._send_json(500, {"error": "internal error"})
+            return
+        self._send_json(200, result)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def make_server(host: str, port: int, service: ReviewService) -> ThreadingHTTPServer:
+    """Builds (but does not start) a threaded HTTP server bound to ``service``."""
+    handler = type("ReviewHandler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="CRIRA - Review analysis and response HTTP service")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--batch-window-ms", type=float, default=10.0, help="How long to wait to coalesce analysis requests"
+    )
+    parser.add_argument("--max-batch", type=int, default=16, help="Maximum reviews per batched analysis call")
+    parser.add_argument("--batch-workers", type=int, default=4, help="Batches analyzed concurrently")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    METRICS.enabled = True
+    prepare_review("Warm-up review, nothing to see here.")  # compile lazily built matchers before traffic
+    batcher = MicroBatcher(
+        window_seconds=args.batch_window_ms / 1000, max_batch=args.max_batch, workers=args.batch_workers
+    )
+    server = make_server(args.host, args.port, ReviewService(batcher))
+    logger.info("CRIRA service listening on http://%s:%d", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+
+
+if __name__ == "__main__":
+    main()
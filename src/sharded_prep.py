@@ -0,0 +1,83 @@
+"""Process-pool preprocessing for large batch runs.
+
+Canonicalization, PII redaction and critical-keyword matching are CPU-bound and
+serialized by the GIL in one process. ``iter_preprocessed`` splits the input stream
+into shards, preprocesses them on a process pool and yields the results merged back
+in input order, ready for the thread-based LLM dispatch stage.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, List, NamedTuple, Optional, Tuple, TypeVar
+
+from analysis_engine import PreparedReview, prepare_review
+from policy import get_policy
+
+T = TypeVar("T")
+
+
+class PreprocessedReview(NamedTuple):
+    prepared: PreparedReview
+    is_critical: bool
+
+
+def preprocess_review(review_text: str) -> PreprocessedReview:
+    """All CPU-bound, LLM-free work for one review."""
+    prepared = prepare_review(review_text)
+    return PreprocessedReview(prepared, get_policy().is_critical(prepared.canonical))
+
+
+def _preprocess_shard(texts: List[Optional[str]]) -> List[Optional[PreprocessedReview]]:
+    return [preprocess_review(t) if t is not None else None for t in texts]
+
+
+def _shards(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    shard: List[T] = []
+    for item in items:
+        shard.append(item)
+        if len(shard) >= size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def iter_preprocessed(
+    items: Iterable[T],
+    text_of: Callable[[T], Optional[str]],
+    processes: int,
+    shard_size: int = 256,
+    max_pending_shards: Optional[int] = None,
+) -> Iterator[Tuple[T, Optional[PreprocessedReview]]]:
+    """
+    Preprocesses ``items`` on ``processes`` worker processes, yielding ``(item, preprocessed)``
+    in input order.
+
+    Args:
+        items: Input items; consumed lazily.
+        text_of: Returns the review text of an item, or None to skip preprocessing it
+            (e.g. results replayed from the run journal).
+        processes: Size of the process pool.
+        shard_size: Reviews sent to a worker per task; larger shards amortize IPC.
+        max_pending_shards: Shards submitted but not yet yielded (default ``2 * processes``),
+            which bounds memory on very large inputs.
+    """
+    limit = max(1, max_pending_shards if max_pending_shards is not None else 2 * processes)
+    # "spawn" avoids forking a parent that already runs LLM worker threads.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        pending: Deque[Tuple[List[T], "Future[List[Optional[PreprocessedReview]]]"]] = deque()
+        for shard in _shards(items, max(1, shard_size)):
+            pending.append((shard, pool.submit(_preprocess_shard, [text_of(item) for item in shard])))
+            # Shards are merged strictly in submission order, so output order is deterministic.
+            while len(pending) >= limit:
+                yield from _merge(*pending.popleft())
+        while pending:
+            yield from _merge(*pending.popleft())
+
+
+def _merge(shard: List[T], future: "Future[List[Optional[PreprocessedReview]]]") -> Iterator[Tuple[T, Optional[PreprocessedReview]]]:
+    yield from zip(shard, future.result())
@@ -0,0 +1,239 @@
+"""Structured LLM output: response schemas, partial JSON recovery and field validation.
+
+The analysis prompts ask for JSON objects whose keys are ANALYSIS_OUTPUT_SCHEMA. This
+module builds the matching response schema for schema-constrained generation, and
+recovers as much as possible from output that is still not valid JSON (prose around
+the object, a truncated or unterminated object) so that only the fields actually
+missing need to be asked for again.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SENTIMENTS = ("positive", "neutral", "negative")
+
+# Gemini response-schema fragments (OpenAPI subset) for the known analysis fields.
+ANALYSIS_FIELD_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "sentiment": {"type": "STRING", "format": "enum", "enum": list(SENTIMENTS)},
+    "key_issues_praise": {"type": "ARRAY", "items": {"type": "STRING"}},
+    "summary": {"type": "STRING"},
+}
+_DEFAULT_FIELD_SCHEMA: Dict[str, Any] = {"type": "STRING"}
+
+
+def _ordered_fields(fields: Iterable[str]) -> List[str]:
+    fields = set(fields)
+    return [f for f in ANALYSIS_FIELD_SCHEMAS if f in fields] + sorted(fields - ANALYSIS_FIELD_SCHEMAS.keys())
+
+
+def analysis_response_schema(fields: Iterable[str], with_id: bool = False) -> Dict[str, Any]:
+    """
+    Response schema of one analysis object with the given fields, all required.
+
+    Args:
+        fields: Field names, e.g. ANALYSIS_OUTPUT_SCHEMA; unknown fields are typed as strings.
+        with_id: Also require the ``id`` string used by batched analysis.
+    """
+    names = (["id"] if with_id else []) + _ordered_fields(fields)
+    return {
+        "type": "OBJECT",
+        "properties": {name: ANALYSIS_FIELD_SCHEMAS.get(name, _DEFAULT_FIELD_SCHEMA) for name in names},
+        "required": names,
+    }
+
+
+def batch_response_schema(fields: Iterable[str]) -> Dict[str, Any]:
+    """Response schema of a batched analysis: an array of analysis objects with ids."""
+    return {"type": "ARRAY", "items": analysis_response_schema(fields, with_id=True)}
+
+
+def _matches(value: Any, schema: Dict[str, Any]) -> bool:
+    kind = schema.get("type")
+    if kind == "STRING":
+        return isinstance(value, str) and ("enum" not in schema or value in schema["enum"])
+    if kind == "ARRAY":
+        items = schema.get("items", {})
+        return isinstance(value, list) and all(_matches(item, items) for item in value)
+    return True
+
+
+def validate_fields(obj: Any, fields: Iterable[str]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Splits ``obj`` into the requested fields that are present and well-typed, and the
+    names of those that are missing or invalid.
+    """
+    valid: Dict[str, Any] = {}
+    missing: List[str] = []
+    for name in _ordered_fields(fields):
+        if isinstance(obj, dict) and name in obj and _matches(obj[name], ANALYSIS_FIELD_SCHEMAS.get(name, {})):
+            valid[name] = obj[name]
+        else:
+            missing.append(name)
+    return valid, missing
+
+
+_DECODER = json.JSONDecoder()
+_WS_RE = re.compile(r"\s*")
+
+
+class _Incomplete(Exception):
+    """The text ends (or stops being JSON) before the value at hand is complete."""
+
+
+def _skip_ws(text: str, i: int) -> int:
+    return _WS_RE.match(text, i).end()
+
+
+def _parse_scalar(text: str, i: int) -> Tuple[Any, int]:
+    try:
+        return _DECODER.raw_decode(text, i)
+    except json.JSONDecodeError as e:
+        raise _Incomplete from e
+
+
+def _parse_value(text: str, i: int) -> Tuple[Any, int, bool]:
+    """
+    Parses the value at ``i``; returns ``(value, end, complete)``. A cut-off object or
+    array is returned with the members it got so far and ``complete=False``.
+    """
+    i = _skip_ws(text, i)
+    if i >= len(text):
+        raise _Incomplete
+    if text[i] == "{":
+        return _parse_container(text, i + 1, {}, "}")
+    if text[i] == "[":
+        return _parse_container(text, i + 1, [], "]")
+    value, end = _parse_scalar(text, i)
+    return value, end, True
+
+
+def _parse_member(text: str, i: int) -> Tuple[str, Any, int, bool]:
+    """Parses ``"key": value`` at ``i``; returns ``(key, value, end, complete)``."""
+    if text[i : i + 1] != '"':
+        raise _Incomplete
+    key, i = _parse_scalar(text, i)
+    i = _skip_ws(text, i)
+    if text[i : i + 1] != ":":
+        raise _Incomplete
+    value, end, complete = _parse_value(text, i + 1)
+    return key, value, end, complete
+
+
+def _parse_container(text: str, i: int, container: Any, closer: str) -> Tuple[Any, int, bool]:
+    """Parses object or array members after the opening bracket, keeping every complete one."""
+    while True:
+        i = _skip_ws(text, i)
+        if i >= len(text):
+            return container, i, False
+        if text[i] == closer:
+            return container, i + 1, True
+        if text[i] == ",":  # also tolerates stray and trailing commas
+            i += 1
+            continue
+        try:
+            if isinstance(container, dict):
+                key, value, end, complete = _parse_member(text, i)
+            else:
+                value, end, complete = _parse_value(text, i)
+        except _Incomplete:
+            return container, i, False
+        if not complete:
+            return container, end, False
+        if isinstance(container, dict):
+            container[key] = value
+        else:
+            container.append(value)
+        i = end
+
+
+class JSONObjectExtractor:
+    """
+    Incrementally extracts the first JSON object from text fed in pieces (e.g. a
+    streamed LLM response), tolerating prose before it and truncation inside it.
+
+    A top-level member is committed to ``members`` once anything follows it, and each
+    ``feed`` resumes parsing after the last committed member, so members are parsed
+    once however the text is split. ``partial`` holds the member still being received
+    (e.g. the first items of a cut-off array). ``finish`` commits a last member whose
+    value turned out complete, for output that just lacks its closing brace.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._pos: Optional[int] = None  # just after '{' or the last committed member
+        self.members: Dict[str, Any] = {}
+        self.partial: Dict[str, Any] = {}
+        self._partial_complete = False
+        self.complete = False
+
+    @property
+    def value(self) -> Dict[str, Any]:
+        return {**self.members, **self.partial}
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """Adds ``chunk`` and returns the object recovered so far (``value``)."""
+        self._buffer += chunk
+        if self.complete:
+            return self.value
+        text = self._buffer
+        if self._pos is None:
+            start = text.find("{")
+            if start < 0:
+                return self.value
+            self._pos = start + 1
+        self.partial, self._partial_complete = {}, False
+        i = self._pos
+        while True:
+            i = _skip_ws(text, i)
+            if i >= len(text):
+                break
+            if text[i] == "}":
+                self.complete = True
+                break
+            if text[i] == ",":
+                i = self._pos = i + 1
+                continue
+            try:
+                key, value, end, complete = _parse_member(text, i)
+            except _Incomplete:
+                break
+            if not complete or _skip_ws(text, end) >= len(text):
+                # More of this value may still arrive (e.g. digits of a number).
+                self.partial, self._partial_complete = {key: value}, complete
+                break
+            self.members[key] = value
+            i = self._pos = end
+        return self.value
+
+    def finish(self) -> Dict[str, Any]:
+        """Ends the input: commits a complete last member; returns the committed members."""
+        if self._partial_complete:
+            self.members.update(self.partial)
+            self.partial, self._partial_complete = {}, False
+        return self.members
+
+
+def extract_json_object(text: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Returns ``(members, complete)`` for the first JSON object in ``text``: its complete
+    members, also from a truncated or unterminated object (``({}, False)`` if there is
+    none), and whether the object was properly closed.
+    """
+    extractor = JSONObjectExtractor()
+    extractor.feed(text)
+    return extractor.finish(), extractor.complete
+
+
+def extract_json_array(text: str) -> Tuple[List[Any], bool]:
+    """
+    Returns ``(items, complete)`` for the first JSON array in ``text``; the complete
+    items of a truncated array are kept and a cut-off last item is dropped.
+    """
+    start = text.find("[")
+    if start < 0:
+        return [], False
+    items, _, complete = _parse_container(text, start + 1, [], "]")
+    return items, complete
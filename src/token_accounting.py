@@ -0,0 +1,218 @@
+"""Token accounting for LLM calls and a token budget for batch runs.
+
+Every LLM call is metered: transports report the provider's usage metadata with
+``report_usage`` while the call is in progress, and calls without reported usage
+(dummy mode, streams, transports that do not report) are estimated locally. Usage is
+aggregated process-wide per stage and per model in ``LEDGER``, and per review inside
+``track_review``. ``TokenBudget`` uses the ledger to degrade non-critical work as a
+run's token budget runs out.
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, Optional
+
+from llm_scheduler import estimate_tokens
+
+DEFAULT_STAGE = "llm"
+
+
+@dataclass
+class TokenUsage:
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0  # part of input_tokens served from a context cache
+    calls: int = 0
+    estimated_calls: int = 0  # calls whose usage was estimated locally
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def add(self, input_tokens: int, output_tokens: int, cached_tokens: int = 0, estimated: bool = False) -> None:
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cached_tokens += cached_tokens
+        self.calls += 1
+        self.estimated_calls += int(estimated)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {**asdict(self), "total_tokens": self.total_tokens}
+
+
+class TokenLedger:
+    """Thread-safe process-wide token totals, per stage and per model."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._total = TokenUsage()
+        self._by_stage: Dict[str, TokenUsage] = {}
+        self._by_model: Dict[str, TokenUsage] = {}
+
+    def record(
+        self, stage: str, model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0, estimated: bool = False
+    ) -> None:
+        with self._lock:
+            for usage in (
+                self._total,
+                self._by_stage.setdefault(stage, TokenUsage()),
+                self._by_model.setdefault(model, TokenUsage()),
+            ):
+                usage.add(input_tokens, output_tokens, cached_tokens, estimated)
+
+    @property
+    def total_tokens(self) -> int:
+        with self._lock:
+            return self._total.total_tokens
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                **self._total.as_dict(),
+                "by_stage": {name: usage.as_dict() for name, usage in sorted(self._by_stage.items())},
+                "by_model": {name: usage.as_dict() for name, usage in sorted(self._by_model.items())},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._total = TokenUsage()
+            self._by_stage.clear()
+            self._by_model.clear()
+
+
+LEDGER = TokenLedger()
+
+_stage: ContextVar[str] = ContextVar("token_stage", default=DEFAULT_STAGE)
+_review: ContextVar[Optional[TokenUsage]] = ContextVar("token_review", default=None)
+_meter: ContextVar[Optional["CallMeter"]] = ContextVar("token_meter", default=None)
+
+
+@contextmanager
+def usage_stage(name: str) -> Iterator[None]:
+    """Attributes the LLM calls made inside the block to stage ``name`` in the ledger."""
+    token = _stage.set(name)
+    try:
+        yield
+    finally:
+        _stage.reset(token)
+
+
+@contextmanager
+def track_review() -> Iterator[TokenUsage]:
+    """Accumulates the usage of the LLM calls made inside the block, e.g. for one review."""
+    usage = TokenUsage()
+    token = _review.set(usage)
+    try:
+        yield usage
+    finally:
+        _review.reset(token)
+
+
+class CallMeter:
+    """Usage of one LLM call: as reported by the transport, or estimated from the text."""
+
+    __slots__ = ("model", "prompt_tokens", "reported", "_stage", "_review")
+
+    def __init__(self, model: str, prompt_tokens: int):
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.reported: Optional[tuple] = None
+        # Captured now: a stream may be finished from another context.
+        self._stage = _stage.get()
+        self._review = _review.get()
+
+    def finish(self, output_text: str) -> None:
+        if self.reported is not None:
+            input_tokens, output_tokens, cached_tokens = self.reported
+            estimated = False
+        else:
+            input_tokens, output_tokens, cached_tokens = self.prompt_tokens, estimate_tokens(output_text), 0
+            estimated = True
+        LEDGER.record(self._stage, self.model, input_tokens, output_tokens, cached_tokens, estimated)
+        if self._review is not None:
+            self._review.add(input_tokens, output_tokens, cached_tokens, estimated)
+
+
+@contextmanager
+def meter_call(model: str, prompt_tokens: int) -> Iterator[CallMeter]:
+    """Meters the call made inside the block; the caller ends it with ``meter.finish(text)``."""
+    meter = CallMeter(model, prompt_tokens)
+    token = _meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _meter.reset(token)
+
+
+def report_usage(input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> None:
+    """Called by transports with the provider-reported usage of the request in progress."""
+    meter = _meter.get()
+    if meter is not None:
+        meter.reported = (input_tokens, output_tokens, cached_tokens)
+
+
+DISPATCH_FULL = "full"
+DISPATCH_REDUCED = "reduced"  # lower max_tokens
+DISPATCH_CHEAP = "cheap"  # lower max_tokens and a cheaper model
+DISPATCH_DEFER = "defer"  # not processed in this run
+
+
+class TokenBudget:
+    """
+    Token budget for one run, measured on ``LEDGER`` from the budget's creation.
+
+    ``decide`` is called before each review. Critical reviews always get ``"full"``.
+    Non-critical reviews are degraded step by step as the used share of the budget
+    passes each threshold: lower ``max_tokens``, then also a cheaper model, then
+    deferral. Decisions are made at dispatch time, so with concurrent workers the
+    in-flight reviews can overshoot; ``defer_at`` below 1 leaves room for that.
+
+    Args:
+        limit: Total (input + output) tokens for the run.
+        reduce_at, cheap_at, defer_at: Used shares of ``limit`` at which each step starts.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        reduce_at: float = 0.7,
+        cheap_at: float = 0.85,
+        defer_at: float = 0.95,
+        ledger: TokenLedger = LEDGER,
+    ):
+        self.limit = limit
+        self.reduce_at = reduce_at
+        self.cheap_at = cheap_at
+        self.defer_at = defer_at
+        self._ledger = ledger
+        self._baseline = ledger.total_tokens
+        self._lock = threading.Lock()
+        self._decisions = {DISPATCH_FULL: 0, DISPATCH_REDUCED: 0, DISPATCH_CHEAP: 0, DISPATCH_DEFER: 0}
+
+    @property
+    def used(self) -> int:
+        return self._ledger.total_tokens - self._baseline
+
+    def decide(self, is_critical: bool) -> str:
+        share = self.used / self.limit if self.limit > 0 else 0.0
+        if is_critical or share < self.reduce_at:
+            decision = DISPATCH_FULL
+        elif share < self.cheap_at:
+            decision = DISPATCH_REDUCED
+        elif share < self.defer_at:
+            decision = DISPATCH_CHEAP
+        else:
+            decision = DISPATCH_DEFER
+        with self._lock:
+            self._decisions[decision] += 1
+        return decision
+
+    def stats(self) -> Dict[str, object]:
+        used = self.used
+        with self._lock:
+            decisions = dict(self._decisions)
+        return {"limit": self.limit, "used": used, "remaining": max(0, self.limit - used), "decisions": decisions}
@@ -1,12 +1,45 @@
 """Utility helpers."""
 from __future__ import annotations
 
+import logging
 import re
+import time
 import uuid
-from typing import Tuple, List
+from functools import lru_cache
+from typing import List, Optional, Set, Tuple
 
-from config import PII_PATTERNS
-def canonicalize_text(text: str) -> str:
+from config import PII_MAX_CHUNK_CHARS, PII_MAX_SENTENCE_CHARS, PII_TIME_BUDGET_MS
+from keyword_matcher import KeywordMatcher
+from metrics import stage
+from policy import PiiRule, get_policy
+
+logger = logging.getLogger(__name__)
+
+# Allow-list of characters: alphanumeric, space, and common punctuation.
+# The regex pattern matches any character NOT in this set.
+_DISALLOWED_CHARS_RE = re.compile(r"[^a-zA-Z0-9\s.,!?'\"()&%$#@_-]")
+_WHITESPACE_RE = re.compile(r"\s+")
+_ALLOWED_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.,!?'\"()&%$#@_-")
+
+
+class _AllowListTable(dict):
+    """
+    ``str.translate`` table that keeps allow-listed characters and whitespace and drops the rest.
+    Entries are filled lazily per code point, so the table only grows with the characters seen.
+    """
+
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        ch = chr(codepoint)
+        # str.isspace() is the same predicate re uses for \s on str patterns.
+        value = codepoint if ch in _ALLOWED_CHARS or ch.isspace() else None
+        self[codepoint] = value
+        return value
+
+
+_ALLOW_LIST_TABLE = _AllowListTable()
+
+
+def canonicalize_text(text: str, use_translate: Optional[bool] = None) -> str:
     """
     Canonicalize input text to reduce injection risks using an allow-list approach.
     - Keep only a predefined set of safe characters (alphanumeric, common punctuation).
@@ -14,19 +47,24 @@ def canonicalize_text(text: str) -> str:
 
     Args:
         text: The input string to canonicalize.
+        use_translate: Filter with a cached ``str.translate`` table (``True``) or the
+            equivalent precompiled regexes (``False``). By default the table is used for
+            ASCII text, where CPython's translate fast path makes it ~5x faster, and the
+            regexes otherwise.
 
     Returns:
         The canonicalized string with only allowed characters and normalized
         whitespace.
     """
-    # Allow-list of characters: alphanumeric, space, and common punctuation.
-    # The regex pattern matches any character NOT in this set.
-    allowed_chars_pattern = r"[^a-zA-Z0-9\s.,!?'\"()&%$#@_-]"
+    if use_translate is None:
+        use_translate = text.isascii()
+    if use_translate:
+        # split() with no argument splits on the same whitespace as \s+ and drops the ends.
+        return " ".join(text.translate(_ALLOW_LIST_TABLE).split())
     # Remove any character not on the allow-list
-    text = re.sub(allowed_chars_pattern, "", text)
+    text = _DISALLOWED_CHARS_RE.sub("", text)
     # Collapse all whitespace to single spaces and strip leading/trailing space
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    return _WHITESPACE_RE.sub(" ", text).strip()
 
 
 def generate_critical_ref() -> str:
@@ -52,8 +90,24 @@ def contains_critical_keyword(text: str, keywords: list[str]) -> bool:
     Returns:
         True if any keyword is found, False otherwise.
     """
-    lowered = text.lower()
-    return any(k.lower() in lowered for k in keywords)
+    return get_keyword_matcher(tuple(keywords)).contains(text)
+
+
+@lru_cache(maxsize=32)
+def get_keyword_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    """
+    Returns a compiled matcher for ``keywords``, built once per distinct keyword list.
+
+    Args:
+        keywords: The keywords as a tuple (so it can be used as a cache key).
+
+    Returns:
+        A shared KeywordMatcher instance.
+    """
+    return KeywordMatcher(keywords)
+
+
+_UNESCAPED_BRACKET_RE = re.compile(r"(?<!\\)([\[\]])")
 
 
 def escape_brackets(text: str) -> str:
@@ -61,34 +115,137 @@ def escape_brackets(text: str) -> str:
     Escape square brackets to limit attempts to inject bracketed tokens.
     In safe mode we will escape them before giving to LLM.
 
+    Brackets that are already escaped are left alone, so escaping twice is a no-op.
+    Canonicalized text never contains backslashes, so any escape present was added here.
+
     Args:
         text: The input string.
 
     Returns:
         The string with square brackets escaped.
     """
-    return text.replace("[", "\\[").replace("]", "\\]")
+    if "\\" not in text:
+        return text.replace("[", "\\[").replace("]", "\\]")
+    return _UNESCAPED_BRACKET_RE.sub(r"\\\1", text)
+
+
+PII_MASKED_TAG = "PII_MASKED"
+_PII_MASK = f"[{PII_MASKED_TAG}]"
+# The "." of a sentence boundary ". X". Cutting a chunk right before it puts the chunk's \Z
+# exactly where PII_ADDRESS's lookahead (?=\.\s[A-Z]|\Z) stops a match anyway.
+_SENTENCE_CUT_RE = re.compile(r"\.(?=\s[A-Z])")
 
 
-def redact_pii(text: str) -> Tuple[str, List[str]]:
+def _redaction_chunks(text: str, max_chars: int) -> List[str]:
+    """
+    Splits ``text`` at sentence boundaries into chunks of at most ``max_chars`` characters.
+
+    No PII pattern match continues across a sentence boundary, so redacting the chunks
+    separately gives the same result as redacting the whole text. A single sentence
+    longer than ``max_chars`` becomes a chunk of its own.
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return [text]
+    chunks: List[str] = []
+    start = 0
+    while len(text) - start > max_chars:
+        end = start + max_chars
+        cut = start
+        for m in _SENTENCE_CUT_RE.finditer(text, start + 1, end + 2):
+            if m.start() <= end:
+                cut = m.start()
+        if cut == start:
+            m = _SENTENCE_CUT_RE.search(text, end)
+            cut = m.start() if m else len(text)
+        chunks.append(text[start:cut])
+        start = cut
+    if start < len(text):
+        chunks.append(text[start:])
+    return chunks
+
+
+def _redact_chunk(
+    text: str, rules: Tuple[PiiRule, ...], found: Set[str], deadline: Optional[float]
+) -> Optional[str]:
+    """Applies every PII rule to ``text``; returns None if ``deadline`` passes first."""
+    redacted = text
+    for rule in rules:
+        if deadline is not None and time.perf_counter() > deadline:
+            return None
+        if rule.prefilter is not None and rule.prefilter.search(redacted) is None:
+            continue
+        with stage(rule.stage):
+            redacted, count = rule.pattern.subn(rule.placeholder, redacted)
+        if count:
+            found.add(rule.tag)
+    return redacted
+
+
+def redact_pii(
+    text: str,
+    time_budget_ms: Optional[float] = None,
+    max_chunk_chars: Optional[int] = None,
+    max_sentence_chars: Optional[int] = None,
+) -> Tuple[str, List[str]]:
     """
     Replace recognized PII with placeholders and return the redacted text and list of placeholders found.
     Deterministic regex-based redaction is used to avoid exposing raw PII to the LLM.
 
+    The patterns are the current policy's (``get_policy()``), applied in config order.
+    Each pattern is gated by a cheap prefilter (e.g. an email needs an '@'), so patterns
+    that cannot match are never run, and those that can are applied with a single
+    ``subn`` pass instead of search + sub.
+    Each pattern's time is recorded as the ``redact.<PII tag>`` metrics stage.
+
+    Long texts are redacted in sentence-aligned chunks, which bounds the cost of patterns
+    that backtrack super-linearly. Where redaction cannot be trusted to finish, the text
+    is conservatively replaced by ``[PII_MASKED]`` instead: a sentence longer than
+    ``max_sentence_chars``, and everything left once ``time_budget_ms`` has run out
+    (checked between pattern runs). Either way no unredacted text gets through.
+
     Args:
         text: The input string to redact.
+        time_budget_ms: Redaction time budget for this text, ``PII_TIME_BUDGET_MS`` by
+            default; 0 disables it.
+        max_chunk_chars: Chunk size, ``PII_MAX_CHUNK_CHARS`` by default; 0 disables chunking
+            (and the sentence length limit).
+        max_sentence_chars: Longest sentence that is redacted rather than masked,
+            ``PII_MAX_SENTENCE_CHARS`` by default.
 
     Returns:
         A tuple containing:
         - The redacted string with PII replaced by placeholders.
-        - A list of the PII types found (e.g., ['PII_EMAIL']).
+        - A list of the PII types found (e.g., ['PII_EMAIL']), with 'PII_MASKED' last if
+          any text was masked.
     """
-    found: List[str] = []
-    redacted = text
-    for tag, pattern in PII_PATTERNS.items():
-        # find occurrences
-        if pattern.search(redacted):
-            found.append(tag)
-            # replace all matches with placeholder
-            redacted = pattern.sub(f"[{tag}]", redacted)
-    return redacted, found
+    budget_ms = PII_TIME_BUDGET_MS if time_budget_ms is None else time_budget_ms
+    deadline = time.perf_counter() + budget_ms / 1000 if budget_ms > 0 else None
+    max_chars = PII_MAX_CHUNK_CHARS if max_chunk_chars is None else max_chunk_chars
+    max_sentence = PII_MAX_SENTENCE_CHARS if max_sentence_chars is None else max_sentence_chars
+    rules = get_policy().pii_rules
+
+    found_tags: Set[str] = set()
+    parts: List[str] = []
+    masked = False
+    for chunk in _redaction_chunks(text, max_chars):
+        if max_chars > 0 and len(chunk) > max(max_chars, max_sentence):
+            logger.warning("Masking a %d-char sentence too long to redact safely.", len(chunk))
+            parts.append(_PII_MASK)
+            masked = True
+            continue
+        redacted = _redact_chunk(chunk, rules, found_tags, deadline)
+        if redacted is None:
+            logger.warning(
+                "PII redaction exceeded its %g ms budget on a %d-char text; masking the remainder.",
+                budget_ms,
+                len(text),
+            )
+            parts.append(_PII_MASK)
+            masked = True
+            break
+        parts.append(redacted)
+
+    found = [rule.tag for rule in rules if rule.tag in found_tags]
+    if masked:
+        found.append(PII_MASKED_TAG)
+    return "".join(parts), found
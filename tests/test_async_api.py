@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import pytest
+
+import analysis_engine
+import llm_client
+import main
+from fake_transport import FakeTransport
+from llm_scheduler import LLMScheduler, LLMUnavailableError
+
+CRITICAL_REVIEW = "The heater caught fire, this is dangerous. Not sure what else to say about it."
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    def install(transport, **scheduler_kwargs):
+        monkeypatch.setattr(llm_client, "_transport", transport)
+        monkeypatch.setattr(llm_client, "_scheduler", LLMScheduler(**scheduler_kwargs))
+        monkeypatch.setattr(llm_client, "_response_cache", None)
+        monkeypatch.setattr(llm_client, "_response_cache_ready", True)
+        return transport
+
+    return install
+
+
+def test_async_results_match_sync(fake_llm):
+    fake_llm(FakeTransport())
+    sync = main.process_review(CRITICAL_REVIEW, review_id="r1")
+    result = asyncio.run(main.aprocess_review(CRITICAL_REVIEW, review_id="r1"))
+    assert result["analyzed"] == sync["analyzed"]
+    assert result["response"]["is_critical"] and result["response"]["critical_ref"] != sync["response"]["critical_ref"]
+
+
+def test_many_reviews_run_concurrently_on_one_loop(fake_llm):
+    transport = fake_llm(FakeTransport(latency=0.05))
+
+    async def run():
+        return await asyncio.gather(*(main.aprocess_review(f"{CRITICAL_REVIEW} #{i}") for i in range(200)))
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    assert len(results) == 200 and transport.requests == 400
+    assert time.perf_counter() - start < 2.0  # 400 sequential calls would take 20s
+
+
+def test_llm_timeout_fails_the_analysis(fake_llm):
+    fake_llm(FakeTransport(latency=1.0))
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(analysis_engine.aanalyze_review(CRITICAL_REVIEW, timeout=0.01))
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(llm_client.acall_llm("hello", timeout=0.01))
+
+
+def test_review_deadline_and_cancellation(fake_llm):
+    transport = fake_llm(FakeTransport(latency=1.0))
+    with pytest.raises(TimeoutError):
+        asyncio.run(main.aprocess_review(CRITICAL_REVIEW, timeout=0.05))
+
+    async def cancel_midway():
+        task = asyncio.create_task(main.aprocess_review(CRITICAL_REVIEW))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_midway())
+    assert transport.requests == 2
+
+
+def test_async_retries_back_off_without_blocking(fake_llm):
+    transport = fake_llm(FakeTransport(fail_first=2, status=429), backoff_base_seconds=0.01)
+    assert asyncio.run(llm_client.acall_llm("hi", system="CustomerCareBot")).startswith("Thank you")
+    assert transport.requests == 3
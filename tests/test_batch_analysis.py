@@ -0,0 +1,40 @@
+from unittest import mock
+
+import pytest
+
+import analysis_engine
+from analysis_engine import analyze_review, analyze_reviews
+
+
+REVIEWS = [
+    "I love this kettle, five stars.",
+    "The box arrived damaged and late. I want a refund.",
+    "It is fine.",
+    "My email is test@example.com and the lid was broken.",
+]
+
+
+@pytest.fixture(autouse=True)
+def _llm_only(monkeypatch):
+    # These tests count LLM calls; keep the local fast path out of the way.
+    monkeypatch.setattr(analysis_engine, "FAST_PATH_ENABLED", False)
+
+
+def test_batch_results_match_single_review_analysis():
+    with mock.patch.object(analysis_engine, "call_llm", wraps=analysis_engine.call_llm) as spy:
+        batched = analyze_reviews(REVIEWS, batch_size=3)
+    # 4 reviews with batch_size=3 -> one packed call plus one single call
+    assert spy.call_count == 2
+    assert batched == [analyze_review(r) for r in REVIEWS]
+
+
+def test_items_missing_from_batch_output_fall_back_to_single_calls():
+    reviews = ["Great blender!", "__DUMMY_ERROR_INCOMPLETE_JSON__ arrived broken", "Late again."]
+    with mock.patch.object(analysis_engine, "call_llm", wraps=analysis_engine.call_llm) as spy:
+        results = analyze_reviews(reviews, batch_size=10)
+    # the batch, one retry for the dropped item, and a repair of the field its retry lacked
+    assert spy.call_count == 3
+    assert results[0]["sentiment"] == "positive"
+    assert results[1]["summary"] == "Customer is unhappy."
+    assert results[1]["key_issues_praise"] == ["damaged product"]
+    assert results[2]["key_issues_praise"] == ["late delivery"]
@@ -0,0 +1,113 @@
+import random
+import threading
+import time
+
+import pytest
+
+from batch_executor import PRIORITY_CRITICAL, PRIORITY_ROUTINE, ThroughputStats, map_ordered, map_prioritized
+from metrics import StageMetrics
+
+
+def test_concurrent_results_keep_input_order():
+    def slow_double(x):
+        time.sleep(random.uniform(0, 0.01))
+        return x * 2
+
+    outcomes = list(map_ordered(slow_double, range(50), workers=8))
+    assert [item for item, _, _ in outcomes] == list(range(50))
+    assert [result for _, result, _ in outcomes] == [x * 2 for x in range(50)]
+
+
+def test_failures_are_isolated_per_item():
+    def fail_on_three(x):
+        if x == 3:
+            raise RuntimeError("boom")
+        return x
+
+    stats = ThroughputStats()
+    for _, _, error in map_ordered(fail_on_three, range(6), workers=4):
+        stats.record(error)
+    assert stats.succeeded == 5
+    assert stats.failed == 1
+
+
+def test_max_in_flight_is_respected():
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def track(x):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.005)
+        with lock:
+            active -= 1
+        return x
+
+    list(map_ordered(track, range(40), workers=8, max_in_flight=3))
+    assert peak <= 3
+
+
+def test_prioritized_runs_critical_items_first_and_yields_in_order():
+    critical = {17, 42}
+    ingested = threading.Event()
+    started, completed = [], []
+
+    def priority_of(x):
+        if x == 49:
+            ingested.set()
+        return PRIORITY_CRITICAL if x in critical else PRIORITY_ROUTINE
+
+    def work(x):
+        started.append(x)
+        ingested.wait()  # the whole input is queued before the first item finishes
+        return x * 2
+
+    waits = StageMetrics(enabled=True)
+    outcomes = list(
+        map_prioritized(
+            work,
+            range(50),
+            priority_of,
+            on_complete=lambda outcome: completed.append(outcome[0]),
+            wait_metrics=waits,
+        )
+    )
+
+    assert [item for item, _, _ in outcomes] == list(range(50))
+    assert [result for _, result, _ in outcomes] == [x * 2 for x in range(50)]
+    assert critical <= set(started[:3])  # at most one routine item was taken before them
+    assert completed == started
+    assert waits.summary()["critical"]["count"] == 2
+    assert waits.summary()["routine"]["count"] == 48
+
+
+def test_prioritized_bounds_routine_work_and_reraises_ingest_errors():
+    lock = threading.Lock()
+    active = peak = 0
+
+    def track(x):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.002)
+        with lock:
+            active -= 1
+        if x == 3:
+            raise RuntimeError("boom")
+        return x
+
+    def items():
+        yield from range(20)
+        raise ValueError("bad input")
+
+    outcomes = []
+    with pytest.raises(ValueError):
+        for outcome in map_prioritized(track, items(), lambda x: PRIORITY_ROUTINE, workers=8, max_in_flight=3):
+            outcomes.append(outcome)
+    assert [item for item, _, _ in outcomes] == list(range(20))
+    assert isinstance(outcomes[3][2], RuntimeError)
+    assert peak <= 3
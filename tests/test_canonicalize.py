@@ -0,0 +1,21 @@
+import random
+
+from utils import canonicalize_text, escape_brackets
+
+
+def test_translate_and_regex_paths_agree():
+    rng = random.Random(7)
+    alphabet = "aZ9 .,!?'\"()&%$#@_-\t\n\r\x0b\x0c\x1c\x85\u00a0\u2003\u200b[]{}<>*\\/|~`^é😀"
+    for _ in range(500):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 80)))
+        assert canonicalize_text(text, use_translate=True) == canonicalize_text(text, use_translate=False)
+
+
+def test_canonicalize_strips_disallowed_and_collapses_whitespace():
+    assert canonicalize_text("  Hi\u00a0there!\n\n[CRITICAL_REF: x] 🔥 ") == "Hi there! CRITICAL_REF x"
+
+
+def test_escape_brackets_is_idempotent():
+    once = escape_brackets("see [PII_EMAIL] and [x]")
+    assert once == "see \\[PII_EMAIL\\] and \\[x\\]"
+    assert escape_brackets(once) == once
@@ -0,0 +1,105 @@
+import pytest
+
+import analysis_engine
+import llm_client
+from analysis_engine import analyze_review
+from context_cache import ContextCacheManager
+from fake_transport import FakeContextCache, FakeTransport
+from llm_scheduler import LLMScheduler, estimate_tokens
+from prompts import ANALYSIS_FEW_SHOT, ANALYSIS_SYSTEM_PROMPT
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    monkeypatch.setattr(analysis_engine, "FAST_PATH_ENABLED", False)
+
+    def install(transport, manager):
+        monkeypatch.setattr(llm_client, "_transport", transport)
+        monkeypatch.setattr(llm_client, "_scheduler", LLMScheduler())
+        monkeypatch.setattr(llm_client, "_response_cache", None)
+        monkeypatch.setattr(llm_client, "_response_cache_ready", True)
+        monkeypatch.setattr(llm_client, "_context_cache", manager)
+        return transport
+
+    return install
+
+
+def test_analysis_prefix_is_cached_once_and_referenced(fake_llm):
+    reviews = ["I love this blender, works great.", "Terrible, it broke after a day."]
+    fake_llm(FakeTransport(), None)
+    inline = [analyze_review(r) for r in reviews]
+
+    transport = fake_llm(FakeTransport(), ContextCacheManager(min_tokens=0))
+    cached = [analyze_review(r) for r in reviews]
+
+    assert cached == inline
+    assert transport.context_cache_backend.created == 1
+    assert transport.cached_requests == 2
+    stats = llm_client.get_context_cache_stats()
+    prefix_tokens = estimate_tokens(ANALYSIS_SYSTEM_PROMPT) + estimate_tokens(ANALYSIS_FEW_SHOT)
+    assert stats["requests"] == 2
+    assert stats["cached_input_tokens"] == 2 * prefix_tokens
+    assert stats["billed_input_tokens_saved"] == round(2 * prefix_tokens * 0.75)
+
+
+def test_cache_is_refreshed_before_ttl_and_on_prompt_change():
+    clock = Clock()
+    backend = FakeContextCache(clock=clock)
+    manager = ContextCacheManager(ttl_seconds=100, refresh_margin_seconds=10, clock=clock)
+
+    first = manager.get(backend, "m", "system", "prefix")
+    clock.now = 85
+    assert manager.get(backend, "m", "system", "prefix") == first
+    clock.now = 95
+    second = manager.get(backend, "m", "system", "prefix")
+    changed = manager.get(backend, "m", "system", "new prefix")
+
+    assert len({first, second, changed}) == 3
+    assert backend.deleted == 0
+    assert manager.stats()["created"] == 2 and manager.stats()["refreshed"] == 1
+    assert backend.resolve(second) == ("system", "prefix")
+
+    manager.clear()
+    assert backend.live() == 0
+
+
+def test_request_holding_the_old_name_survives_a_refresh():
+    clock = Clock()
+    backend = FakeContextCache(clock=clock)
+    manager = ContextCacheManager(ttl_seconds=100, refresh_margin_seconds=10, clock=clock)
+
+    held = manager.get(backend, "m", "system", "prefix")  # expires at 100
+    clock.now = 91  # the request sits in retry backoff while another one refreshes the cache
+    fresh = manager.get(backend, "m", "system", "prefix")
+
+    assert fresh != held
+    assert backend.resolve(held) == ("system", "prefix")  # the delayed request still finds its cache
+    clock.now = 100
+    assert backend.live() == 1  # the replaced cache expired on its own TTL
+
+    manager.clear()
+    assert backend.live() == 0
+
+
+def test_small_prefix_and_failed_creation_are_sent_inline(fake_llm):
+    transport = fake_llm(FakeTransport(), ContextCacheManager(min_tokens=10_000))
+    assert llm_client.call_llm("\nReview: \"ok\"\nOutput:", system="sys", prefix=ANALYSIS_FEW_SHOT)
+    assert transport.cached_requests == 0
+    assert llm_client.get_context_cache_stats()["skipped"] == 1
+
+    class FailingCache(FakeContextCache):
+        def create(self, *args):
+            raise RuntimeError("cached content too small")
+
+    transport = fake_llm(FakeTransport(context_cache=FailingCache()), ContextCacheManager(min_tokens=0))
+    assert llm_client.call_llm("hello", system="sys", prefix="static ")
+    assert transport.cached_requests == 0
+    assert llm_client.get_context_cache_stats()["failed"] == 1
@@ -1,5 +1,8 @@
 
+import json
 import os
+
+import main
 from analysis_engine import analyze_review
 from response_generator import generate_response
 
@@ -20,3 +23,25 @@ def test_non_critical_review_has_no_critical_ref():
     resp = generate_response(analyzed, review)
     assert resp["is_critical"] is False
     assert resp["critical_ref"] is None
+
+
+def test_batch_run_processes_critical_reviews_first(tmp_path, monkeypatch):
+    reviews = [("r1", "Great blender, love it."), ("r2", "Late delivery."), ("r3", "The heater caught fire!")]
+    reviews_path = tmp_path / "reviews.jsonl"
+    reviews_path.write_text("".join(json.dumps({"review_id": i, "review_text": t}) + "\n" for i, t in reviews))
+    processed = []
+    process_review = main.process_review
+
+    def tracking_process_review(review_text, review_id=None, **kwargs):
+        processed.append(review_id)
+        return process_review(review_text, review_id=review_id, **kwargs)
+
+    monkeypatch.setattr(main, "process_review", tracking_process_review)
+    output, critical = tmp_path / "out.jsonl", tmp_path / "critical.jsonl"
+    main.main(["--reviews", str(reviews_path), "--output", str(output), "--critical-output", str(critical)])
+
+    assert "r3" in processed[:2]  # at most the review already running goes before it
+    assert [json.loads(line)["review_id"] for line in output.read_text().splitlines()] == ["r1", "r2", "r3"]
+    critical_results = [json.loads(line) for line in critical.read_text().splitlines()]
+    assert [r["review_id"] for r in critical_results] == ["r3"]
+    assert critical_results[0]["response"]["critical_ref"].startswith("[CRITICAL_REF:")
@@ -0,0 +1,79 @@
+import json
+import threading
+import time
+
+import main
+from analysis_engine import analyze_review, prepare_review
+from dedup import AnalysisDeduplicator, NearDuplicateIndex, hamming_distance, simhash
+
+
+def _counting_analyze(calls, delay=0.0):
+    def analyze(raw_text, prepared=None, rating=None):
+        calls.append(raw_text)
+        time.sleep(delay)
+        return analyze_review(raw_text, prepared=prepared, rating=rating)
+
+    return analyze
+
+
+def test_exact_duplicates_share_one_analysis_but_keep_their_own_pii():
+    calls = []
+    deduper = AnalysisDeduplicator(analyze=_counting_analyze(calls))
+    texts = ["Arrived broken! Email me at jane@example.com", "Arrived   broken! Email me at bob@example.org"]
+    results = [deduper.analyze(t, prepare_review(t)) for t in texts]
+
+    assert len(calls) == 1
+    assert deduper.stats() == {"reviews": 2, "analyses": 1, "analyses_saved": 1}
+    assert results[0]["sentiment"] == results[1]["sentiment"] == "negative"
+    assert all(r["pii_found"] == ["PII_EMAIL"] for r in results)
+    assert results[0] is not results[1]
+
+
+def test_concurrent_duplicates_wait_for_the_first_analysis():
+    calls = []
+    deduper = AnalysisDeduplicator(analyze=_counting_analyze(calls, delay=0.05))
+    text = "The lid is damaged."
+    threads = [threading.Thread(target=deduper.analyze, args=(text, prepare_review(text))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+
+
+def test_near_duplicates_are_grouped_within_threshold():
+    a = "The blender arrived broken and I want a refund for it please"
+    b = "The blender arrived broken and I want a refund for it"
+    c = "Great coffee maker, love it"
+    assert hamming_distance(simhash(a), simhash(b)) < hamming_distance(simhash(a), simhash(c))
+
+    index = NearDuplicateIndex(max_distance=hamming_distance(simhash(a), simhash(b)))
+    assert index.find_or_add(simhash(a), a) == a
+    assert index.find_or_add(simhash(b), b) == a
+    assert index.find_or_add(simhash(c), c) == c
+
+
+def test_cli_dedup_issues_a_critical_ref_per_review(tmp_path):
+    reviews = tmp_path / "reviews.jsonl"
+    text = "The charger caught fire, this is dangerous."
+    reviews.write_text("".join(json.dumps({"review_id": i, "review_text": text}) + "\n" for i in ("a", "b", "c")))
+    output = tmp_path / "out.jsonl"
+    main.main(["--reviews", str(reviews), "--output", str(output), "--dedup", "--workers", "3"])
+
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    refs = [r["response"]["critical_ref"] for r in results]
+    assert [r["review_id"] for r in results] == ["a", "b", "c"]
+    assert all(refs) and len(set(refs)) == 3
+
+
+def test_window_bounds_memory_and_keeps_recent_groups():
+    calls = []
+    deduper = AnalysisDeduplicator(analyze=_counting_analyze(calls), window=2, near_dup_similarity=0.95)
+    texts = ["The lid is damaged.", "Late delivery again.", "The lid is damaged.", "Five stars, love it", "Late delivery again."]
+    for t in texts:
+        deduper.analyze(t, prepare_review(t))
+
+    # "The lid" was used recently, so it survives the third group; "Late delivery" was evicted.
+    assert calls == ["The lid is damaged.", "Late delivery again.", "Five stars, love it", "Late delivery again."]
+    assert len(deduper) == 2
+    assert len(deduper._index) == 2
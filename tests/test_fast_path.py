@@ -0,0 +1,64 @@
+from unittest import mock
+
+import pytest
+
+import analysis_engine
+from analysis_engine import analyze_review, analyze_reviews, get_fast_path_stats, pre_classify
+
+
+@pytest.fixture
+def llm_spy(monkeypatch):
+    monkeypatch.setattr(analysis_engine, "FAST_PATH_ENABLED", True)
+    monkeypatch.setattr(analysis_engine, "FAST_PATH_CONFIDENCE_THRESHOLD", 0.8)
+    with mock.patch.object(analysis_engine, "call_llm", wraps=analysis_engine.call_llm) as spy:
+        yield spy
+
+
+def test_clear_reviews_skip_the_llm(llm_spy):
+    before = get_fast_path_stats()
+    assert analyze_review("Five stars, love it")["sentiment"] == "positive"
+    damaged = analyze_review("Arrived broken, I want a refund.", rating=1)
+    assert damaged["sentiment"] == "negative"
+    assert damaged["key_issues_praise"] == ["damaged product", "wants refund"]
+    assert analyze_review("  ...  ")["sentiment"] == "neutral"
+    assert llm_spy.call_count == 0
+
+    after = get_fast_path_stats()
+    assert after["fast_path"] - before["fast_path"] == 3
+    assert after["reviews"] - before["reviews"] == 3
+
+
+@pytest.mark.parametrize(
+    "text, rating",
+    [
+        ("Love it but it arrived late", None),  # mixed signals
+        ("Not great, honestly.", None),  # negation
+        ("Excellent blender.", 1),  # rating disagrees with the text
+        ("The lid is a slightly different shade than pictured on the site.", None),  # no signal
+    ],
+)
+def test_ambiguous_reviews_go_to_the_llm(llm_spy, text, rating):
+    analyze_review(text, rating=rating)
+    assert llm_spy.call_count == 1
+
+
+def test_critical_reviews_go_to_the_llm_however_positive(llm_spy):
+    text = "Love it, great blender! It caught fire."
+    assert pre_classify(text, rating=5)[0] is not None  # the keyword tables alone would accept it
+
+    analyze_review(text, rating=5)
+    assert llm_spy.call_count == 1
+
+
+def test_threshold_controls_the_skip(llm_spy, monkeypatch):
+    _, confidence = pre_classify("Great kettle.")
+    monkeypatch.setattr(analysis_engine, "FAST_PATH_CONFIDENCE_THRESHOLD", confidence + 0.05)
+    analyze_review("Great kettle.")
+    assert llm_spy.call_count == 1
+
+
+def test_batched_analysis_only_sends_ambiguous_reviews(llm_spy):
+    results = analyze_reviews(["Five stars, love it", "Love it but it arrived late", "Five stars!"], ratings=[5, None, 5])
+    assert llm_spy.call_count == 1  # a single ambiguous review is analyzed without batching
+    assert results[0]["sentiment"] == results[2]["sentiment"] == "positive"
+    assert results[1]["key_issues_praise"] == ["late delivery"]
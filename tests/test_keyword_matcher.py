@@ -0,0 +1,35 @@
+from config import CRITICAL_KEYWORDS
+from keyword_matcher import KeywordMatcher
+from utils import contains_critical_keyword
+
+
+def test_find_all_reports_overlapping_hits_with_positions():
+    matcher = KeywordMatcher({"not safe": ["critical"], "not": ["negation"], "safe": ["praise"], "Fire": ["critical"]})
+    hits = matcher.find_all("It is NOT SAFE, the fireplace caught fire")
+    assert [(h.keyword, h.start, h.end) for h in hits] == [
+        ("not safe", 6, 14),
+        ("not", 6, 9),
+        ("safe", 10, 14),
+        ("fire", 20, 24),
+        ("fire", 37, 41),
+    ]
+    assert matcher.labels("totally safe") == {"praise"}
+
+
+def test_matches_legacy_substring_semantics():
+    samples = [
+        "This is URGENT, the heater started a fire!",
+        "Stop Using this, it's a hazard",
+        "Everything was fine and the food was delicious.",
+        "My order was ruined",
+        "",
+    ]
+    for text in samples:
+        expected = any(k.lower() in text.lower() for k in CRITICAL_KEYWORDS)
+        assert contains_critical_keyword(text, CRITICAL_KEYWORDS) is expected
+
+
+def test_empty_keyword_list_never_matches():
+    matcher = KeywordMatcher([])
+    assert not matcher.contains("anything")
+    assert matcher.find_all("anything") == []
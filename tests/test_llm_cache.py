@@ -0,0 +1,40 @@
+import time
+
+from llm_cache import LRUCache, build_response_cache, make_cache_key
+
+
+def test_cache_key_covers_every_request_parameter():
+    base = make_cache_key("m", "sys", "prompt", 400, 0.7)
+    assert base == make_cache_key("m", "sys", "prompt", 400, 0.7)
+    assert base != make_cache_key("m", "sys", "prompt", 401, 0.7)
+    assert base != make_cache_key("m", "sys", "prompt", 400, 0.2)
+    assert base != make_cache_key("other", "sys", "prompt", 400, 0.7)
+
+
+def test_lru_evicts_least_recently_used_and_expired_entries():
+    lru = LRUCache(max_entries=2)
+    lru.set("a", "1")
+    lru.set("b", "2")
+    lru.get("a")
+    lru.set("c", "3")
+    assert lru.get("b") is None
+    assert lru.get("a") == "1" and lru.get("c") == "3"
+
+    short = LRUCache(max_entries=10, ttl_seconds=0.01)
+    short.set("k", "v")
+    time.sleep(0.02)
+    assert short.get("k") is None
+
+
+def test_persistent_tiers_survive_a_new_cache_instance(tmp_path):
+    for backend, path in (("sqlite", tmp_path / "cache.sqlite"), ("directory", tmp_path / "cache_dir")):
+        first = build_response_cache(path=path, backend=backend)
+        first.set("key", "cached response")
+        first.close()
+
+        second = build_response_cache(path=path, backend=backend)
+        assert second.get("key") == "cached response"
+        assert second.get("missing") is None
+        stats = second.stats()
+        assert stats["disk_hits"] == 1 and stats["misses"] == 1
+        second.close()
@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+import llm_client
+from fake_transport import FakeTransport
+from llm_scheduler import CircuitBreaker, LLMScheduler, LLMUnavailableError, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    clock = FakeClock()
+
+    def install(transport, **scheduler_kwargs):
+        scheduler = LLMScheduler(sleep=clock.sleep, clock=clock, **scheduler_kwargs)
+        monkeypatch.setattr(llm_client, "_transport", transport)
+        monkeypatch.setattr(llm_client, "_scheduler", scheduler)
+        monkeypatch.setattr(llm_client, "_response_cache", None)
+        monkeypatch.setattr(llm_client, "_response_cache_ready", True)
+        return scheduler
+
+    install.clock = clock
+    return install
+
+
+def test_throttled_calls_are_retried_with_backoff(fake_llm):
+    transport = FakeTransport(fail_first=2, status=429)
+    scheduler = fake_llm(transport, backoff_base_seconds=1.0)
+    out = llm_client.call_llm("Review: \"I love it\"", system="Output only JSON")
+    assert '"sentiment": "positive"' in out
+    assert transport.requests == 3
+    assert scheduler.stats()["retries"] == 2
+    assert len(fake_llm.clock.sleeps) == 2 and all(0 <= s <= 2.0 for s in fake_llm.clock.sleeps)
+
+
+def test_persistent_throttling_raises_instead_of_dummy_reply(fake_llm):
+    fake_llm(FakeTransport(error_rate=1.0, status=503), max_attempts=3, circuit_failure_threshold=100)
+    with pytest.raises(LLMUnavailableError):
+        llm_client.call_llm("hello")
+
+
+def test_circuit_opens_then_half_opens_after_reset(fake_llm):
+    transport = FakeTransport(fail_first=3, status=500)
+    scheduler = fake_llm(transport, max_attempts=1, circuit_failure_threshold=3, circuit_reset_seconds=10)
+    for _ in range(3):
+        with pytest.raises(LLMUnavailableError):
+            llm_client.call_llm("hello")
+    with pytest.raises(LLMUnavailableError, match="circuit"):
+        llm_client.call_llm("hello")
+    assert transport.requests == 3
+
+    fake_llm.clock.now += 10
+    assert llm_client.call_llm("hello")
+    assert scheduler.breaker.state == "closed"
+
+
+def test_token_bucket_spaces_requests_over_the_limit():
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_minute=60, capacity=2, clock=clock)
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 1.0, 2.0]
+    clock.now += 5
+    assert bucket.reserve() == 0.0
+
+
+def test_half_open_breaker_admits_a_single_trial():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=1, clock=clock)
+    breaker.record_failure()
+    clock.now = 1
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+
+
+def test_cancelling_a_non_trial_call_keeps_the_trial_slot():
+    clock = FakeClock()
+    scheduler = LLMScheduler(circuit_failure_threshold=1, circuit_reset_seconds=1, clock=clock)
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def slow():
+            await gate.wait()
+            return "ok"
+
+        bystander = asyncio.create_task(scheduler.acall(slow))  # admitted while closed
+        await asyncio.sleep(0)
+        scheduler.breaker.record_failure()
+        clock.now = 1
+        trial = asyncio.create_task(scheduler.acall(slow))  # takes the half-open trial
+        await asyncio.sleep(0)
+
+        bystander.cancel()
+        await asyncio.gather(bystander, return_exceptions=True)
+        assert scheduler.breaker.allow() is False  # the trial is still in flight
+
+        trial.cancel()
+        await asyncio.gather(trial, return_exceptions=True)
+        assert scheduler.breaker.allow() is True
+
+    asyncio.run(run())
+
+
+def test_fake_transport_latency_specs(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("fake_transport.time.sleep", sleeps.append)
+    FakeTransport(latency="fixed:0.25").generate("p", "", 10, 0.0)
+    FakeTransport(latency="uniform:0.1,0.2", seed=1).generate("p", "", 10, 0.0)
+    FakeTransport().generate("p", "", 10, 0.0)
+    assert sleeps[0] == 0.25 and 0.1 <= sleeps[1] <= 0.2 and len(sleeps) == 2
+    with pytest.raises(ValueError):
+        FakeTransport(latency="gaussian:1")
+
+
+def test_unavailable_llm_fails_the_review_instead_of_a_canned_analysis(fake_llm):
+    import analysis_engine
+    import main
+
+    transport = FakeTransport(fail_first=100, status=503)
+    fake_llm(transport, max_attempts=2, circuit_failure_threshold=100)
+    reviews = ["The box arrived on Tuesday.", "It is a lamp, it lights the desk."]
+    with pytest.raises(LLMUnavailableError):
+        main.process_review(reviews[0])
+    with pytest.raises(LLMUnavailableError):
+        analysis_engine.analyze_reviews(reviews)
+    assert transport.requests == 4  # the batch call is not retried review by review
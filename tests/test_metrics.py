@@ -0,0 +1,46 @@
+import json
+
+import main
+from metrics import METRICS, StageMetrics
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = StageMetrics(enabled=False)
+    with metrics.stage("x"):
+        pass
+    assert metrics.summary() == {}
+
+
+def test_percentiles_and_prometheus_export():
+    metrics = StageMetrics(enabled=True)
+    for ms in range(1, 101):
+        metrics.observe("analysis.llm_call", ms / 1000)
+    summary = metrics.summary()["analysis.llm_call"]
+    assert summary["count"] == 100
+    assert (summary["p50"], summary["p95"], summary["p99"]) == (0.05, 0.095, 0.099)
+
+    prom = metrics.to_prometheus()
+    assert '# TYPE crira_stage_duration_seconds summary' in prom
+    assert 'crira_stage_duration_seconds{stage="analysis.llm_call",quantile="0.95"} 0.095000000' in prom
+    assert 'crira_stage_duration_seconds_count{stage="analysis.llm_call"} 100' in prom
+
+
+def test_cli_exports_stage_summary(tmp_path, monkeypatch):
+    monkeypatch.setattr(METRICS, "enabled", False)
+    monkeypatch.setattr(METRICS, "_stages", {})
+    reviews = tmp_path / "reviews.jsonl"
+    reviews.write_text('{"review_text": "Arrived broken, I want a refund."}\n', encoding="utf-8")
+    metrics_json = tmp_path / "metrics.json"
+    metrics_prom = tmp_path / "metrics.prom"
+    main.main(
+        [
+            "--reviews", str(reviews),
+            "--output", str(tmp_path / "out.jsonl"),
+            "--metrics-json", str(metrics_json),
+            "--metrics-prom", str(metrics_prom),
+        ]
+    )
+    stages = json.loads(metrics_json.read_text())
+    for name in ("process_review", "canonicalize", "redact", "analysis.llm_call", "analysis.parse", "response.scrub"):
+        assert stages[name]["count"] == 1
+    assert 'stage="response.template"' in metrics_prom.read_text()
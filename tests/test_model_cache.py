@@ -0,0 +1,56 @@
+import sys
+import types
+
+import llm_client
+
+
+def _install_fake_genai(monkeypatch):
+    calls = {"configure": 0, "models": 0}
+
+    class FakeModel:
+        def __init__(self, name, system_instruction, safety_settings, generation_config):
+            calls["models"] += 1
+            self.system = system_instruction
+
+        def generate_content(self, prompt):
+            return types.SimpleNamespace(text=f"reply to {prompt}")
+
+    def configure(api_key):
+        calls["configure"] += 1
+
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = configure
+    genai.GenerativeModel = FakeModel
+    google = types.ModuleType("google")
+    google.generativeai = genai
+    monkeypatch.setitem(sys.modules, "google", google)
+    monkeypatch.setitem(sys.modules, "google.generativeai", genai)
+    monkeypatch.setattr(llm_client, "USE_REAL_LLM", True)
+    monkeypatch.setattr(llm_client, "GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(llm_client, "_model_cache", llm_client.ModelCache())
+    return calls
+
+
+def test_models_are_configured_once_and_reused(monkeypatch):
+    calls = _install_fake_genai(monkeypatch)
+    for i in range(5):
+        assert llm_client.call_llm(f"p{i}", system="sys-a") == f"reply to p{i}"
+    llm_client.call_llm("p", system="sys-b")
+    llm_client.call_llm("p", system="sys-a", max_tokens=50)
+
+    assert calls["configure"] == 1
+    assert calls["models"] == 3
+    assert llm_client.get_model_cache_stats() == {"hits": 4, "misses": 3, "size": 3}
+
+
+def test_repeated_requests_are_served_from_response_cache(monkeypatch):
+    calls = _install_fake_genai(monkeypatch)
+    monkeypatch.setattr(llm_client, "_response_cache_ready", False)
+    llm_client.configure_response_cache(path="", enabled=True)
+    try:
+        assert llm_client.call_llm("Love it!", system="sys") == llm_client.call_llm("Love it!", system="sys")
+        stats = llm_client.get_response_cache_stats()
+        assert stats["memory_hits"] == 1 and stats["writes"] == 1
+        assert calls["models"] == 1
+    finally:
+        llm_client.configure_response_cache(enabled=False)
@@ -1,3 +1,6 @@
+import time
+
+from metrics import METRICS
 from utils import redact_pii
 
 
@@ -19,3 +22,72 @@ def test_redact_name_and_order():
     assert "PII_NAME" in found
     assert "PII_ADDRESS" in found
     assert "PII_ORDER" in found
+
+
+def test_found_follows_config_order_and_clean_text_is_untouched():
+    text = "Order 98765 for jane@example.org, call 555-123-4567. Thanks, Jane Doe"
+    redacted, found = redact_pii(text)
+    assert found == ["PII_EMAIL", "PII_PHONE", "PII_NAME", "PII_ORDER"]
+    assert redacted == "[PII_ORDER] for [PII_EMAIL], call [PII_PHONE]. Thanks, [PII_NAME]"
+
+    clean = "the kettle boils fast and looks great on the counter."
+    assert redact_pii(clean) == (clean, [])
+
+
+def test_chunked_redaction_matches_whole_text_redaction():
+    review = (
+        "Order 98765 for jane@example.org arrived late. Call 555-123-4567 or write to "
+        "12 Elm Street, Anytown. Thanks, Jane Doe. "
+    )
+    text = review * 40
+    whole = redact_pii(text, time_budget_ms=0, max_chunk_chars=0)
+    assert redact_pii(text, time_budget_ms=0, max_chunk_chars=300) == whole
+    assert whole[1] == ["PII_EMAIL", "PII_PHONE", "PII_NAME", "PII_ADDRESS", "PII_ORDER"]
+
+
+def test_overlong_sentence_is_masked_instead_of_redacted():
+    text = "Please call Jane Doe at 555 123 4567. Then " + "1 st " * 1000 + "!"
+    redacted, found = redact_pii(text, time_budget_ms=0, max_chunk_chars=100, max_sentence_chars=1000)
+    assert redacted == "Please call [PII_NAME] at [PII_PHONE][PII_MASKED]"
+    assert found == ["PII_PHONE", "PII_NAME", "PII_MASKED"]
+
+
+def test_pathological_address_input_is_redacted_quickly():
+    sentence = " ".join(f"{i % 100} word" for i in range(100)) + " 1 st" * 100
+    text = ". ".join(["The " + sentence] * 50) + "!"
+    start = time.perf_counter()
+    _, found = redact_pii(text, time_budget_ms=0)
+    assert time.perf_counter() - start < 2.0
+    assert "PII_MASKED" not in found
+
+
+def test_address_pattern_is_linear_without_chunking():
+    # Every "1 st" is a candidate start; a tail that scans to the end of the text from each one is quadratic.
+    text = "1 st " * 6000 + "!"
+    start = time.perf_counter()
+    redact_pii(text, time_budget_ms=0, max_chunk_chars=0)
+    assert time.perf_counter() - start < 0.5
+
+    redacted, found = redact_pii("Send it to 12 Elm Street, Anytown!")
+    assert redacted == "Send it to [PII_ADDRESS]!"
+    assert found == ["PII_ADDRESS"]
+
+
+def test_exhausted_time_budget_masks_the_remaining_text(caplog):
+    text = "Jane Doe wrote this. " * 200
+    redacted, found = redact_pii(text, time_budget_ms=1e-9)
+    assert redacted == "[PII_MASKED]"
+    assert found == ["PII_MASKED"]
+    assert "budget" in caplog.text
+
+
+def test_per_pattern_timings_are_recorded():
+    METRICS.reset()
+    METRICS.enabled = True
+    try:
+        redact_pii("Contact Jane Doe at jane@example.org.")
+    finally:
+        METRICS.enabled = False
+    stages = METRICS.summary()
+    assert {"redact.PII_EMAIL", "redact.PII_NAME"} <= set(stages)
+    assert "redact.PII_ORDER" not in stages  # skipped by its prefilter
@@ -0,0 +1,103 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import main
+import policy
+from config import CONFIG_PATH
+from policy import PolicyStore
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    base = json.loads(Path(CONFIG_PATH).read_text(encoding="utf-8"))
+    path = tmp_path / "config.json"
+
+    def write(text=None, **overrides):
+        path.write_text(text if text is not None else json.dumps({**base, **overrides}), encoding="utf-8")
+        # Some filesystems have coarse mtimes; make every write a visible change.
+        stamp = os.stat(path).st_mtime_ns + 10**9 * (write.count + 1)
+        os.utime(path, ns=(stamp, stamp))
+        write.count += 1
+
+    write.count = 0
+    write(CRITICAL_KEYWORDS=["fire"])
+    return path, write
+
+
+def test_import_does_not_compile_patterns():
+    code = "import config, policy, utils; print('PII_PATTERNS' in vars(config), policy._store.stats()['builds'])"
+    out = subprocess.run([sys.executable, "-c", code], cwd=SRC, capture_output=True, text=True, check=True).stdout
+
+    assert out.split() == ["False", "0"]
+
+
+def test_policy_is_rebuilt_when_the_file_changes(config_file):
+    path, write = config_file
+    clock = Clock()
+    store = PolicyStore(str(path), check_interval=5, clock=clock)
+    before = store.get()
+    write(CRITICAL_KEYWORDS=["fire", "mould"])
+
+    assert store.get() is before  # not checked again until the interval has passed
+    clock.now = 5
+    after = store.get()
+
+    assert not before.is_critical("there is mould in the box")
+    assert after.is_critical("there is mould in the box")
+    assert before.critical_keywords == ("fire",)  # snapshots are never modified
+    assert store.stats() == {"builds": 2, "reloads": 1, "reload_errors": 0}
+
+
+def test_broken_config_keeps_the_current_policy(config_file):
+    path, write = config_file
+    store = PolicyStore(str(path), check_interval=0)
+    current = store.get()
+
+    write("{\"CRITICAL_KEYWORDS\": [")
+    assert store.get() is current
+    write(PII_PATTERNS={"PII_EMAIL": "[unclosed"})
+    assert store.get() is current
+    assert store.get() is current  # a rejected version is not retried
+
+    assert store.stats()["reload_errors"] == 2
+    missing = PolicyStore(str(path.parent / "missing.json"))  # nothing is read before first use
+    with pytest.raises(FileNotFoundError):
+        missing.get()
+
+
+def test_safe_mode_follows_the_environment(config_file, monkeypatch):
+    path, _ = config_file
+    store = PolicyStore(str(path), hot_reload=False)
+    assert store.get().safe_mode
+
+    monkeypatch.setenv("CRIRA_SAFE_MODE", "false")
+    assert not store.get().safe_mode
+    monkeypatch.delenv("CRIRA_SAFE_MODE")
+    assert store.get().safe_mode  # config.json default
+
+    assert store.stats() == {"builds": 3, "reloads": 0, "reload_errors": 0}
+
+
+def test_running_pipeline_picks_up_new_critical_keywords(config_file, monkeypatch):
+    path, write = config_file
+    monkeypatch.setattr(policy, "_store", PolicyStore(str(path), check_interval=0))
+    review = "There is mould all over the lid."
+
+    assert not main.process_review(review)["response"]["is_critical"]
+    write(CRITICAL_KEYWORDS=["fire", "mould"])
+    assert main.process_review(review)["response"]["is_critical"]
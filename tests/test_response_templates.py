@@ -0,0 +1,73 @@
+from unittest import mock
+
+import pytest
+
+import response_generator
+from response_generator import generate_response, get_response_stats
+from response_templates import ResponseTemplateEngine
+
+
+def _analyzed(sentiment, issues, text="review"):
+    return {"redacted_review": text, "pii_found": [], "sentiment": sentiment, "key_issues_praise": issues, "summary": ""}
+
+
+@pytest.fixture
+def llm_spy(monkeypatch):
+    monkeypatch.setattr(response_generator, "RESPONSE_TEMPLATES_ENABLED", True)
+    with mock.patch.object(response_generator, "call_llm", wraps=response_generator.call_llm) as spy:
+        yield spy
+
+
+def test_covered_non_critical_cases_use_templates(llm_spy):
+    before = get_response_stats()
+    late = generate_response(_analyzed("negative", ["Late Delivery"]), "It came a week late.")
+    both = generate_response(_analyzed("negative", ["wants refund", "damaged product"]), "Broken, refund me.")
+    praise = generate_response(_analyzed("positive", ["overall satisfaction"]), "Love it.")
+
+    assert llm_spy.call_count == 0
+    assert "later than expected" in late["response_text"]
+    assert "damaged product and wants refund" in both["response_text"]
+    assert praise["response_text"].startswith("Thank you")
+    assert get_response_stats()["templated"] - before["templated"] == 3
+
+
+@pytest.mark.parametrize(
+    "analyzed",
+    [
+        _analyzed("negative", ["late delivery", "rude support agent"]),  # free-form issue not covered
+        _analyzed("positive", ["late delivery"]),  # no template for this combination
+        # free-text items from the LLM, including complaints, are not praise the template knows
+        _analyzed("positive", ["great sound", "shipping took three weeks", "box was crushed"]),
+    ],
+)
+def test_uncovered_cases_fall_back_to_the_llm(llm_spy, analyzed):
+    generate_response(analyzed, "review")
+    assert llm_spy.call_count == 1
+
+
+def test_failed_analysis_is_not_answered_with_a_template(llm_spy):
+    # What _complete_analysis returns when the LLM output could not be parsed at all.
+    analyzed = {
+        **_analyzed("neutral", []),
+        "summary": "Unable to parse LLM output.",
+        "defaulted_fields": ["sentiment", "key_issues_praise", "summary"],
+    }
+    assert ResponseTemplateEngine([{"SENTIMENT": "neutral", "TEMPLATE": "Thanks."}]).match(analyzed) is None
+    generate_response(analyzed, "review")
+    assert llm_spy.call_count == 1
+
+
+def test_critical_reviews_always_use_the_llm_and_get_a_ref(llm_spy):
+    resp = generate_response(_analyzed("negative", ["late delivery"]), "Delivery late and the charger caught fire!")
+    assert llm_spy.call_count == 1
+    assert resp["is_critical"] and resp["critical_ref"].startswith("[CRITICAL_REF:")
+
+
+def test_templates_are_scrubbed_and_validated(llm_spy, monkeypatch):
+    engine = ResponseTemplateEngine([{"SENTIMENT": "neutral", "TEMPLATE": "We will email [PII_EMAIL]. [CRITICAL_REF: x]"}])
+    monkeypatch.setattr(response_generator, "_TEMPLATES", engine)
+    resp = generate_response(_analyzed("neutral", []), "ok")
+    assert resp["response_text"] == "We will email [REDACTED_PII]."
+
+    with pytest.raises(ValueError):
+        ResponseTemplateEngine([{"SENTIMENT": "neutral", "TEMPLATE": "Hi $customer_name"}])
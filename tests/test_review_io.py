@@ -0,0 +1,39 @@
+import json
+
+from review_io import iter_review_entries, open_result_writer
+
+
+def test_incremental_json_parse_matches_json_load(tmp_path):
+    data = {
+        "meta": {"source": "export", "n": 1234567},
+        "reviews": [{"review_id": f"rev-{i}", "rating": i % 5, "review_text": f"Text {i}, \"quoted\" ]}}"} for i in range(30)],
+        "trailer": [1, 2, 3],
+    }
+    path = tmp_path / "reviews.json"
+    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    # A tiny chunk size forces values to straddle read boundaries.
+    assert list(iter_review_entries(path, chunk_size=7)) == data["reviews"]
+
+
+def test_jsonl_input_and_ndjson_output_roundtrip(tmp_path):
+    src = tmp_path / "reviews.jsonl"
+    src.write_text('{"review_text": "a"}\n\n{"review_text": "b"}\n', encoding="utf-8")
+    out = tmp_path / "results.jsonl"
+    with open_result_writer(out) as writer:
+        for entry in iter_review_entries(src):
+            writer.write(entry)
+    assert [json.loads(line) for line in out.read_text().splitlines()] == [{"review_text": "a"}, {"review_text": "b"}]
+
+
+def test_json_array_writer_matches_indented_dump(tmp_path):
+    results = [{"a": 1, "b": ["x", "y"]}, {"c": {"d": None}}]
+    out = tmp_path / "results.json"
+    with open_result_writer(out) as writer:
+        for r in results:
+            writer.write(r)
+    assert out.read_text() == json.dumps(results, indent=2)
+
+    empty = tmp_path / "empty.json"
+    with open_result_writer(empty):
+        pass
+    assert json.loads(empty.read_text()) == []
@@ -0,0 +1,55 @@
+import json
+
+import main
+from run_journal import RunJournal
+
+_process_review = main.process_review
+
+
+def _write_reviews(path, reviews):
+    path.write_text("".join(json.dumps({"review_id": rid, "review_text": text}) + "\n" for rid, text in reviews))
+
+
+def _run(tmp_path, monkeypatch, reviews_path, *flags, fail_on=()):
+    processed = []
+
+    def tracking_process_review(review_text, review_id=None, **kwargs):
+        processed.append(review_id)
+        if review_id in fail_on:
+            raise RuntimeError("simulated crash")
+        return _process_review(review_text, review_id=review_id, **kwargs)
+
+    monkeypatch.setattr(main, "process_review", tracking_process_review)
+    output = tmp_path / "out.jsonl"
+    main.main(["--reviews", str(reviews_path), "--output", str(output), "--journal", str(tmp_path / "j.db"), *flags])
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    return processed, results
+
+
+def test_resume_skips_done_reviews_and_retries_failed(tmp_path, monkeypatch):
+    reviews = tmp_path / "reviews.jsonl"
+    _write_reviews(reviews, [("a", "Great blender, love it."), ("b", "Arrived broken."), ("c", "Late delivery.")])
+
+    processed, results = _run(tmp_path, monkeypatch, reviews, fail_on={"b"})
+    assert processed == ["a", "b", "c"]
+    assert [r["review_id"] for r in results] == ["a", "c"]
+    assert RunJournal(tmp_path / "j.db").counts() == {"done": 2, "failed": 1}
+
+    processed, results = _run(tmp_path, monkeypatch, reviews, "--resume")
+    assert processed == ["b"]
+    assert [r["review_id"] for r in results] == ["a", "b", "c"]
+    assert results[1]["analyzed"]["sentiment"] == "negative"
+
+
+def test_incremental_reprocesses_only_changed_text(tmp_path, monkeypatch):
+    reviews = tmp_path / "reviews.jsonl"
+    _write_reviews(reviews, [("a", "Great blender, love it."), ("b", "Arrived broken.")])
+    _run(tmp_path, monkeypatch, reviews)
+
+    _write_reviews(reviews, [("a", "Great blender, love it."), ("b", "Arrived broken, I want a refund.")])
+    processed, results = _run(tmp_path, monkeypatch, reviews, "--incremental")
+    assert processed == ["b"]
+    assert results[1]["original_review"] == "Arrived broken, I want a refund."
+
+    processed, _ = _run(tmp_path, monkeypatch, reviews, "--resume")
+    assert processed == []
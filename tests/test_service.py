@@ -0,0 +1,120 @@
+import http.client
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import llm_client
+from analysis_engine import analyze_reviews, prepare_review
+from fake_transport import FakeTransport
+from llm_scheduler import LLMScheduler
+from service import MicroBatcher, ReviewService, make_server
+
+
+@pytest.fixture
+def server():
+    batcher = MicroBatcher(window_seconds=0.01, max_batch=8)
+    httpd = make_server("127.0.0.1", 0, ReviewService(batcher))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+    batcher.close()
+
+
+def _post(url, body):
+    data = body if isinstance(body, bytes) else json.dumps(body).encode()
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_process_review_over_http(server):
+    status, result = _post(f"{server}/reviews", {"review_id": "r1", "review_text": "This is urgent, it caught fire!"})
+    assert status == 200
+    assert result["review_id"] == "r1"
+    assert result["response"]["critical_ref"].startswith("[CRITICAL_REF:")
+
+    assert _post(f"{server}/reviews", b"not json")[0] == 400
+    assert _post(f"{server}/reviews", {"rating": 5})[0] == 400
+
+    with urllib.request.urlopen(f"{server}/healthz") as response:
+        assert json.loads(response.read()) == {"status": "ok"}
+    with urllib.request.urlopen(f"{server}/metrics") as response:
+        assert "crira_batcher_requests 1" in response.read().decode()
+
+
+def _post_raw(url, headers, body=b""):
+    host, port = url.split("//")[1].split(":")
+    conn = http.client.HTTPConnection(host, int(port), timeout=5)
+    try:
+        conn.putrequest("POST", "/reviews")
+        for name, value in headers.items():
+            conn.putheader(name, value)
+        conn.endheaders(body)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("length", ["abc", "-1"])
+def test_invalid_content_length_is_rejected(server, length):
+    status, body = _post_raw(server, {"Content-Length": length})
+    assert status == 400
+    assert body == {"error": "invalid Content-Length"}
+
+
+def test_analysis_timeout_returns_504():
+    release = threading.Event()
+
+    def analyze_batch(texts, **kwargs):
+        release.wait(5)
+        return analyze_reviews(texts, **kwargs)
+
+    batcher = MicroBatcher(analyze_batch, window_seconds=0.0, max_batch=1)
+    httpd = make_server("127.0.0.1", 0, ReviewService(batcher, request_timeout=0.05))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        status, body = _post(f"http://127.0.0.1:{httpd.server_address[1]}/reviews", {"review_text": "Late again."})
+        assert status == 504
+        assert body == {"error": "analysis timed out"}
+    finally:
+        release.set()
+        httpd.shutdown()
+        httpd.server_close()
+        batcher.close()
+
+
+def test_unavailable_llm_returns_503(server, monkeypatch):
+    monkeypatch.setattr(llm_client, "_transport", FakeTransport(fail_first=100, status=503))
+    monkeypatch.setattr(llm_client, "_scheduler", LLMScheduler(max_attempts=2, backoff_base_seconds=0.0))
+    monkeypatch.setattr(llm_client, "_response_cache", None)
+    monkeypatch.setattr(llm_client, "_response_cache_ready", True)
+    status, body = _post(f"{server}/reviews", {"review_text": "The box arrived on Tuesday."})
+    assert status == 503
+    assert body == {"error": "LLM temporarily unavailable"}
+
+
+def test_concurrent_requests_are_coalesced_into_batches():
+    calls = []
+
+    def analyze_batch(texts, **kwargs):
+        calls.append(len(texts))
+        return analyze_reviews(texts, **kwargs)
+
+    batcher = MicroBatcher(analyze_batch, window_seconds=0.2, max_batch=4)
+    texts = [f"The lid is a slightly different shade, review {i}." for i in range(6)]
+    futures = [batcher.submit(t, prepare_review(t)) for t in texts]
+    results = [f.result(timeout=5) for f in futures]
+    batcher.close()
+
+    assert sorted(calls) == [2, 4]
+    assert batcher.stats()["mean_batch_size"] == 3.0
+    assert [r["redacted_review"] for r in results] == [prepare_review(t).redacted for t in texts]
@@ -0,0 +1,39 @@
+import json
+
+import main
+from sharded_prep import iter_preprocessed, preprocess_review
+
+REVIEWS = [
+    "Great blender, love it. Thanks, Jane Doe!",
+    "This is urgent: the charger caught fire. Call me on +1 555-123-4567.",
+    "My order 12345678 arrived late and damaged. Email bob@example.com",
+    "Meh.",
+    "Ship to 42 Main Street, Springfield. The lid is a slightly different shade than pictured.",
+]
+
+
+def test_preprocessing_pool_preserves_order_and_matches_inline():
+    items = [(i, text) for i, text in enumerate(REVIEWS * 3)]
+    merged = list(iter_preprocessed(items, lambda item: item[1] if item[0] != 4 else None, processes=2, shard_size=2))
+    assert [item for item, _ in merged] == items
+    assert merged[4][1] is None
+    assert [pre for item, pre in merged if item[0] != 4] == [preprocess_review(t) for i, t in items if i != 4]
+
+
+def test_cli_processes_output_matches_single_process(tmp_path):
+    reviews = tmp_path / "reviews.jsonl"
+    reviews.write_text("".join(json.dumps({"review_id": f"r{i}", "review_text": t}) + "\n" for i, t in enumerate(REVIEWS)))
+
+    def run(*flags):
+        output = tmp_path / f"out{len(flags)}.jsonl"
+        main.main(["--reviews", str(reviews), "--output", str(output), "--workers", "3", *flags])
+        results = [json.loads(line) for line in output.read_text().splitlines()]
+        for r in results:
+            ref = r["response"].pop("critical_ref")
+            r["response"]["response_text"] = r["response"]["response_text"].replace(ref or "\0", "")
+        return results
+
+    sharded = run("--processes", "2")
+    assert sharded == run()
+    assert [r["review_id"] for r in sharded] == [f"r{i}" for i in range(len(REVIEWS))]
+    assert sharded[1]["response"]["is_critical"] is True
@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+import llm_client
+import response_generator
+from fake_transport import FakeTransport
+from llm_scheduler import LLMScheduler
+from output_filter import STOP_LENGTH, STOP_VIOLATION, StreamingOutputFilter
+from response_generator import _FORBIDDEN_PLACEHOLDERS, _scrub_llm_output, generate_response, generate_response_stream
+
+SAMPLES = [
+    "  Sorry about [PII_EMAIL], we will fix it. [CRITICAL_REF: abc-123] Thanks!  ",
+    "Please check [PII_ORDER] and [PII_NAME]; [not a token] stays [PII_",
+    "[[CRITICAL_REF: x]] hello [CRITICAL_REF: never closed",
+    "plain text with no tokens at all",
+]
+
+
+def _analyzed(text, sentiment="negative", issues=("rude support agent",)):
+    return {"redacted_review": text, "pii_found": [], "sentiment": sentiment, "key_issues_praise": list(issues), "summary": ""}
+
+
+def _stream(text, filt, rng):
+    out, i = [], 0
+    while i < len(text):
+        n = rng.randint(1, 6)
+        out.append(filt.feed(text[i : i + n]))
+        i += n
+    out.append(filt.close())
+    return "".join(out)
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_filter_matches_scrubber_for_any_chunking(text):
+    rng = random.Random(7)
+    for _ in range(50):
+        filt = StreamingOutputFilter(_FORBIDDEN_PLACEHOLDERS)
+        assert _stream(text, filt, rng) == _scrub_llm_output(text).strip()
+
+
+def test_filter_stops_at_split_critical_ref():
+    filt = StreamingOutputFilter(_FORBIDDEN_PLACEHOLDERS, stop_on_violation=True)
+    released = filt.feed("We are sorry. [CRITI") + filt.feed("CAL_REF: fake-1] more text")
+
+    assert released == "We are sorry."
+    assert filt.stopped == STOP_VIOLATION
+    assert filt.feed("anything") == "" and filt.close() == ""
+
+
+def test_filter_length_cap_cuts_at_word_boundary():
+    filt = StreamingOutputFilter((), max_chars=20)
+    released = filt.feed("one two three four five six seven")
+
+    assert released == "one two three four"
+    assert filt.stopped == STOP_LENGTH
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    def install(transport):
+        monkeypatch.setattr(llm_client, "_transport", transport)
+        monkeypatch.setattr(llm_client, "_scheduler", LLMScheduler())
+        monkeypatch.setattr(llm_client, "_response_cache", None)
+        monkeypatch.setattr(llm_client, "_response_cache_ready", True)
+        return transport
+
+    return install
+
+
+def test_violation_stops_reading_the_llm(fake_llm):
+    text = "We are very sorry. [CRITICAL_REF: made-up] " + "filler " * 50
+    transport = fake_llm(FakeTransport(responder=lambda prompt, system: text))
+    review = "The agent was rude to me."
+
+    stream = generate_response_stream(_analyzed(review), review, is_critical=False)
+    chunks = list(stream)
+
+    assert "".join(chunks) == "We are very sorry."
+    assert stream.result["stopped"] == STOP_VIOLATION
+    assert transport.chunks_streamed < len(llm_client.stream_chunks(text))
+
+
+def test_stream_result_matches_generate_response(fake_llm):
+    fake_llm(FakeTransport())
+    review = "The heater caught fire, this is dangerous. Not sure what else to say about it."
+    analyzed = _analyzed(review, issues=("fire hazard",))
+
+    expected = generate_response(analyzed, review)
+    stream = generate_response_stream(analyzed, review)
+    chunks = list(stream)
+
+    assert stream.result["is_critical"] and expected["is_critical"]
+    assert chunks[-1] == f"\n\n{stream.result['critical_ref']}"
+    assert "".join(chunks) == stream.result["response_text"]
+
+    def strip_ref(r):
+        return r["response_text"].rsplit("\n\n", 1)[0]
+
+    assert strip_ref(stream.result) == strip_ref(expected)
+    assert stream.result["stopped"] is None
+
+
+def test_dummy_hallucinated_ref_is_cut_off():
+    review = "__DUMMY_ERROR_HALLUCINATE_REF__ The agent was rude."
+    stream = generate_response_stream(_analyzed(review), review, is_critical=False)
+
+    text = "".join(stream)
+
+    assert "CRITICAL_REF" not in text
+    assert text == "We are very sorry for the issue."
+    assert stream.result["stopped"] == STOP_VIOLATION
+    assert response_generator.get_response_stats()["streams_stopped"] >= 1
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+import analysis_engine
+import llm_client
+from analysis_engine import analyze_review, get_structured_output_stats
+from fake_transport import FakeTransport
+from structured_output import (
+    JSONObjectExtractor,
+    analysis_response_schema,
+    extract_json_array,
+    extract_json_object,
+    validate_fields,
+)
+
+FIELDS = ["sentiment", "key_issues_praise", "summary"]
+FULL = '{"sentiment": "negative", "key_issues_praise": ["broken item", "late delivery"], "summary": "Arrived broken."}'
+
+
+@pytest.fixture(autouse=True)
+def _llm_only(monkeypatch):
+    monkeypatch.setattr(analysis_engine, "FAST_PATH_ENABLED", False)
+
+
+def test_extract_json_object_recovers_members_of_broken_output():
+    assert extract_json_object(FULL) == (json.loads(FULL), True)
+    assert extract_json_object("Sure! ```json\n" + FULL + "\n```") == (json.loads(FULL), True)
+    # Unterminated object: every member is complete, only the closing brace is missing.
+    assert extract_json_object(FULL[:-1]) == (json.loads(FULL), False)
+    # Truncated inside the array: the array member is dropped, earlier members are kept.
+    assert extract_json_object(FULL[:60]) == ({"sentiment": "negative"}, False)
+    assert extract_json_object("no json here") == ({}, False)
+
+
+def test_incremental_extractor_matches_one_shot_parsing():
+    extractor = JSONObjectExtractor()
+    for i in range(0, len(FULL), 7):
+        extractor.feed(FULL[i : i + 7])
+    assert extractor.complete and extractor.members == json.loads(FULL)
+
+    extractor = JSONObjectExtractor()
+    extractor.feed(FULL[: FULL.index("late delivery") + 4])
+    assert extractor.members == {"sentiment": "negative"}
+    assert extractor.partial == {"key_issues_praise": ["broken item"]}
+
+
+def test_extract_json_array_keeps_complete_items_of_truncated_array():
+    text = '[{"id": "R1", "summary": "ok"}, {"id": "R2", "summ'
+    assert extract_json_array(text) == ([{"id": "R1", "summary": "ok"}], False)
+
+
+def test_validate_fields_checks_types_and_enum():
+    valid, missing = validate_fields({"sentiment": "mixed", "key_issues_praise": ["a", 1], "summary": "s"}, FIELDS)
+    assert valid == {"summary": "s"}
+    assert missing == ["sentiment", "key_issues_praise"]
+
+
+def test_analysis_call_is_schema_constrained():
+    transport = FakeTransport()
+    llm_client.set_transport(transport)
+    try:
+        analyze_review("The kettle is okay I guess, nothing special about it at all really")
+    finally:
+        llm_client.set_transport(None)
+    assert transport.last_response_schema == analysis_response_schema(FIELDS)
+    assert transport.last_response_schema["required"] == FIELDS
+
+
+def test_malformed_output_is_recovered_without_another_call(monkeypatch):
+    calls = []
+    monkeypatch.setattr(analysis_engine, "call_llm", lambda **kw: calls.append(kw) or llm_client.call_llm(**kw))
+    before = get_structured_output_stats()
+    result = analyze_review("__DUMMY_ERROR_MALFORMED_JSON__ it broke")
+    after = get_structured_output_stats()
+    assert len(calls) == 1
+    assert result["key_issues_praise"] == ["broken item"] and result["summary"] == "Item arrived broken."
+    assert after["parse_failures"] == before["parse_failures"] + 1
+    assert after["recovered"] == before["recovered"] + 1
+    assert after["repairs"] == before["repairs"]
+
+
+def test_missing_fields_are_repaired_with_a_targeted_call(monkeypatch):
+    calls = []
+    monkeypatch.setattr(analysis_engine, "call_llm", lambda **kw: calls.append(kw) or llm_client.call_llm(**kw))
+    before = get_structured_output_stats()
+    result = analyze_review("__DUMMY_ERROR_INCOMPLETE_JSON__ the lid was damaged")
+    after = get_structured_output_stats()
+    assert len(calls) == 2
+    assert "Missing keys: key_issues_praise\n" in calls[1]["prompt"]
+    assert calls[1]["max_tokens"] < calls[0]["max_tokens"]
+    assert result["summary"] == "Customer is unhappy."  # kept from the first answer
+    assert result["key_issues_praise"] == ["damaged product"] and "defaulted_fields" not in result
+    assert after["repairs"] == before["repairs"] + 1
+    assert after["repaired"] == before["repaired"] + 1
+    assert 0 < after["repair_rate"] <= 1
+
+
+def test_repair_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(analysis_engine, "STRUCTURED_OUTPUT_REPAIR_ENABLED", False)
+    before = get_structured_output_stats()
+    result = analyze_review("__DUMMY_ERROR_INCOMPLETE_JSON__ the lid was damaged")
+    after = get_structured_output_stats()
+    assert result["key_issues_praise"] == []
+    assert result["defaulted_fields"] == ["key_issues_praise"]
+    assert after["repairs"] == before["repairs"]
+    assert after["defaulted"] == before["defaulted"] + 1
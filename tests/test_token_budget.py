@@ -0,0 +1,94 @@
+import json
+from unittest import mock
+
+import pytest
+
+import analysis_engine
+import llm_client
+import main
+import response_generator
+from fake_transport import FakeTransport
+from llm_scheduler import LLMScheduler
+from run_journal import RunJournal
+from token_accounting import LEDGER, TokenBudget, TokenLedger
+
+CRITICAL_REVIEW = "The heater caught fire, this is dangerous."
+
+
+@pytest.fixture(autouse=True)
+def llm_only(monkeypatch):
+    """Every review costs an analysis and a response call."""
+    monkeypatch.setattr(analysis_engine, "FAST_PATH_ENABLED", False)
+    monkeypatch.setattr(response_generator, "RESPONSE_TEMPLATES_ENABLED", False)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    monkeypatch.setattr(llm_client, "_scheduler", LLMScheduler())
+    monkeypatch.setattr(llm_client, "_response_cache", None)
+    monkeypatch.setattr(llm_client, "_response_cache_ready", True)
+    monkeypatch.setattr(llm_client, "_context_cache", None)
+    transport = FakeTransport()
+    monkeypatch.setattr(llm_client, "_transport", transport)
+    return transport
+
+
+def test_usage_is_metered_per_review_stage_and_model(fake_llm):
+    LEDGER.reset()
+    result = main.process_review("The strap broke after a week of use.", review_id="r1")
+
+    usage = result["token_usage"]
+    assert usage["calls"] == 2 and usage["estimated_calls"] == 0
+    assert usage["total_tokens"] == usage["input_tokens"] + usage["output_tokens"] > 0
+    stats = LEDGER.stats()
+    assert set(stats["by_stage"]) == {"analysis", "response"}
+    assert stats["by_model"]["fake"]["total_tokens"] == usage["total_tokens"]
+
+
+def test_dummy_calls_are_estimated():
+    LEDGER.reset()
+    usage = main.process_review("The strap broke after a week of use.")["token_usage"]
+
+    assert usage["calls"] == usage["estimated_calls"] == 2
+    assert LEDGER.stats()["by_model"]["dummy"]["calls"] == 2
+
+
+def test_overrides_route_to_cheaper_model_with_fewer_tokens(fake_llm):
+    with mock.patch.object(fake_llm, "generate", wraps=fake_llm.generate) as spy:
+        with llm_client.llm_overrides(model="cheap-model", max_tokens_ratio=0.5):
+            llm_client.call_llm("hello", max_tokens=400)
+        llm_client.call_llm("hello again", max_tokens=400)
+
+    assert [call.args[2] for call in spy.call_args_list] == [200, 400]
+    assert spy.call_args_list[0].kwargs["model"] == "cheap-model"
+    assert "model" not in spy.call_args_list[1].kwargs
+
+
+def test_budget_degrades_non_critical_reviews_in_steps():
+    ledger = TokenLedger()
+    budget = TokenBudget(1000, reduce_at=0.5, cheap_at=0.7, defer_at=0.9, ledger=ledger)
+    decisions = []
+    for used in (0, 600, 200, 150):
+        ledger.record("analysis", "m", used, 0)
+        decisions.append((budget.decide(is_critical=False), budget.decide(is_critical=True)))
+
+    assert decisions == [("full", "full"), ("reduced", "full"), ("cheap", "full"), ("defer", "full")]
+    assert budget.stats()["remaining"] == 50
+
+
+def test_run_defers_non_critical_reviews_when_budget_runs_out(tmp_path):
+    # The critical review is dispatched first and alone uses more than the budget.
+    reviews = tmp_path / "reviews.jsonl"
+    entries = [("a", "Arrived broken, very disappointed."), ("b", "Late delivery again."), ("c", CRITICAL_REVIEW)]
+    reviews.write_text("".join(json.dumps({"review_id": rid, "review_text": text}) + "\n" for rid, text in entries))
+    output = tmp_path / "out.jsonl"
+
+    main.main(
+        ["--reviews", str(reviews), "--output", str(output), "--journal", str(tmp_path / "j.db"), "--token-budget", "50"]
+    )
+
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [r["review_id"] for r in results] == ["a", "b", "c"]
+    assert [r.get("status") for r in results] == ["deferred", "deferred", None]
+    assert results[2]["response"]["is_critical"]
+    assert RunJournal(tmp_path / "j.db").counts() == {"done": 1, "failed": 2}